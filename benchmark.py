@@ -0,0 +1,254 @@
+"""
+Benchmarks of the hot paths of the decision tree: loading, training,
+prediction one row at a time and by batch, and the exports. Every path is
+timed (best of several runs) and its peak memory is measured in a separate
+run with tracemalloc, on mushrooms.csv and on bigger datasets made from it.
+The results are printed and written in a JSON file to compare versions.
+Run with: python benchmark.py [--scales 1 10 100 1000] [--widths 1 4] [--cold-runs 10] [--output results.json]
+The x1000 scale is left out by default since it takes several minutes.
+"""
+
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from array import array
+from time import perf_counter
+
+from compiled import compile_tree, predict_batch, predict_rows
+from model_io import save_model
+from project import Dataset, bool_tree, build_decision_tree, is_edible, load_dataset, save_dataset, to_python
+
+
+#number of rows classified one by one with is_edible
+SINGLE_ROWS = 10000
+
+
+def best_time(function, repeat: int = 5) -> float:
+    '''
+    Measures the duration of a function.
+
+    Args:
+        function (callable): The function to call without arguments.
+        repeat (int): Number of calls.
+
+    Returns:
+        float: The shortest duration in seconds.
+    '''
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def peak_memory(function) -> int:
+    '''
+    Measures the memory allocated by a function.
+
+    Args:
+        function (callable): The function to call without arguments.
+
+    Returns:
+        int: The peak of memory allocated during the call, in bytes.
+    '''
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def import_file(path: str, name: str = 'generated_tree'):
+    '''
+    Imports a Python file as a module.
+
+    Args:
+        path (str): The path of the file.
+        name (str): The name given to the module.
+
+    Returns:
+        module: The imported module.
+    '''
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def scale_dataset(mushrooms: Dataset, rows: int = 1, width: int = 1, seed: int = 0) -> Dataset:
+    '''
+    Makes a bigger dataset from another one. The rows are repeated and every
+    extra copy of the attributes has its rows shuffled, which gives attributes
+    with the same values but no link with the edibility.
+
+    Args:
+        mushrooms (Dataset): The original dataset.
+        rows (int): Number of copies of the rows.
+        width (int): Number of copies of the attributes.
+        seed (int): Seed of the shuffling.
+
+    Returns:
+        Dataset: The bigger dataset.
+    '''
+    rng = random.Random(seed)
+    attributes = list(mushrooms.attributes_)
+    columns = [column * rows for column in mushrooms.columns_]
+    vocabularies = list(mushrooms.vocabularies_)
+    for copy in range(1, width):
+        attributes += [f'{name}-{copy}' for name in mushrooms.attributes_]
+        vocabularies += mushrooms.vocabularies_
+        for column in mushrooms.columns_:
+            shuffled = column.tolist()
+            rng.shuffle(shuffled)
+            columns.append(array(column.typecode, shuffled) * rows)
+    return Dataset.from_columns(attributes, vocabularies, columns, mushrooms.labels_ * rows)
+
+
+def bench_dataset(name: str, mushrooms: Dataset, repeat: int = 3) -> list[dict]:
+    '''
+    Runs every benchmark on a dataset.
+
+    Args:
+        name (str): The name of the dataset in the results.
+        mushrooms (Dataset): The dataset.
+        repeat (int): Number of timed runs of every benchmark.
+
+    Returns:
+        list: One dictionary per benchmark with its duration and peak memory.
+    '''
+    tree = build_decision_tree(mushrooms)
+    compiled = compile_tree(tree, mushrooms)
+    sample = [mushrooms[i] for i in range(min(SINGLE_ROWS, len(mushrooms)))]
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, 'mushrooms.csv')
+        save_dataset(mushrooms, csv_path)
+        python_path = os.path.join(directory, 'generated_tree.py')
+        to_python(tree, python_path, mushrooms.attributes_, batch = True)
+        module = import_file(python_path)
+        tuples = [tuple(mushroom.mushroom[attribute] for attribute in mushrooms.attributes_) for mushroom in sample]
+
+        benchmarks = {
+            'load_dataset': lambda: load_dataset(csv_path),
+            'build_decision_tree': lambda: build_decision_tree(mushrooms),
+            'build_decision_tree (bitset)': lambda: build_decision_tree(mushrooms, backend = 'bitset'),
+            'is_edible': lambda: [is_edible(tree, mushroom) for mushroom in sample],
+            'generated predict': lambda: [module.predict(row) for row in tuples],
+            'predict_rows': lambda: predict_rows(compiled, mushrooms),
+            'predict_batch': lambda: predict_batch(compiled, mushrooms),
+            'bool_tree': lambda: bool_tree(tree),
+            'to_python': lambda: to_python(tree, python_path, mushrooms.attributes_),
+        }
+        if importlib.util.find_spec('numpy') is not None:
+            benchmarks['build_decision_tree (numpy)'] = lambda: build_decision_tree(mushrooms, backend = 'numpy')
+
+        results = []
+        for benchmark, function in benchmarks.items():
+            results.append({
+                'dataset': name,
+                'rows': len(sample) if benchmark in ('is_edible', 'generated predict') else len(mushrooms),
+                'attributes': len(mushrooms.attributes_),
+                'benchmark': benchmark,
+                'seconds': best_time(function, repeat),
+                'peak_bytes': peak_memory(function),
+            })
+    return results
+
+
+def bench_cold_start(mushrooms: Dataset, repeat: int = 10) -> dict:
+    '''
+    Measures the time to classify a single mushroom from a new process with
+    the command line (cli.py predict on a model file), which includes the
+    start of the interpreter and the imports, and the time of an empty
+    interpreter for comparison.
+
+    Args:
+        mushrooms (Dataset): The dataset whose tree is saved in the model file.
+        repeat (int): Number of processes started for every measure.
+
+    Returns:
+        dict: The durations of the empty interpreter and of the prediction, in seconds, and their difference.
+    '''
+    cli = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cli.py')
+    value = f'{mushrooms.attributes_[0]}={mushrooms.vocabularies_[0][0]}'
+    with tempfile.TemporaryDirectory() as directory:
+        model_path = os.path.join(directory, 'model.bin')
+        save_model(build_decision_tree(mushrooms), model_path, mushrooms)
+        interpreter = best_time(lambda: subprocess.run([sys.executable, '-c', 'pass'], check = True), repeat)
+        predict = best_time(lambda: subprocess.run([sys.executable, cli, 'predict', '--model', model_path, value],
+                                                   check = True, stdout = subprocess.DEVNULL), repeat)
+    return {'interpreter_seconds': interpreter, 'predict_seconds': predict, 'overhead_seconds': predict - interpreter}
+
+
+def run_benchmarks(path: str = 'mushrooms.csv', scales: list[int] = (1, 10, 100),
+                   widths: list[int] = (1, 4), repeat: int = 3, cold_runs: int = 10) -> dict:
+    '''
+    Runs the benchmarks on a dataset and on its scaled versions.
+
+    Args:
+        path (str): The path of the original dataset.
+        scales (list): Numbers of copies of the rows.
+        widths (list): Numbers of copies of the attributes.
+        repeat (int): Number of timed runs of every benchmark.
+        cold_runs (int): Number of processes started to measure a cold prediction, none if 0.
+
+    Returns:
+        dict: The environment, the list of results and the cold start times.
+    '''
+    mushrooms = load_dataset(path)
+    results = []
+    for width in widths:
+        for scale in scales:
+            name = f'{os.path.basename(path)} rows x{scale} attributes x{width}'
+            results += bench_dataset(name, scale_dataset(mushrooms, scale, width), repeat)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': importlib.util.find_spec('numpy') is not None,
+        'results': results,
+        'cold_start': bench_cold_start(mushrooms, cold_runs) if cold_runs else None,
+    }
+
+
+def main():
+    '''
+    Runs the benchmarks, prints their results and writes them in a JSON file.
+    '''
+    parser = argparse.ArgumentParser(description = 'Benchmarks of the mushroom decision tree.')
+    parser.add_argument('--dataset', default = 'mushrooms.csv', help = 'original dataset')
+    parser.add_argument('--scales', type = int, nargs = '+', default = [1, 10, 100], help = 'copies of the rows')
+    parser.add_argument('--widths', type = int, nargs = '+', default = [1, 4], help = 'copies of the attributes')
+    parser.add_argument('--repeat', type = int, default = 3, help = 'timed runs of every benchmark')
+    parser.add_argument('--cold-runs', type = int, default = 10, help = 'processes started to time a cold prediction, 0 to skip')
+    parser.add_argument('--output', default = 'benchmark_results.json', help = 'JSON file of the results')
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.dataset, args.scales, args.widths, args.repeat, args.cold_runs)
+    with open(args.output, 'w', encoding = 'utf-8') as f:
+        json.dump(report, f, indent = 2)
+
+    dataset = None
+    for result in report['results']:
+        if result['dataset'] != dataset:
+            dataset = result['dataset']
+            print(f'\n\x1b[1m{dataset}\x1b[0m ({result["attributes"]} attributes)')
+        print(f'{result["benchmark"]:<30}{result["rows"]:>10} rows{result["seconds"] * 1000:>12.2f} ms'
+              f'{result["peak_bytes"] / 2 ** 20:>10.1f} MiB')
+    if report['cold_start'] is not None:
+        cold = report['cold_start']
+        print(f'\ncold prediction {cold["predict_seconds"] * 1000:.1f} ms, of which {cold["overhead_seconds"] * 1000:.1f} ms '
+              f'after the start of the interpreter ({cold["interpreter_seconds"] * 1000:.1f} ms)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""
+Bitset version of the construction of the decision tree. Every (attribute,
+value) pair and the edibility are turned once into Python integers whose
+bit i is set when row i has the value, so that the subset of a node is the
+AND of the bitsets of the values leading to it, and its counts are
+popcounts of ANDs, computed by whole machine words in C. No list of rows
+is made for the big nodes.
+The bitsets take one bit per row for every value of every attribute, and
+the cost of an AND doesn't shrink with the subset, so the subsets much
+smaller than the dataset are built from the list of their rows instead,
+like in project.build_subtree.
+"""
+
+
+from array import array
+from collections import deque
+from itertools import compress
+
+from project import Dataset, Node, build_subtree, choose_split_attribute, get_majority
+
+
+#subsets with fewer rows than the dataset divided by this ratio are built from their row indices
+SPARSE_RATIO = 16
+
+
+def as_bitsets(dataset: Dataset) -> tuple:
+    '''
+    Computes the bitsets of every value of every attribute and of the edibility.
+
+    Args:
+        dataset (Dataset): The dataset.
+
+    Returns:
+        tuple: For each attribute, the list of the bitsets of its value codes, and the bitset of the edible rows.
+    '''
+    rows = dataset.row_indices()
+    every_row = dataset.rows_ is None
+    bitsets = []
+    for column, vocabulary in zip(dataset.columns_, dataset.vocabularies_):
+        if column.itemsize == 1:
+            #one ASCII digit per row, the last row first, read as a binary number
+            codes = (column.tobytes() if every_row else bytes(map(column.__getitem__, rows)))[::-1]
+            values = []
+            for code in range(len(vocabulary)):
+                table = bytearray(b'0' * 256)
+                table[code] = ord('1')
+                values.append(int(codes.translate(table), 2) if code in codes else 0)
+        else:
+            digits = [bytearray(b'0' * len(rows)) for _ in vocabulary]
+            last = len(rows) - 1
+            for i, row in enumerate(rows):
+                digits[column[row]][last - i] = ord('1')
+            values = [int(value, 2) if value else 0 for value in digits]
+        bitsets.append(values)
+    labels = bytes(dataset.labels_) if every_row else bytes(map(dataset.labels_.__getitem__, rows))
+    edible = int(labels[::-1].translate(bytes.maketrans(b'\x00\x01', b'01')), 2) if labels else 0
+    return bitsets, edible
+
+
+def build_bitset_tree(dataset: Dataset, max_depth: int = None, min_samples: int = 2, breadth_first: bool = False,
+                      min_gain: float = 0.0) -> Node:
+    '''
+    Builds the decision tree of a dataset with bitsets.
+
+    Args:
+        dataset (Dataset): The dataset to learn from.
+        max_depth (int): Depth from which the nodes become leaves of their majority class, no limit if None.
+        min_samples (int): Minimal number of mushrooms of a node to split it.
+        breadth_first (bool): Indicates if the tree is built level by level.
+        min_gain (float): Minimal information gain of a split.
+
+    Returns:
+        Node: The root node of the decision tree.
+    '''
+    bitsets, edible = as_bitsets(dataset)
+    every_row = (1 << len(dataset)) - 1
+    return build_bitset_subtree(dataset, bitsets, edible, every_row, max_depth, min_samples, breadth_first, min_gain)
+
+
+def bitset_rows(subset: int) -> array:
+    '''
+    Retrieves the indices of the rows of a bitset.
+
+    Args:
+        subset (int): The bitset.
+
+    Returns:
+        array: The indices of the set bits, in increasing order.
+    '''
+    digits = bin(subset)[:1:-1].encode().translate(bytes.maketrans(b'01', b'\x00\x01'))
+    return array('I', compress(range(len(digits)), digits))
+
+
+def build_bitset_subtree(dataset: Dataset, bitsets: list[list[int]], edible: int, subset: int, max_depth: int = None,
+                         min_samples: int = 2, breadth_first: bool = False, min_gain: float = 0.0) -> Node:
+    '''
+    Builds the subtree of a subset of rows, the subsets waiting to be split
+    being kept in a queue like in project.build_subtree.
+
+    Args:
+        dataset (Dataset): The dataset containing the rows.
+        bitsets (list): For each attribute, the bitsets of its value codes.
+        edible (int): The bitset of the edible rows.
+        subset (int): The bitset of the rows of the subset.
+        max_depth (int): Depth from which the nodes become leaves of their majority class, no limit if None.
+        min_samples (int): Minimal number of mushrooms of a node to split it.
+        breadth_first (bool): Indicates if the subsets are split level by level.
+        min_gain (float): Minimal information gain of a split.
+
+    Returns:
+        Node: The root node of the subtree.
+    '''
+    root = None
+    sparse = len(dataset) // SPARSE_RATIO
+    pending = deque([(None, None, subset, 0, range(len(bitsets)))])
+    pop = pending.popleft if breadth_first else pending.pop
+    while pending:
+        parent, label, subset, depth, attributes = pop()
+        children = None
+
+        #leaves
+        total = subset.bit_count()
+        edible_subset = subset & edible
+        edibles = edible_subset.bit_count()
+        if total < sparse and edibles not in (0, total):
+            rows = bitset_rows(subset)
+            if dataset.rows_ is not None:
+                rows = array('I', map(dataset.rows_.__getitem__, rows))
+            node = build_subtree(dataset, rows, depth = depth, max_depth = max_depth, min_samples = min_samples,
+                                 breadth_first = breadth_first, attributes = attributes, min_gain = min_gain)
+        elif edibles == total or edibles == 0:
+            node = Node('Yes' if edibles else 'No', True, samples = total, edibles = edibles)
+        elif (max_depth is not None and depth >= max_depth) or total < min_samples:
+            node = Node('Yes' if get_majority(edibles, total) else 'No', True, samples = total, edibles = edibles)
+
+        else:
+            #attribute choice
+            table = []
+            for attribute in attributes:
+                counts = []
+                for code, values in enumerate(bitsets[attribute]):
+                    rows = subset & values
+                    if rows:
+                        #the lowest bit gives the first row of the value
+                        counts.append(((rows & -rows).bit_length(), code, rows.bit_count(),
+                                       (rows & edible_subset).bit_count()))
+                counts.sort()
+                table.append({code: (n, edibles_of_value) for _, code, n, edibles_of_value in counts})
+            split_attr = choose_split_attribute(table, edibles, total, min_gain)
+
+            if split_attr is None:
+                #identical mushrooms with different edibility, or too small gain: keeping the majority
+                node = Node('Yes' if get_majority(edibles, total) else 'No', True, samples = total, edibles = edibles)
+            else:
+                attribute = attributes[split_attr]
+                node = Node(dataset.attributes_[attribute], majority = get_majority(edibles, total), samples = total,
+                            edibles = edibles)
+                vocabulary = dataset.vocabularies_[attribute]
+                candidates = [candidate for candidate, counts in zip(attributes, table)
+                              if len(counts) > 1 and candidate != attribute]
+                children = [(node, vocabulary[code], subset & bitsets[attribute][code], depth + 1, candidates)
+                            for code in table[split_attr]]
+
+        if parent is None:
+            root = node
+        else:
+            parent.add_edge(label, node)
+
+        if children is not None:
+            pending.extend(children if breadth_first else reversed(children))
+
+    return root
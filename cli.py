@@ -0,0 +1,217 @@
+"""
+Command line interface of the decision tree, doing only the work asked for.
+Every command takes a model file or a dataset, whose tree is built once and
+then read from its cached model (see model_io.load_tree) until the dataset
+changes, so classifying a mushroom only loads a model file. The modules
+needed by a command are imported when it runs.
+Run with: python cli.py {train,predict,show,export,interactive} [--model mushrooms.csv] ...
+"""
+
+
+import argparse
+import sys
+
+
+def get_tree(args):
+    '''
+    Loads the tree of a command.
+
+    Args:
+        args (Namespace): The arguments of the command, with the model path.
+
+    Returns:
+        CompiledTree: The flattened tree.
+    '''
+    from model_io import load_tree #imported only when needed
+    try:
+        return load_tree(args.model, cache = not args.no_cache)
+    except (OSError, ValueError) as error:
+        sys.exit(f'Cannot load the model {args.model}: {error}')
+
+
+def train(args) -> None:
+    '''
+    Builds the tree of a dataset and saves it.
+
+    Args:
+        args (Namespace): The arguments of the command.
+    '''
+    from time import perf_counter
+    from compiled import compile_tree
+    from model_io import cache_path, save_model
+    from project import build_decision_tree, load_dataset
+
+    start = perf_counter()
+    dataset = load_dataset(args.dataset)
+    loaded = perf_counter()
+    tree = compile_tree(build_decision_tree(dataset, backend = args.backend, max_depth = args.max_depth,
+                                            min_samples = args.min_samples, min_gain = args.min_gain), dataset)
+    built = perf_counter()
+    output = args.output or cache_path(args.dataset)
+    save_model(tree, output)
+    print(f'{len(dataset)} mushrooms loaded in {loaded - start:.2f} s, {len(tree)} nodes built in {built - loaded:.2f} s, '
+          f'saved in {output}')
+
+
+def parse_mushroom(values: list[str], attributes: list[str]) -> dict:
+    '''
+    Reads the values of a mushroom given on the command line.
+
+    Args:
+        values (list): The values, as attribute=value pairs, or all the values in the order of the attributes.
+        attributes (list): The names of the attributes of the tree.
+
+    Returns:
+        dict: The values of the mushroom by attribute.
+    '''
+    if values and all('=' not in value for value in values):
+        if len(values) != len(attributes):
+            raise ValueError(f'Expected {len(attributes)} values, got {len(values)}')
+        return dict(zip(attributes, values))
+    mushroom = {}
+    for value in values:
+        name, sep, value = value.partition('=')
+        if not sep:
+            raise ValueError(f'Expected attribute=value, got {name}')
+        mushroom[name.strip()] = value.strip()
+    return mushroom
+
+
+def predict(args) -> None:
+    '''
+    Classifies a mushroom and prints its edibility, its probability and the decision path followed.
+
+    Args:
+        args (Namespace): The arguments of the command.
+    '''
+    tree = get_tree(args)
+    try:
+        mushroom = parse_mushroom(args.values, tree.attributes_)
+    except ValueError as e:
+        sys.exit(str(e))
+    unseen = {'none': None, 'yes': True, 'no': False, 'majority': 'majority'}[args.unseen]
+    edible, node, path = tree.trace(lambda feature: mushroom.get(tree.attributes_[feature]), unseen)
+    print({True: 'Yes', False: 'No', None: 'unknown'}[edible])
+    if args.probability:
+        probability = tree.get_probability(node)
+        print('unknown' if probability is None else f'{probability:.4f}')
+    if args.path:
+        print(' -> '.join(f'{tree.attributes_[feature]}={value if value is not None else ""}' for feature, value in path))
+
+
+def show(args) -> None:
+    '''
+    Prints the tree, its boolean expression or its rules.
+
+    Args:
+        args (Namespace): The arguments of the command.
+    '''
+    tree = get_tree(args)
+    if args.format == 'tree':
+        from project import display
+        display(tree.root())
+    elif args.format == 'bool':
+        from project import write_bool_tree
+        write_bool_tree(tree.root(), sys.stdout)
+        print()
+    else:
+        from rules import RuleSet
+        RuleSet.from_tree(tree.root(), tree).write_expression(sys.stdout)
+        print()
+
+
+def export(args) -> None:
+    '''
+    Writes the tree as a Python module, a SQL condition or a model file.
+
+    Args:
+        args (Namespace): The arguments of the command.
+    '''
+    tree = get_tree(args)
+    if args.format == 'python':
+        from project import to_python
+        to_python(tree.root(), args.output or 'to_python.py', tree.attributes_, args.batch)
+    elif args.format == 'sql':
+        from project import open_output
+        from rules import RuleSet
+        with open_output(args.output or '-') as f:
+            f.write(RuleSet.from_tree(tree.root(), tree).to_sql() + '\n')
+    else:
+        from model_io import save_model
+        save_model(tree, args.output or 'model.bin')
+
+
+def interactive(args) -> None:
+    '''
+    Asks the values of mushrooms one by one and tells their edibility.
+
+    Args:
+        args (Namespace): The arguments of the command.
+    '''
+    from project import chosen_path
+
+    root = get_tree(args).root()
+    user_input = str(input('Would you like to test the edibility of a mushroom?\nPress \'\u21B3\' to continue, \'E\' to exit: '))
+    while user_input.upper() != 'E':
+        chosen_path(root)
+        user_input = str(input('\nWould you like to test the edibility of another mushroom?\nPress \'\u21B3\' to continue, \'E\' to exit: '))
+
+
+def main(argv: list[str] = None) -> None:
+    '''
+    Runs a command of the decision tree, interactive if none is given.
+
+    Args:
+        argv (list): The arguments, those of the command line if None.
+    '''
+    #the model options are accepted before the command too: their defaults are only set after parsing,
+    #so that the commands don't overwrite an option given before them
+    common = argparse.ArgumentParser(add_help = False)
+    common.add_argument('--model', default = argparse.SUPPRESS, help = 'model file, or CSV dataset whose tree is cached (mushrooms.csv by default)')
+    common.add_argument('--no-cache', action = 'store_true', default = argparse.SUPPRESS,
+                        help = "rebuild the tree of a dataset instead of using its cached model")
+    parser = argparse.ArgumentParser(description = 'Mushroom decision tree.', parents = [common])
+    commands = parser.add_subparsers(dest = 'command')
+
+    command = commands.add_parser('train', help = 'build the tree of a dataset and save it')
+    command.add_argument('dataset', nargs = '?', default = 'mushrooms.csv', help = 'CSV file of the mushrooms')
+    command.add_argument('--output', help = 'model file, the cached model of the dataset by default')
+    command.add_argument('--backend', choices = ['python', 'numpy', 'bitset'], default = 'python', help = 'training backend')
+    command.add_argument('--max-depth', type = int, default = None, help = 'maximal depth of the tree')
+    command.add_argument('--min-samples', type = int, default = 2, help = 'minimal number of mushrooms of a split node')
+    command.add_argument('--min-gain', type = float, default = 0.0, help = 'minimal information gain of a split')
+    command.set_defaults(function = train)
+
+    command = commands.add_parser('predict', parents = [common], help = 'classify a mushroom')
+    command.add_argument('values', nargs = '*', help = 'attribute=value pairs, or every value in the order of the attributes')
+    command.add_argument('--unseen', choices = ['none', 'yes', 'no', 'majority'], default = 'none',
+                         help = 'answer when a value is unknown to the tree')
+    command.add_argument('--probability', action = 'store_true', help = 'also print the share of edible training mushrooms of the leaf')
+    command.add_argument('--path', action = 'store_true', help = 'also print the decision path')
+    command.set_defaults(function = predict)
+
+    command = commands.add_parser('show', parents = [common], help = 'print the tree')
+    command.add_argument('--format', choices = ['tree', 'bool', 'rules'], default = 'tree', help = 'what to print')
+    command.set_defaults(function = show)
+
+    command = commands.add_parser('export', parents = [common], help = 'write the tree in another format')
+    command.add_argument('--format', choices = ['python', 'sql', 'model'], default = 'python', help = 'format of the output')
+    command.add_argument('--output', help = 'output file, to_python.py, the standard output or model.bin by default')
+    command.add_argument('--batch', action = 'store_true', help = 'also define predict_batch in the Python module')
+    command.set_defaults(function = export)
+
+    command = commands.add_parser('interactive', parents = [common], help = 'ask the values of mushrooms (default)')
+    command.set_defaults(function = interactive)
+
+    args = parser.parse_args(argv)
+    if args.command is None:
+        args = parser.parse_args(['interactive'] + (argv if argv is not None else sys.argv[1:]))
+    if args.command == 'train' and ('model' in args or 'no_cache' in args):
+        parser.error('train reads its dataset and writes its model with --output, not --model or --no-cache')
+    args.model = getattr(args, 'model', 'mushrooms.csv')
+    args.no_cache = getattr(args, 'no_cache', False)
+    args.function(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,551 @@
+"""
+Flattened version of the decision tree used to classify many mushrooms at
+once. The nodes are numbered in breadth-first order and stored in arrays:
+the attribute tested by every node, the edibility of the leaves and a table
+giving the child of a node for every value code of its attribute. The
+numbers of training mushrooms and of edible ones reaching every node are
+kept too, so the compiled tree gives the same probabilities as the nodes.
+The module only imports project when it builds or reads Node objects and
+datasets, so loading and walking a model file doesn't need it.
+"""
+
+
+import importlib.util
+from array import array
+from collections import deque
+
+
+class CompiledTree:
+    '''
+    Represents a decision tree stored in flat arrays. Node 0 is the root.
+
+    Attributes:
+        attributes_ (list): Names of the attributes known by the tree.
+        vocabularies_ (list): For each attribute, the list of its values. The code of a value is its index.
+        features_ (array): For each node, the index of its attribute, -1 for the leaves.
+        leaves_ (array): For each node, 1 if it is an edible leaf or if most of the mushrooms reaching it are edible, 0 otherwise.
+        offsets_ (array): For each node, the position of its first child in children_.
+        children_ (array): For each node and each code of its attribute, the child node, -1 if there is none.
+        samples_ (array): For each node, the number of training mushrooms reaching it, -1 if unknown.
+        edibles_ (array): For each node, the number of edible training mushrooms reaching it, -1 if unknown.
+        edge_codes_ (list): For each node, the codes of the values having an edge, in the order of the edges, None until needed.
+    '''
+
+    def __init__(self, attributes: list[str], vocabularies: list[list[str]]):
+        '''
+        Initializes an empty CompiledTree object.
+
+        Args:
+            attributes (list): Names of the attributes known by the tree.
+            vocabularies (list): For each attribute, the list of its values.
+
+        Returns:
+            None
+        '''
+        self.attributes_ = list(attributes)
+        self.vocabularies_ = [list(vocabulary) for vocabulary in vocabularies]
+        self.features_ = array('i')
+        self.leaves_ = array('b')
+        self.offsets_ = array('q')
+        self.children_ = array('i')
+        self.samples_ = array('q')
+        self.edibles_ = array('q')
+        self.codes_ = None
+        self.edge_codes_ = None
+
+
+    def __len__(self) -> int:
+        return len(self.features_)
+
+
+    def add_node(self, feature: int, edible: bool = False, samples: int = None, edibles: int = None) -> int:
+        '''
+        Adds a node whose children are all missing.
+
+        Args:
+            feature (int): The index of the node's attribute, -1 for a leaf.
+            edible (bool): Indicates if the leaf is edible, or the majority class of another node.
+            samples (int): Number of training mushrooms reaching the node, None if unknown.
+            edibles (int): Number of edible training mushrooms reaching the node, None if unknown.
+
+        Returns:
+            int: The id of the new node.
+        '''
+        self.features_.append(feature)
+        self.leaves_.append(1 if edible else 0)
+        self.samples_.append(-1 if samples is None else samples)
+        self.edibles_.append(-1 if edibles is None else edibles)
+        self.offsets_.append(len(self.children_))
+        if feature >= 0:
+            self.children_.extend([-1] * len(self.vocabularies_[feature]))
+        self.edge_codes_ = None
+        return len(self.features_) - 1
+
+
+    def get_remaps(self, batch: 'Dataset') -> list:
+        '''
+        Translates the codes of a batch into the codes of the tree.
+
+        Args:
+            batch (Dataset): The mushrooms to classify.
+
+        Returns:
+            list: For each attribute of the tree, an array mapping the codes of the batch to the codes of the tree (-1 if unknown), None if the batch doesn't have the attribute.
+        '''
+        remaps = []
+        for name, vocabulary in zip(self.attributes_, self.vocabularies_):
+            if name not in batch.positions_:
+                remaps.append(None)
+                continue
+            codes = {value: code for code, value in enumerate(vocabulary)}
+            batch_vocabulary = batch.vocabularies_[batch.attribute_index(name)]
+            remaps.append(array('i', [codes.get(value, -1) for value in batch_vocabulary]))
+        return remaps
+
+
+    def get_child(self, node: int, value: str) -> int:
+        '''
+        Retrieves the child of a node for a value of its attribute.
+
+        Args:
+            node (int): The id of the node.
+            value (str): The value of the node's attribute.
+
+        Returns:
+            int: The id of the child, -1 if the value has no edge.
+        '''
+        if self.codes_ is None:
+            self.codes_ = [{value: code for code, value in enumerate(vocabulary)} for vocabulary in self.vocabularies_]
+        code = self.codes_[self.features_[node]].get(value)
+        return -1 if code is None else self.children_[self.offsets_[node] + code]
+
+
+    def trace(self, get_value, unseen = None) -> tuple:
+        '''
+        Goes down the tree for a single mushroom, until a leaf or a value
+        without edge.
+
+        Args:
+            get_value (callable): Function giving the value of the mushroom for the index of an attribute, None if it is missing.
+            unseen (bool or str): Answer when a value has no edge: None, True, False,
+                                  or 'majority' for the majority class of the node.
+
+        Returns:
+            tuple: The edibility of the mushroom, the id of the node reached and the path followed as
+            (attribute index, value) pairs.
+        '''
+        if self.codes_ is None:
+            self.codes_ = [{value: code for code, value in enumerate(vocabulary)} for vocabulary in self.vocabularies_]
+        codes, features, offsets, children = self.codes_, self.features_, self.offsets_, self.children_
+        node = 0
+        path = []
+        while (feature := features[node]) >= 0:
+            value = get_value(feature)
+            path.append((feature, value))
+            #same lookup as get_child, inlined for the batch scoring
+            code = codes[feature].get(value)
+            child = -1 if code is None else children[offsets[node] + code]
+            if child < 0:
+                return (self.leaves_[node] == 1 if unseen == 'majority' else unseen), node, path
+            node = child
+        return self.leaves_[node] == 1, node, path
+
+
+    def get_edge_codes(self, node: int) -> list[int]:
+        '''
+        Retrieves the codes of the values of a node having an edge, in the
+        order of the edges. The order is worked out once for every node.
+
+        Args:
+            node (int): The id of the node.
+
+        Returns:
+            list: The codes of the values leading to a child, empty for a leaf.
+        '''
+        if self.edge_codes_ is None:
+            edge_codes = []
+            for feature, offset in zip(self.features_, self.offsets_):
+                if feature < 0:
+                    edge_codes.append([])
+                    continue
+                children = self.children_[offset:offset + len(self.vocabularies_[feature])]
+                #the children were numbered in the order of the edges
+                edge_codes.append(sorted((code for code, child in enumerate(children) if child >= 0),
+                                         key = children.__getitem__))
+            self.edge_codes_ = edge_codes
+        return self.edge_codes_[node]
+
+
+    def get_probability(self, node: int) -> float:
+        '''
+        Computes the share of edible mushrooms among the training mushrooms reaching a node.
+
+        Args:
+            node (int): The id of the node.
+
+        Returns:
+            float: The probability that a mushroom reaching the node is edible, None if the counts are unknown.
+        '''
+        samples = self.samples_[node]
+        return self.edibles_[node] / samples if samples > 0 else None
+
+
+    def root(self) -> 'NodeView':
+        '''
+        Retrieves the root of the tree as an object behaving like a Node, so
+        that display, bool_tree, is_edible or chosen_path can read the tree.
+
+        Returns:
+            NodeView: The root node.
+        '''
+        return NodeView(self, 0)
+
+
+class NodeView:
+    '''
+    Represents a node of a CompiledTree with the interface of a Node. It only
+    holds the tree and the id of the node, the edges are created on demand.
+
+    Attributes:
+        tree_ (CompiledTree): The tree the node belongs to.
+        id_ (int): The id of the node in the tree.
+    '''
+
+    __slots__ = ('tree_', 'id_')
+
+    def __init__(self, tree: CompiledTree, node_id: int):
+        '''
+        Initializes a NodeView object.
+
+        Args:
+            tree (CompiledTree): The tree the node belongs to.
+            node_id (int): The id of the node in the tree.
+        '''
+        self.tree_ = tree
+        self.id_ = node_id
+
+
+    @property
+    def criterion_(self) -> str:
+        feature = self.tree_.features_[self.id_]
+        if feature < 0:
+            return 'Yes' if self.tree_.leaves_[self.id_] else 'No'
+        return self.tree_.attributes_[feature]
+
+
+    @property
+    def is_leaf_(self) -> bool:
+        return self.tree_.features_[self.id_] < 0
+
+
+    @property
+    def majority_(self) -> bool:
+        return self.tree_.leaves_[self.id_] == 1
+
+
+    @property
+    def samples_(self) -> int:
+        samples = self.tree_.samples_[self.id_]
+        return None if samples < 0 else samples
+
+
+    @property
+    def edibles_(self) -> int:
+        edibles = self.tree_.edibles_[self.id_]
+        return None if edibles < 0 else edibles
+
+
+    def is_leaf(self) -> bool:
+        '''
+        Checks if the node is a leaf node.
+
+        Returns:
+            bool: True if the node is a leaf node, False otherwise.
+        '''
+        return self.is_leaf_
+
+
+    def get_probability(self) -> float:
+        '''
+        Computes the share of edible mushrooms among the training mushrooms reaching the node.
+
+        Returns:
+            float: The probability that a mushroom reaching the node is edible, None if the counts are unknown.
+        '''
+        return self.tree_.get_probability(self.id_)
+
+
+    @property
+    def edges_(self) -> list['EdgeView']:
+        tree = self.tree_
+        codes = tree.get_edge_codes(self.id_)
+        if not codes:
+            return []
+        offset = tree.offsets_[self.id_]
+        vocabulary = tree.vocabularies_[tree.features_[self.id_]]
+        return [EdgeView(self, NodeView(tree, tree.children_[offset + code]), vocabulary[code]) for code in codes]
+
+
+    def get_labels(self):
+        '''
+        Retrieves the labels associated with the outgoing edges.
+
+        Returns:
+            list: List of edge labels.
+        '''
+        return [edge.label_ for edge in self.edges_]
+
+
+    def get_child(self, label: str) -> 'NodeView':
+        '''
+        Retrieves the child reached by an edge, without going through the edges.
+
+        Args:
+            label (str): The label of the edge.
+
+        Returns:
+            NodeView: The child node, None if no edge has this label.
+        '''
+        child = self.tree_.get_child(self.id_, label)
+        return None if child < 0 else NodeView(self.tree_, child)
+
+
+class EdgeView:
+    '''
+    Represents an edge of a CompiledTree with the interface of an Edge.
+
+    Attributes:
+        parent_ (NodeView): The parent node.
+        child_ (NodeView): The child node.
+        label_ (str): The label associated with the edge.
+    '''
+
+    __slots__ = ('parent_', 'child_', 'label_')
+
+    def __init__(self, parent: NodeView, child: NodeView, label: str):
+        '''
+        Initializes an EdgeView object.
+
+        Args:
+            parent (NodeView): The parent node.
+            child (NodeView): The child node.
+            label (str): The label associated with the edge.
+        '''
+        self.parent_ = parent
+        self.child_ = child
+        self.label_ = label
+
+
+def compile_tree(root: 'Node', dataset: 'Dataset' = None) -> CompiledTree:
+    '''
+    Flattens a decision tree into arrays.
+
+    Args:
+        root (Node): The root node of the decision tree.
+        dataset (Dataset): The dataset the tree was built from, whose vocabularies are reused. If None, the vocabularies are read from the tree.
+
+    Returns:
+        CompiledTree: The flattened tree.
+    '''
+    if dataset is not None:
+        tree = CompiledTree(dataset.attributes_, dataset.vocabularies_)
+    else:
+        tree = CompiledTree([], [])
+    positions = {name: i for i, name in enumerate(tree.attributes_)}
+    codes = [{value: code for code, value in enumerate(vocabulary)} for vocabulary in tree.vocabularies_]
+
+    #gathering the attributes and values of the tree missing from the vocabularies
+    queue = deque([root])
+    while queue:
+        node = queue.popleft()
+        if node.is_leaf():
+            continue
+        if node.criterion_ not in positions:
+            positions[node.criterion_] = len(tree.attributes_)
+            tree.attributes_.append(node.criterion_)
+            tree.vocabularies_.append([])
+            codes.append({})
+        feature = positions[node.criterion_]
+        for edge in node.edges_:
+            if edge.label_ not in codes[feature]:
+                codes[feature][edge.label_] = len(tree.vocabularies_[feature])
+                tree.vocabularies_[feature].append(edge.label_)
+            queue.append(edge.child_)
+
+    #numbering the nodes in breadth-first order
+    queue = deque([(root, -1)])
+    while queue:
+        node, slot = queue.popleft()
+        feature = -1 if node.is_leaf() else positions[node.criterion_]
+        node_id = tree.add_node(feature, node.criterion_ == 'Yes' if node.is_leaf() else bool(node.majority_),
+                                node.samples_, node.edibles_)
+        if slot >= 0:
+            tree.children_[slot] = node_id
+        for edge in node.edges_:
+            queue.append((edge.child_, tree.offsets_[node_id] + codes[feature][edge.label_]))
+
+    return tree
+
+
+def decompile_tree(tree: CompiledTree) -> 'Node':
+    '''
+    Rebuilds the Node objects of a flattened tree, for example to display it.
+
+    Args:
+        tree (CompiledTree): The flattened tree.
+
+    Returns:
+        Node: The root node of the decision tree.
+    '''
+    from project import Node #imported only when needed
+
+    views = [NodeView(tree, node_id) for node_id in range(len(tree))]
+    nodes = [Node(view.criterion_, view.is_leaf(), view.majority_, view.samples_, view.edibles_) for view in views]
+    for view, node in zip(views, nodes):
+        for edge in view.edges_:
+            node.add_edge(edge.label_, nodes[edge.child_.id_])
+    return nodes[0]
+
+
+def predict_batch(tree, batch, unseen = None, remaps: list = None) -> array:
+    '''
+    Classifies a batch of mushrooms. NumPy is used if it is installed.
+
+    Args:
+        tree (CompiledTree or Node): The tree, compiled on the fly if it is a Node.
+        batch (Dataset or list): The mushrooms to classify.
+        unseen (bool or str): Answer when a value has no edge: None (-1), True, False,
+                              or 'majority' for the majority class of the node.
+        remaps (list): The codes of the batch translated for the tree (see CompiledTree.get_remaps), which
+                       trees sharing their vocabularies can share, computed if None.
+
+    Returns:
+        array: For each mushroom, 1 if it is edible, 0 if it is poisonous and -1 if one of its values is unknown to the tree.
+    '''
+    from project import Dataset #imported only when needed
+
+    if not isinstance(tree, CompiledTree):
+        tree = compile_tree(tree)
+    batch = Dataset.from_mushrooms(batch)
+    if importlib.util.find_spec('numpy') is None:
+        return predict_rows(tree, batch, unseen, remaps = remaps)
+    return predict_numpy(tree, batch, unseen, remaps = remaps)
+
+
+def predict_proba(tree, batch) -> list[float]:
+    '''
+    Computes the probability that the mushrooms of a batch are edible, from
+    the training counts of the leaf they reach, or of the node where one of
+    their values has no edge (like project.get_edible_probability).
+
+    Args:
+        tree (CompiledTree or Node): The tree, compiled on the fly if it is a Node.
+        batch (Dataset or list): The mushrooms to classify.
+
+    Returns:
+        list: For each mushroom, the probability, None if the counts of its node are unknown.
+    '''
+    from project import Dataset #imported only when needed
+
+    if not isinstance(tree, CompiledTree):
+        tree = compile_tree(tree)
+    batch = Dataset.from_mushrooms(batch)
+    predict = predict_rows if importlib.util.find_spec('numpy') is None else predict_numpy
+    probabilities = [tree.get_probability(node) for node in range(len(tree))]
+    return [probabilities[node] for node in predict(tree, batch, reached = True)]
+
+
+def predict_rows(tree: CompiledTree, batch: 'Dataset', unseen = None, reached: bool = False, remaps: list = None) -> array:
+    '''
+    Classifies a batch of mushrooms one row at a time.
+
+    Args:
+        tree (CompiledTree): The flattened tree.
+        batch (Dataset): The mushrooms to classify.
+        unseen (bool or str): Answer when a value has no edge (see predict_batch).
+        reached (bool): Indicates if the ids of the nodes reached are returned instead of the classes.
+        remaps (list): The codes of the batch translated for the tree, computed if None (see predict_batch).
+
+    Returns:
+        array: For each mushroom, 1 if it is edible, 0 if it is poisonous and -1 if unknown, or the id of its
+        leaf (of the node where its value has no edge) if reached is True.
+    '''
+    if remaps is None:
+        remaps = tree.get_remaps(batch)
+    columns = [None if remap is None else batch.columns_[batch.attribute_index(name)]
+               for name, remap in zip(tree.attributes_, remaps)]
+    features, leaves, offsets, children = tree.features_, tree.leaves_, tree.offsets_, tree.children_
+    default = -1 if unseen is None or unseen == 'majority' else int(unseen)
+    ret = array('i' if reached else 'b')
+    for row in batch.row_indices():
+        node = 0
+        feature = features[0]
+        while feature >= 0:
+            code = -1 if remaps[feature] is None else remaps[feature][columns[feature][row]]
+            child = children[offsets[node] + code] if code >= 0 else -1
+            if child < 0:
+                break
+            node = child
+            feature = features[node]
+        if reached:
+            ret.append(node)
+        elif feature < 0:
+            ret.append(leaves[node])
+        else:
+            ret.append(leaves[node] if unseen == 'majority' else default)
+    return ret
+
+
+def predict_numpy(tree: CompiledTree, batch: 'Dataset', unseen = None, reached: bool = False, remaps: list = None) -> array:
+    '''
+    Classifies a batch of mushrooms with NumPy. All the rows standing on
+    nodes of the same attribute go down one level at once.
+
+    Args:
+        tree (CompiledTree): The flattened tree.
+        batch (Dataset): The mushrooms to classify.
+        unseen (bool or str): Answer when a value has no edge (see predict_batch).
+        reached (bool): Indicates if the ids of the nodes reached are returned instead of the classes.
+        remaps (list): The codes of the batch translated for the tree, computed if None (see predict_batch).
+
+    Returns:
+        array: For each mushroom, 1 if it is edible, 0 if it is poisonous and -1 if unknown, or the id of its
+        node if reached is True (see predict_rows).
+    '''
+    import numpy as np
+    from numpy_backend import as_arrays
+
+    columns, _ = as_arrays(batch)
+    rows = np.asarray(batch.row_indices(), dtype = np.intp)
+    features = np.frombuffer(tree.features_, dtype = np.int32)
+    offsets = np.frombuffer(tree.offsets_, dtype = np.int64)
+    children = np.frombuffer(tree.children_, dtype = np.int32)
+    remaps = [None if remap is None else np.frombuffer(remap, dtype = np.int32)
+              for remap in (tree.get_remaps(batch) if remaps is None else remaps)]
+
+    nodes = np.zeros(len(rows), dtype = np.int64)
+    stuck = np.zeros(len(rows), dtype = bool) #rows stopped by a value without edge
+    active = np.arange(len(rows))
+    while active.size:
+        active_features = features[nodes[active]]
+        active = active[active_features >= 0] #rows on a leaf are done
+        active_features = active_features[active_features >= 0]
+        for feature in np.unique(active_features):
+            selected = active[active_features == feature]
+            if remaps[feature] is None:
+                stuck[selected] = True
+                continue
+            column = columns[batch.attribute_index(tree.attributes_[feature])]
+            codes = remaps[feature][column[rows[selected]]]
+            known = codes >= 0
+            next_nodes = np.where(known, children[offsets[nodes[selected]] + np.where(known, codes, 0)], -1)
+            stuck[selected[next_nodes < 0]] = True
+            nodes[selected] = np.where(next_nodes < 0, nodes[selected], next_nodes)
+        active = active[~stuck[active]]
+
+    if reached:
+        return array('i', nodes.astype(np.int32).tobytes())
+    ret = np.frombuffer(tree.leaves_, dtype = np.int8)[nodes]
+    if unseen != 'majority':
+        ret = np.where(stuck, -1 if unseen is None else int(unseen), ret)
+    return array('b', ret.astype(np.int8).tobytes())
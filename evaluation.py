@@ -0,0 +1,228 @@
+"""
+Evaluation of the decision tree on mushrooms it hasn't learnt from. The
+dataset is split into k folds (or a training and a test part), a tree is
+trained on every training part and classifies the matching test part.
+The folds are only arrays of row indices over one loaded dataset, and with
+several processes its columns are shared with them once (see parallel.py),
+so the folds are trained at the same time without copying the mushrooms.
+Run with: python evaluation.py [mushrooms.csv] [--folds 10 | --holdout 0.2] [--jobs 4]
+"""
+
+
+import argparse
+import json
+import os
+import random
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+import parallel
+from compiled import compile_tree, predict_batch
+from parallel import SharedDataset
+from project import Dataset, build_decision_tree, load_dataset
+
+
+#classes of the confusion matrix, the predictions having an unknown class too
+CLASSES = ('edible', 'poisonous')
+
+
+def kfold_splits(dataset: Dataset, k: int = 5, seed: int = 0, stratified: bool = True) -> list[tuple]:
+    '''
+    Splits the rows of a dataset into k folds.
+
+    Args:
+        dataset (Dataset): The dataset.
+        k (int): Number of folds.
+        seed (int): Seed of the shuffling of the rows, None to keep their order.
+        stratified (bool): Indicates if every fold keeps the proportion of edible mushrooms of the dataset.
+
+    Returns:
+        list: For each fold, the indices of its training rows and of its test rows, as arrays.
+    '''
+    rows = list(dataset.row_indices())
+    if not 2 <= k <= len(rows):
+        raise ValueError(f'Cannot split {len(rows)} mushrooms into {k} folds')
+    if seed is not None:
+        random.Random(seed).shuffle(rows)
+    if stratified:
+        #edible rows first, then dealt to the folds in turn
+        rows.sort(key = lambda row: not dataset.labels_[row])
+    folds = [rows[i::k] for i in range(k)]
+    splits = []
+    for test in folds:
+        test = set(test)
+        splits.append((array('I', sorted(row for row in rows if row not in test)), array('I', sorted(test))))
+    return splits
+
+
+def holdout_split(dataset: Dataset, test_size: float = 0.2, seed: int = 0) -> list[tuple]:
+    '''
+    Splits the rows of a dataset into a training part and a test part.
+
+    Args:
+        dataset (Dataset): The dataset.
+        test_size (float): Proportion of the rows kept for the test.
+        seed (int): Seed of the shuffling of the rows, None to test on the last rows.
+
+    Returns:
+        list: The indices of the training rows and of the test rows, as the only split.
+    '''
+    rows = list(dataset.row_indices())
+    if seed is not None:
+        random.Random(seed).shuffle(rows)
+    size = round(len(rows) * test_size)
+    if not 0 < size < len(rows):
+        raise ValueError(f'Cannot keep {test_size} of {len(rows)} mushrooms for the test')
+    return [(array('I', sorted(rows[:-size])), array('I', sorted(rows[-size:])))]
+
+
+def evaluate_fold(dataset: Dataset, train: array, test: array, unseen = 'majority', **options) -> dict:
+    '''
+    Trains a tree on some rows of a dataset and classifies other rows.
+
+    Args:
+        dataset (Dataset): The dataset.
+        train (array): Indices of the training rows.
+        test (array): Indices of the test rows.
+        unseen (bool or str): Answer when a value has no edge (see compiled.predict_batch).
+        **options: Parameters of build_decision_tree (max_depth, min_samples, backend).
+
+    Returns:
+        dict: The sizes of the parts, the number of nodes, the confusion matrix and the training and prediction times.
+    '''
+    start = perf_counter()
+    tree = compile_tree(build_decision_tree(dataset.subset(train), **options), dataset)
+    train_seconds = perf_counter() - start
+
+    start = perf_counter()
+    predictions = predict_batch(tree, dataset.subset(test), unseen)
+    predict_seconds = perf_counter() - start
+
+    confusion = {actual: dict.fromkeys(CLASSES + ('unknown',), 0) for actual in CLASSES}
+    for row, prediction in zip(test, predictions):
+        actual = CLASSES[0] if dataset.labels_[row] else CLASSES[1]
+        confusion[actual]['unknown' if prediction < 0 else CLASSES[0] if prediction else CLASSES[1]] += 1
+    correct = confusion['edible']['edible'] + confusion['poisonous']['poisonous']
+    return {
+        'train_rows': len(train),
+        'test_rows': len(test),
+        'nodes': len(tree),
+        'accuracy': correct / len(test),
+        'confusion': confusion,
+        'train_seconds': train_seconds,
+        'predict_seconds': predict_seconds,
+    }
+
+
+def evaluate_worker_fold(train: array, test: array, unseen, options: dict) -> dict:
+    '''
+    Evaluates a fold in a worker process, over its shared dataset.
+
+    Args:
+        train (array): Indices of the training rows.
+        test (array): Indices of the test rows.
+        unseen (bool or str): Answer when a value has no edge.
+        options (dict): Parameters of build_decision_tree.
+
+    Returns:
+        dict: The results of the fold (see evaluate_fold).
+    '''
+    return evaluate_fold(parallel.worker_dataset[0], train, test, unseen, **options)
+
+
+def cross_validate(mushrooms, splits: list[tuple] = None, n_jobs: int = 1, unseen = 'majority', **options) -> dict:
+    '''
+    Evaluates the decision tree on several splits of a dataset, trained at
+    the same time by a pool of processes if n_jobs isn't 1.
+
+    Args:
+        mushrooms (list or Dataset): The dataset.
+        splits (list): The training and test rows of every fold, 5 folds of kfold_splits if None.
+        n_jobs (int): Number of worker processes, one per CPU if None.
+        unseen (bool or str): Answer when a value has no edge (see compiled.predict_batch).
+        **options: Parameters of build_decision_tree (max_depth, min_samples, backend).
+
+    Returns:
+        dict: The results of every fold, the mean and standard deviation of the accuracy, the total confusion
+        matrix and the total duration.
+    '''
+    dataset = Dataset.from_mushrooms(mushrooms)
+    if splits is None:
+        splits = kfold_splits(dataset)
+    n_jobs = min(n_jobs or os.cpu_count(), len(splits))
+
+    start = perf_counter()
+    if n_jobs == 1:
+        folds = [evaluate_fold(dataset, train, test, unseen, **options) for train, test in splits]
+    else:
+        with SharedDataset(dataset) as shared, \
+             ProcessPoolExecutor(n_jobs, initializer = parallel.init_worker, initargs = (shared.descriptor_,)) as pool:
+            futures = [pool.submit(evaluate_worker_fold, train, test, unseen, options) for train, test in splits]
+            folds = [future.result() for future in futures]
+    seconds = perf_counter() - start
+
+    accuracies = [fold['accuracy'] for fold in folds]
+    mean = sum(accuracies) / len(accuracies)
+    confusion = {actual: {predicted: sum(fold['confusion'][actual][predicted] for fold in folds)
+                          for predicted in CLASSES + ('unknown',)} for actual in CLASSES}
+    return {
+        'folds': folds,
+        'accuracy': mean,
+        'accuracy_std': (sum((accuracy - mean) ** 2 for accuracy in accuracies) / len(accuracies)) ** 0.5,
+        'confusion': confusion,
+        'seconds': seconds,
+    }
+
+
+def summary(report: dict) -> str:
+    '''
+    Builds a summary table of an evaluation.
+
+    Args:
+        report (dict): The result of cross_validate.
+
+    Returns:
+        str: The table.
+    '''
+    lines = [f'{"fold":>5}{"train":>9}{"test":>8}{"nodes":>7}{"accuracy":>10}{"train ms":>10}{"predict ms":>12}']
+    for i, fold in enumerate(report['folds']):
+        lines.append(f'{i + 1:>5}{fold["train_rows"]:>9}{fold["test_rows"]:>8}{fold["nodes"]:>7}{fold["accuracy"]:>10.4f}'
+                     f'{fold["train_seconds"] * 1000:>10.2f}{fold["predict_seconds"] * 1000:>12.2f}')
+    lines.append(f'accuracy {report["accuracy"]:.4f} (std {report["accuracy_std"]:.4f}), {report["seconds"]:.2f} s')
+    lines.append('')
+    lines.append(f'{"actual / predicted":<20}' + ''.join(f'{predicted:>11}' for predicted in CLASSES + ('unknown',)))
+    for actual, counts in report['confusion'].items():
+        lines.append(f'{actual:<20}' + ''.join(f'{count:>11}' for count in counts.values()))
+    return '\n'.join(lines)
+
+
+def main():
+    '''
+    Evaluates the decision tree of a dataset.
+    '''
+    parser = argparse.ArgumentParser(description = 'Cross-validation of the mushroom decision tree.')
+    parser.add_argument('dataset', nargs = '?', default = 'mushrooms.csv', help = 'CSV file of the mushrooms')
+    parser.add_argument('--folds', type = int, default = 5, help = 'number of folds')
+    parser.add_argument('--holdout', type = float, help = 'proportion of the mushrooms kept for a single test instead of folds')
+    parser.add_argument('--seed', type = int, default = 0, help = 'seed of the shuffling of the mushrooms')
+    parser.add_argument('--jobs', type = int, default = None, help = 'number of worker processes, one per CPU by default')
+    parser.add_argument('--max-depth', type = int, default = None, help = 'maximal depth of the trees')
+    parser.add_argument('--min-samples', type = int, default = 2, help = 'minimal number of mushrooms of a split node')
+    parser.add_argument('--output', help = 'JSON file of the results')
+    args = parser.parse_args()
+
+    dataset = load_dataset(args.dataset)
+    if args.holdout is not None:
+        splits = holdout_split(dataset, args.holdout, args.seed)
+    else:
+        splits = kfold_splits(dataset, args.folds, args.seed)
+    report = cross_validate(dataset, splits, args.jobs, max_depth = args.max_depth, min_samples = args.min_samples)
+    print(summary(report))
+    if args.output:
+        with open(args.output, 'w', encoding = 'utf-8') as f:
+            json.dump(report, f, indent = 2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+"""
+Random forest of decision trees. Every tree is built by the usual ID3 code
+(build_subtree) on a bootstrap sample of the rows, drawn with replacement,
+and on a random subset of the attributes, and the forest classifies a
+mushroom by the majority vote of its trees. The subset of attributes is
+drawn once per tree (random subspace), not at every split like Breiman's
+random forests, so that the trees are built by build_subtree unchanged and
+stay identical to a single tree of the same rows and attributes. The trees
+are compiled into arrays sharing the attributes and the vocabularies of
+the dataset, so a tree only costs its arrays. With several processes, the
+columns of the dataset are shared with them once (see parallel.py), and
+every tree is drawn by its worker from a seed, so only the seeds and the
+arrays of the finished trees go through the pool and the forest is the
+same whatever the number of processes.
+Run with: python forest.py [mushrooms.csv] [--trees 50] [--jobs 4] [--holdout 0.2]
+"""
+
+
+import argparse
+import os
+import random
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from operator import add
+from time import perf_counter
+
+import parallel
+from compiled import CompiledTree, compile_tree, predict_batch
+from parallel import SharedDataset
+from project import Dataset, Mushroom, build_subtree, load_dataset
+
+
+class RandomForest:
+    '''
+    Represents a bagged ensemble of decision trees voting for the edibility.
+
+    Attributes:
+        n_trees_ (int): Number of trees.
+        max_features_ (int): Number of attributes drawn for every tree, half of them if None.
+        sample_size_ (int): Number of rows drawn for every tree, as many as the dataset if None.
+        seed_ (int): Seed of the draws.
+        n_jobs_ (int): Number of worker processes training the trees, one per CPU if None.
+        options_ (dict): Parameters of every tree: max_depth, min_samples, min_gain.
+        attributes_ (list): Names of the attributes, shared by the trees.
+        vocabularies_ (list): For each attribute, the list of its values, shared by the trees.
+        trees_ (list): The compiled trees, empty before training.
+    '''
+
+    def __init__(self, n_trees: int = 50, max_features: int = None, sample_size: int = None, seed: int = 0,
+                 n_jobs: int = None, max_depth: int = None, min_samples: int = 2, min_gain: float = 0.0):
+        '''
+        Initializes an untrained RandomForest object.
+
+        Args:
+            n_trees (int): Number of trees.
+            max_features (int): Number of attributes drawn for every tree, half of them if None.
+            sample_size (int): Number of rows drawn for every tree, as many as the dataset if None.
+            seed (int): Seed of the draws.
+            n_jobs (int): Number of worker processes training the trees, one per CPU if None, 1 to train in the main process.
+            max_depth (int): Depth from which the nodes become leaves of their majority class, no limit if None.
+            min_samples (int): Minimal number of mushrooms of a node to split it.
+            min_gain (float): Minimal information gain of a split.
+
+        Returns:
+            None
+        '''
+        if n_trees < 1:
+            raise ValueError('A forest needs at least one tree')
+        self.n_trees_ = n_trees
+        self.max_features_ = max_features
+        self.sample_size_ = sample_size
+        self.seed_ = seed
+        self.n_jobs_ = n_jobs
+        self.options_ = {'max_depth': max_depth, 'min_samples': min_samples, 'min_gain': min_gain}
+        self.attributes_ = []
+        self.vocabularies_ = []
+        self.trees_ = []
+
+
+    def __len__(self) -> int:
+        return len(self.trees_)
+
+
+    def train(self, mushrooms) -> 'RandomForest':
+        '''
+        Builds the trees of the forest.
+
+        Args:
+            mushrooms (list or Dataset): The mushrooms to learn from.
+
+        Returns:
+            RandomForest: The forest itself.
+        '''
+        dataset = Dataset.from_mushrooms(mushrooms)
+        #the rows of a view are sent to the workers, the full dataset being shared
+        rows = None if dataset.rows_ is None else array('I', dataset.rows_)
+        size = len(dataset) if rows is None else len(rows)
+        if size == 0:
+            raise ValueError('Cannot train a forest without mushrooms')
+        sample_size = self.sample_size_ or size
+        max_features = self.max_features_ or max(1, len(dataset.attributes_) // 2)
+        max_features = min(max_features, len(dataset.attributes_))
+        rng = random.Random(self.seed_)
+        seeds = [rng.getrandbits(32) for _ in range(self.n_trees_)]
+        n_jobs = min(self.n_jobs_ or os.cpu_count(), self.n_trees_)
+
+        if n_jobs == 1:
+            arrays = [grow_tree(dataset, rows, seed, sample_size, max_features, self.options_) for seed in seeds]
+        else:
+            with SharedDataset(dataset) as shared, \
+                 ProcessPoolExecutor(n_jobs, initializer = parallel.init_worker, initargs = (shared.descriptor_,)) as pool:
+                futures = [pool.submit(grow_worker_tree, rows, seed, sample_size, max_features, self.options_)
+                           for seed in seeds]
+                arrays = [future.result() for future in futures]
+
+        self.attributes_ = list(dataset.attributes_)
+        self.vocabularies_ = [list(vocabulary) for vocabulary in dataset.vocabularies_]
+        codes = [{value: code for code, value in enumerate(vocabulary)} for vocabulary in self.vocabularies_]
+        self.trees_ = []
+        for features, leaves, offsets, children, samples, edibles in arrays:
+            #every tree shares the lists of the forest instead of copying them
+            tree = CompiledTree.__new__(CompiledTree)
+            tree.attributes_ = self.attributes_
+            tree.vocabularies_ = self.vocabularies_
+            tree.features_, tree.leaves_, tree.offsets_, tree.children_ = features, leaves, offsets, children
+            tree.samples_, tree.edibles_ = samples, edibles
+            tree.codes_ = codes
+            tree.edge_codes_ = None
+            self.trees_.append(tree)
+        return self
+
+
+    def get_votes(self, batch) -> list:
+        '''
+        Counts the trees voting edible for every mushroom of a batch. A tree
+        which doesn't know a value of a mushroom votes for the majority class
+        of the node where it stops.
+
+        Args:
+            batch (Dataset or list): The mushrooms to classify.
+
+        Returns:
+            list: For each mushroom, the number of trees classifying it as edible.
+        '''
+        if not self.trees_:
+            raise ValueError('The forest is not trained')
+        batch = Dataset.from_mushrooms(batch)
+        #the trees share their vocabularies, so the codes of the batch are translated once for all of them
+        remaps = self.trees_[0].get_remaps(batch)
+        try:
+            import numpy as np
+        except ImportError:
+            votes = [0] * len(batch)
+            for tree in self.trees_:
+                votes = list(map(add, votes, predict_batch(tree, batch, 'majority', remaps)))
+            return votes
+        votes = np.zeros(len(batch), dtype = np.int32)
+        for tree in self.trees_:
+            votes += np.frombuffer(predict_batch(tree, batch, 'majority', remaps), dtype = np.int8)
+        return votes.tolist()
+
+
+    def predict_batch(self, batch) -> array:
+        '''
+        Classifies a batch of mushrooms by the majority vote of the trees, poisonous on a tie.
+
+        Args:
+            batch (Dataset or list): The mushrooms to classify.
+
+        Returns:
+            array: For each mushroom, 1 if it is edible, 0 if it is poisonous.
+        '''
+        return array('b', [2 * votes > len(self.trees_) for votes in self.get_votes(batch)])
+
+
+    def predict_proba(self, batch) -> list[float]:
+        '''
+        Computes the share of the trees classifying the mushrooms of a batch as edible.
+
+        Args:
+            batch (Dataset or list): The mushrooms to classify.
+
+        Returns:
+            list: For each mushroom, the share of edible votes.
+        '''
+        return [votes / len(self.trees_) for votes in self.get_votes(batch)]
+
+
+    def is_edible(self, mushroom: Mushroom) -> bool:
+        '''
+        Checks if a single mushroom is edible by going down every tree.
+
+        Args:
+            mushroom (Mushroom): The mushroom to check, which can be a row of a Dataset.
+
+        Returns:
+            bool: True if most of the trees classify the mushroom as edible.
+        '''
+        if not self.trees_:
+            raise ValueError('The forest is not trained')
+        def get_value(feature: int) -> str:
+            return mushroom.get_attribute(self.attributes_[feature])
+
+        votes = sum(tree.trace(get_value, 'majority')[0] for tree in self.trees_)
+        return 2 * votes > len(self.trees_)
+
+
+def grow_tree(dataset: Dataset, rows: array, seed: int, sample_size: int, max_features: int, options: dict) -> tuple:
+    '''
+    Builds and compiles a tree of the forest.
+
+    Args:
+        dataset (Dataset): The dataset.
+        rows (array): Indices of the rows to draw from, every row of the dataset if None.
+        seed (int): Seed of the draws of the tree.
+        sample_size (int): Number of rows drawn with replacement.
+        max_features (int): Number of attributes drawn without replacement.
+        options (dict): Parameters of build_subtree (max_depth, min_samples, min_gain).
+
+    Returns:
+        tuple: The features, leaves, offsets, children, samples and edibles arrays of the compiled tree.
+    '''
+    rng = random.Random(seed)
+    population = range(len(dataset)) if rows is None else rows
+    #sorted rows are read in the order of the columns
+    sample = array('I', sorted(rng.choices(population, k = sample_size)))
+    attributes = sorted(rng.sample(range(len(dataset.attributes_)), max_features))
+    tree = compile_tree(build_subtree(dataset, sample, attributes = attributes, **options), dataset)
+    return tree.features_, tree.leaves_, tree.offsets_, tree.children_, tree.samples_, tree.edibles_
+
+
+def grow_worker_tree(rows: array, seed: int, sample_size: int, max_features: int, options: dict) -> tuple:
+    '''
+    Builds and compiles a tree of the forest in a worker process, over its shared dataset.
+
+    Args:
+        rows (array): Indices of the rows to draw from, every row if None.
+        seed (int): Seed of the draws of the tree.
+        sample_size (int): Number of rows drawn with replacement.
+        max_features (int): Number of attributes drawn without replacement.
+        options (dict): Parameters of build_subtree.
+
+    Returns:
+        tuple: The arrays of the compiled tree (see grow_tree).
+    '''
+    return grow_tree(parallel.worker_dataset[0], rows, seed, sample_size, max_features, options)
+
+
+def main():
+    '''
+    Compares a random forest with a single tree on a held-out part of a dataset.
+    '''
+    from evaluation import holdout_split
+
+    parser = argparse.ArgumentParser(description = 'Random forest of mushroom decision trees.')
+    parser.add_argument('dataset', nargs = '?', default = 'mushrooms.csv', help = 'CSV file of the mushrooms')
+    parser.add_argument('--trees', type = int, default = 50, help = 'number of trees')
+    parser.add_argument('--max-features', type = int, default = None, help = 'number of attributes of every tree, half of them by default')
+    parser.add_argument('--holdout', type = float, default = 0.2, help = 'proportion of the mushrooms kept for the test')
+    parser.add_argument('--seed', type = int, default = 0, help = 'seed of the split and of the forest')
+    parser.add_argument('--jobs', type = int, default = None, help = 'number of worker processes, one per CPU by default')
+    parser.add_argument('--max-depth', type = int, default = None, help = 'maximal depth of the trees')
+    parser.add_argument('--min-samples', type = int, default = 2, help = 'minimal number of mushrooms of a split node')
+    args = parser.parse_args()
+
+    dataset = load_dataset(args.dataset)
+    [(train, test)] = holdout_split(dataset, args.holdout, args.seed)
+    test_set = dataset.subset(test)
+    labels = [dataset.labels_[row] for row in test]
+
+    def accuracy(predictions) -> float:
+        return sum(prediction == label for prediction, label in zip(predictions, labels)) / len(labels)
+
+    start = perf_counter()
+    tree = compile_tree(build_subtree(dataset, train, max_depth = args.max_depth, min_samples = args.min_samples), dataset)
+    trained = perf_counter()
+    predictions = predict_batch(tree, test_set, 'majority')
+    print(f'single tree: {len(tree)} nodes, accuracy {accuracy(predictions):.4f}, '
+          f'train {trained - start:.2f} s, predict {perf_counter() - trained:.3f} s')
+
+    start = perf_counter()
+    forest = RandomForest(args.trees, args.max_features, seed = args.seed, n_jobs = args.jobs,
+                          max_depth = args.max_depth, min_samples = args.min_samples).train(dataset.subset(train))
+    trained = perf_counter()
+    predictions = forest.predict_batch(test_set)
+    nodes = sum(len(tree) for tree in forest.trees_)
+    print(f'forest of {len(forest)} trees: {nodes} nodes, accuracy {accuracy(predictions):.4f}, '
+          f'train {trained - start:.2f} s, predict {perf_counter() - trained:.3f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+"""
+Incremental learning of the decision tree, in the spirit of ID5R/ITI. Every
+node keeps the counts of its contingency table, so that new mushrooms only
+update the counts of the nodes they go through, and only the leaves keep
+the rows reaching them, so the rows are stored once whatever the depth of
+the tree. The attribute of a node is chosen again from its updated counts
+and only the subtrees whose attribute changes are split again, from the
+rows of their leaves. With the same stopping rules (max_depth, min_samples,
+min_gain), the tree is always the one build_decision_tree would build from
+every mushroom seen so far.
+"""
+
+
+from array import array
+from collections import deque
+from itertools import chain, compress
+
+from project import (Dataset, Node, choose_split_attribute, get_contingency_table, get_majority,
+                     partition_rows)
+
+
+class NodeStatistics:
+    '''
+    Statistics kept for a node of an incremental tree.
+
+    Attributes:
+        node_ (Node): The node of the decision tree.
+        depth_ (int): The depth of the node.
+        rows_ (array or range): Indices of the rows reaching a leaf, in increasing order, None for the other nodes.
+        table_ (list): The contingency table of the rows, None for a pure leaf or a leaf stopped by max_depth or min_samples.
+        split_attr_ (int): The index of the splitting attribute, None for a leaf.
+        children_ (dict): Dictionary mapping value codes of the splitting attribute to the statistics of the children.
+    '''
+
+    __slots__ = ('node_', 'depth_', 'rows_', 'table_', 'split_attr_', 'children_')
+
+    def __init__(self, node: Node, depth: int, rows: array, table: list[dict] = None, split_attr: int = None):
+        '''
+        Initializes a NodeStatistics object.
+
+        Args:
+            node (Node): The node of the decision tree, with its counts.
+            depth (int): The depth of the node.
+            rows (array): Indices of the rows reaching the node.
+            table (list): The contingency table of the rows, None if the node isn't split for another reason than its gains.
+            split_attr (int): The index of the splitting attribute, None for a leaf.
+
+        Returns:
+            None
+        '''
+        self.node_ = node
+        self.depth_ = depth
+        self.rows_ = rows
+        self.table_ = table
+        self.split_attr_ = split_attr
+        self.children_ = {}
+
+
+class IncrementalTree:
+    '''
+    Decision tree updated with new mushrooms instead of being rebuilt.
+
+    Attributes:
+        dataset_ (Dataset): Every mushroom seen so far.
+        options_ (dict): The stopping rules of the tree: max_depth, min_samples, min_gain.
+        root_ (NodeStatistics): The statistics of the root.
+        rebuilt_ (int): Number of rows split again from scratch by the last update.
+    '''
+
+    def __init__(self, mushrooms, max_depth: int = None, min_samples: int = 2, min_gain: float = 0.0):
+        '''
+        Initializes an IncrementalTree object by building the tree of a dataset.
+        The dataset is copied, so that the original one isn't changed by the updates.
+
+        Args:
+            mushrooms (list or Dataset): The mushrooms to learn from.
+            max_depth (int): Depth from which the nodes become leaves of their majority class, no limit if None.
+            min_samples (int): Minimal number of mushrooms of a node to split it.
+            min_gain (float): Minimal information gain of a split.
+
+        Returns:
+            None
+        '''
+        dataset = Dataset.from_mushrooms(mushrooms)
+        if dataset.rows_ is None:
+            columns = [array(column.typecode, column) for column in dataset.columns_]
+            labels = bytearray(dataset.labels_)
+        else:
+            columns = [array(column.typecode, map(column.__getitem__, dataset.rows_)) for column in dataset.columns_]
+            labels = bytearray(map(dataset.labels_.__getitem__, dataset.rows_))
+        self.dataset_ = Dataset.from_columns(dataset.attributes_, dataset.vocabularies_, columns, labels)
+        self.options_ = {'max_depth': max_depth, 'min_samples': min_samples, 'min_gain': min_gain}
+        self.root_ = self.build(self.dataset_.row_indices(), 0)
+        self.rebuilt_ = len(self.dataset_)
+
+
+    @property
+    def tree_(self) -> Node:
+        return self.root_.node_
+
+
+    def __len__(self) -> int:
+        return len(self.dataset_)
+
+
+    def is_stopped(self, depth: int, samples: int) -> bool:
+        '''
+        Checks if a node is a leaf because of max_depth or min_samples, like in build_subtree.
+
+        Args:
+            depth (int): The depth of the node.
+            samples (int): Number of rows reaching the node.
+
+        Returns:
+            bool: True if the node can't be split whatever its rows.
+        '''
+        max_depth = self.options_['max_depth']
+        return (max_depth is not None and depth >= max_depth) or samples < self.options_['min_samples']
+
+
+    def make_node(self, rows: array, depth: int) -> NodeStatistics:
+        '''
+        Chooses the attribute of a subset of rows, like build_subtree.
+
+        Args:
+            rows (array): Indices of the rows of the subset.
+            depth (int): The depth of the node.
+
+        Returns:
+            NodeStatistics: The statistics of the node, which has no child yet.
+        '''
+        dataset = self.dataset_
+        edible_rows = list(compress(rows, map(dataset.labels_.__getitem__, rows)))
+        edibles = len(edible_rows)
+        majority = get_majority(edibles, len(rows))
+        if edibles == len(rows) or edibles == 0 or self.is_stopped(depth, len(rows)):
+            return NodeStatistics(Node('Yes' if majority else 'No', True, samples = len(rows), edibles = edibles), depth, rows)
+
+        table = get_contingency_table(dataset, rows, edible_rows)
+        split_attr = choose_split_attribute(table, edibles, len(rows), self.options_['min_gain'])
+        if split_attr is None:
+            #identical mushrooms with different edibility, or too small gain: keeping the majority
+            node = Node('Yes' if majority else 'No', True, samples = len(rows), edibles = edibles)
+        else:
+            node = Node(dataset.attributes_[split_attr], majority = majority, samples = len(rows), edibles = edibles)
+        return NodeStatistics(node, depth, rows, table, split_attr)
+
+
+    def build(self, rows: array, depth: int) -> NodeStatistics:
+        '''
+        Builds the subtree of a subset of rows with its statistics.
+
+        Args:
+            rows (array or range): Indices of the rows of the subset, in increasing order.
+            depth (int): The depth of the subtree's root.
+
+        Returns:
+            NodeStatistics: The statistics of the root of the subtree.
+        '''
+        root = self.make_node(rows, depth)
+        pending = [root]
+        while pending:
+            statistics = pending.pop()
+            if statistics.split_attr_ is None:
+                continue
+            vocabulary = self.dataset_.vocabularies_[statistics.split_attr_]
+            for code, subset in partition_rows(self.dataset_, statistics.rows_, statistics.split_attr_).items():
+                child = statistics.children_[code] = self.make_node(subset, statistics.depth_ + 1)
+                statistics.node_.add_edge(vocabulary[code], child.node_)
+                pending.append(child)
+            #only the leaves keep their rows
+            statistics.rows_ = None
+        return root
+
+
+    def get_rows(self, statistics: NodeStatistics) -> array:
+        '''
+        Gathers the rows reaching a node from the leaves of its subtree.
+
+        Args:
+            statistics (NodeStatistics): The statistics of the node.
+
+        Returns:
+            array: Indices of the rows, in increasing order.
+        '''
+        leaves = []
+        pending = [statistics]
+        while pending:
+            statistics = pending.pop()
+            if statistics.rows_ is not None:
+                leaves.append(statistics.rows_)
+            pending.extend(statistics.children_.values())
+        #every leaf is sorted, so the sort only merges them
+        return array('I', sorted(chain.from_iterable(leaves)))
+
+
+    def append(self, mushrooms) -> array:
+        '''
+        Adds mushrooms at the end of the dataset.
+
+        Args:
+            mushrooms (list or Dataset): The new mushrooms, with the same attributes.
+
+        Returns:
+            array: Indices of the new rows.
+        '''
+        batch = Dataset.from_mushrooms(mushrooms)
+        start = len(self.dataset_)
+        rows = batch.row_indices()
+        columns = []
+        for name in self.dataset_.attributes_:
+            attribute = batch.attribute_index(name)
+            vocabulary, column = batch.vocabularies_[attribute], batch.columns_[attribute]
+            columns.append([vocabulary[column[row]] for row in rows])
+        self.dataset_.extend([batch.labels_[row] for row in rows], columns)
+        return array('I', range(start, len(self.dataset_)))
+
+
+    def update(self, mushrooms) -> Node:
+        '''
+        Learns new mushrooms. The counts of the nodes they reach are updated
+        and a node is split again from its rows only if its splitting
+        attribute, or its class for a leaf, changes.
+
+        Args:
+            mushrooms (list or Dataset): The new mushrooms, with the same attributes.
+
+        Returns:
+            Node: The root node of the updated decision tree.
+        '''
+        dataset = self.dataset_
+        min_gain = self.options_['min_gain']
+        self.rebuilt_ = 0
+        #(parent statistics, value code leading to the node, node statistics, new rows of the node)
+        pending = deque([(None, None, self.root_, self.append(mushrooms))])
+        while pending:
+            parent, code, statistics, rows = pending.pop()
+            if not rows:
+                continue
+            node = statistics.node_
+            edible_rows = list(compress(rows, map(dataset.labels_.__getitem__, rows)))
+            node.samples_ += len(rows)
+            node.edibles_ += len(edible_rows)
+            total, edibles = node.samples_, node.edibles_
+            majority = get_majority(edibles, total)
+
+            if statistics.table_ is not None:
+                for counts, new_counts in zip(statistics.table_, get_contingency_table(dataset, rows, edible_rows)):
+                    for value, (n, value_edibles) in new_counts.items():
+                        old_n, old_edibles = counts.get(value, (0, 0))
+                        counts[value] = (old_n + n, old_edibles + value_edibles)
+                split_attr = choose_split_attribute(statistics.table_, edibles, total, min_gain)
+            elif edibles in (0, total) or self.is_stopped(statistics.depth_, total):
+                split_attr = None
+            else:
+                #a pure leaf receiving the other class, or a leaf reaching min_samples
+                split_attr = -1
+
+            if statistics.rows_ is not None:
+                #a leaf stays a leaf of its majority class as long as no attribute splits it
+                if isinstance(statistics.rows_, range):
+                    statistics.rows_ = array('I', statistics.rows_)
+                statistics.rows_.extend(rows)
+                if split_attr is None:
+                    node.criterion_, node.majority_ = 'Yes' if majority else 'No', majority
+                else:
+                    self.replace(parent, code, statistics, statistics.rows_)
+                continue
+            if split_attr != statistics.split_attr_:
+                #the new rows come after the old ones
+                self.replace(parent, code, statistics, self.get_rows(statistics) + rows)
+                continue
+
+            #same attribute: the new rows go down to the children
+            node.majority_ = majority
+            vocabulary = dataset.vocabularies_[split_attr]
+            for value, subset in partition_rows(dataset, rows, split_attr).items():
+                child = statistics.children_.get(value)
+                if child is None:
+                    #new value, whose rows are all new
+                    child = statistics.children_[value] = self.build(subset, statistics.depth_ + 1)
+                    node.add_edge(vocabulary[value], child.node_)
+                    self.rebuilt_ += len(subset)
+                else:
+                    pending.append((statistics, value, child, subset))
+
+        return self.tree_
+
+
+    def replace(self, parent: NodeStatistics, code: int, statistics: NodeStatistics, rows: array) -> None:
+        '''
+        Builds again the subtree of a node from its rows.
+
+        Args:
+            parent (NodeStatistics): The statistics of the parent, None for the root.
+            code (int): The value code of the parent's attribute leading to the node.
+            statistics (NodeStatistics): The statistics of the node.
+            rows (array): Indices of every row reaching the node, in increasing order.
+
+        Returns:
+            None
+        '''
+        subtree = self.build(rows, statistics.depth_)
+        self.rebuilt_ += len(rows)
+        if parent is None:
+            self.root_ = subtree
+        else:
+            parent.children_[code] = subtree
+            parent.node_.replace_child(self.dataset_.vocabularies_[parent.split_attr_][code], subtree.node_)
@@ -0,0 +1,183 @@
+"""
+Binary format of the decision tree, so that it doesn't have to be rebuilt
+from the dataset on every start. A model file contains the arrays of the
+compiled tree and the vocabularies:
+
+    header       magic, version, number of nodes, number of children, size of the vocabularies
+    vocabularies attributes and vocabularies, as UTF-8 JSON
+    features     int32 per node
+    leaves       int8 per node
+    offsets      int64 per node
+    children     int32 per (node, value code)
+    samples      int64 per node, training mushrooms reaching it (-1 if unknown)
+    edibles      int64 per node, edible training mushrooms reaching it (-1 if unknown)
+
+Every array starts on a multiple of 8 bytes and is stored in little-endian
+order. The model can be loaded through mmap, in which case the arrays are
+read from the file itself and the processes loading the same model share
+one copy of it in the page cache. The files of version 1, without the
+counts, are still read, their probabilities being unknown.
+"""
+
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from compiled import CompiledTree, compile_tree
+
+
+MAGIC = b'MUSHTREE'
+VERSION = 2
+HEADER = struct.Struct('<8sHxxIQQ')
+
+#name of the array in CompiledTree, typecode and size of an item
+LAYOUT = [('features_', 'i', 4), ('leaves_', 'b', 1), ('offsets_', 'q', 8), ('children_', 'i', 4),
+          ('samples_', 'q', 8), ('edibles_', 'q', 8)]
+#number of arrays of the files of every version
+ARRAYS = {1: 4, 2: 6}
+
+
+def padding(size: int) -> int:
+    '''
+    Computes the number of bytes needed to reach the next multiple of 8.
+
+    Args:
+        size (int): The current size.
+
+    Returns:
+        int: The number of padding bytes.
+    '''
+    return -size % 8
+
+
+def save_model(tree, path: str, dataset = None) -> None:
+    '''
+    Saves a decision tree in the binary format.
+
+    Args:
+        tree (CompiledTree or Node): The tree, compiled first if it is a Node.
+        path (str): The path of the model file.
+        dataset (Dataset): The dataset the tree was built from, whose vocabularies are saved with a Node.
+
+    Returns:
+        None
+    '''
+    import json #imported only when needed
+
+    if not isinstance(tree, CompiledTree):
+        tree = compile_tree(tree, dataset)
+    vocabularies = json.dumps({'attributes': tree.attributes_, 'vocabularies': tree.vocabularies_}).encode('utf-8')
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(tree), len(tree.children_), len(vocabularies)))
+        f.write(vocabularies)
+        f.write(bytes(padding(HEADER.size + len(vocabularies))))
+        for name, typecode, itemsize in LAYOUT:
+            values = array(typecode, getattr(tree, name))
+            if sys.byteorder == 'big':
+                values.byteswap()
+            f.write(values.tobytes())
+            f.write(bytes(padding(len(values) * itemsize)))
+
+
+def load_model(path: str, use_mmap: bool = True) -> CompiledTree:
+    '''
+    Loads a decision tree saved with save_model.
+
+    Args:
+        path (str): The path of the model file.
+        use_mmap (bool): Indicates if the arrays are read from the file through mmap instead of being copied in memory.
+
+    Returns:
+        CompiledTree: The tree, whose arrays are read-only if use_mmap is True.
+    '''
+    import json #imported only when needed
+
+    with open(path, 'rb') as f:
+        if use_mmap and sys.byteorder == 'little':
+            buffer = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        else:
+            buffer = f.read()
+
+    view = memoryview(buffer)
+    if len(view) < HEADER.size:
+        raise ValueError(f'{path} is not a model file')
+    magic, version, nodes, children, size = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError(f'{path} is not a model file')
+    if version not in ARRAYS:
+        raise ValueError(f'{path} has version {version}, only versions up to {VERSION} are supported')
+
+    offset = HEADER.size
+    if offset + size > len(view):
+        raise ValueError(f'{path} is truncated')
+    vocabularies = json.loads(bytes(view[offset:offset + size]).decode('utf-8'))
+    offset += size + padding(HEADER.size + size)
+    tree = CompiledTree(vocabularies['attributes'], vocabularies['vocabularies'])
+    for name, typecode, itemsize in LAYOUT[:ARRAYS[version]]:
+        length = (children if name == 'children_' else nodes) * itemsize
+        if offset + length > len(view):
+            raise ValueError(f'{path} is truncated')
+        values = view[offset:offset + length].cast(typecode)
+        if isinstance(buffer, bytes):
+            values = array(typecode, values)
+            if sys.byteorder == 'big':
+                values.byteswap()
+        setattr(tree, name, values)
+        offset += length + padding(length)
+    for name, typecode, _ in LAYOUT[ARRAYS[version]:]:
+        setattr(tree, name, array(typecode, [-1]) * nodes)
+    return tree
+
+
+def load_tree(path: str, cache: bool = False) -> CompiledTree:
+    '''
+    Loads a model file, or builds the tree of a CSV dataset. With cache, the
+    tree of a dataset is saved next to it (see cache_path) and loaded from
+    there as long as the dataset isn't modified.
+
+    Args:
+        path (str): The path of a model file saved with model_io.save_model, or of a dataset.
+        cache (bool): Indicates if the tree of a dataset is read from and saved to its cached model.
+
+    Returns:
+        CompiledTree: The flattened tree.
+    '''
+    try:
+        return load_model(path)
+    except ValueError:
+        pass
+    cached = cache_path(path)
+    if cache and os.path.exists(cached) and os.path.getmtime(cached) >= os.path.getmtime(path):
+        try:
+            return load_model(cached)
+        except ValueError:
+            pass #rebuilt below
+    from project import build_decision_tree, load_dataset #imported only when needed
+
+    dataset = load_dataset(path)
+    tree = compile_tree(build_decision_tree(dataset), dataset)
+    if cache:
+        try:
+            #written aside then renamed, so that another process never reads half a model
+            save_model(tree, cached + '.tmp')
+            os.replace(cached + '.tmp', cached)
+        except OSError:
+            pass #read-only directory: the tree is rebuilt next time
+    return tree
+
+
+def cache_path(path: str) -> str:
+    '''
+    Gives the path of the cached model of a dataset.
+
+    Args:
+        path (str): The path of the dataset.
+
+    Returns:
+        str: The path of its model file, next to it.
+    '''
+    return path + '.model'
@@ -0,0 +1,158 @@
+"""
+NumPy version of the construction of the decision tree. The columns of the
+dataset are read as NumPy arrays without being copied, the counts of every
+(attribute, value) pair come from np.bincount and the subsets of the nodes
+are arrays of row indices.
+The information gains are computed with the same functions as the pure
+Python version, so both build exactly the same tree.
+"""
+
+
+from collections import deque
+
+import numpy as np
+
+from project import Dataset, Node, choose_split_attribute, get_majority
+
+
+DTYPES = {1: np.uint8, 2: np.uint16, 4: np.uint32, 8: np.uint64}
+
+
+def as_arrays(dataset: Dataset) -> tuple:
+    '''
+    Reads the columns and the labels of a dataset as NumPy arrays. The arrays
+    share the memory of the dataset, which can't grow while they are used.
+
+    Args:
+        dataset (Dataset): The dataset to read.
+
+    Returns:
+        tuple: The list of the columns and the array of the labels.
+    '''
+    columns = [np.frombuffer(column, dtype = DTYPES[column.itemsize]) for column in dataset.columns_]
+    labels = np.frombuffer(dataset.labels_, dtype = np.uint8)
+    return columns, labels
+
+
+def build_numpy_tree(dataset: Dataset, max_depth: int = None, min_samples: int = 2, breadth_first: bool = False,
+                     min_gain: float = 0.0) -> Node:
+    '''
+    Builds the decision tree of a dataset with NumPy.
+
+    Args:
+        dataset (Dataset): The dataset to learn from.
+        max_depth (int): Depth from which the nodes become leaves of their majority class, no limit if None.
+        min_samples (int): Minimal number of mushrooms of a node to split it.
+        breadth_first (bool): Indicates if the tree is built level by level.
+        min_gain (float): Minimal information gain of a split.
+
+    Returns:
+        Node: The root node of the decision tree.
+    '''
+    columns, labels = as_arrays(dataset)
+    rows = np.asarray(dataset.row_indices(), dtype = np.intp)
+    return build_numpy_subtree(dataset, columns, labels, rows, max_depth, min_samples, breadth_first, min_gain)
+
+
+def build_numpy_subtree(dataset: Dataset, columns: list, labels: np.ndarray, rows: np.ndarray, max_depth: int = None,
+                        min_samples: int = 2, breadth_first: bool = False, min_gain: float = 0.0) -> Node:
+    '''
+    Builds the subtree of a subset of rows, the subsets waiting to be split
+    being kept in a queue like in project.build_subtree.
+
+    Args:
+        dataset (Dataset): The dataset containing the rows.
+        columns (list): The columns of the dataset as NumPy arrays.
+        labels (np.ndarray): The labels of the dataset.
+        rows (np.ndarray): Indices of the rows of the subset.
+        max_depth (int): Depth from which the nodes become leaves of their majority class, no limit if None.
+        min_samples (int): Minimal number of mushrooms of a node to split it.
+        breadth_first (bool): Indicates if the subsets are split level by level.
+        min_gain (float): Minimal information gain of a split.
+
+    Returns:
+        Node: The root node of the subtree.
+    '''
+    root = None
+    pending = deque([(None, None, rows, 0)])
+    pop = pending.popleft if breadth_first else pending.pop
+    while pending:
+        parent, label, rows, depth = pop()
+        subsets = None
+
+        #leaves
+        row_labels = labels[rows].astype(bool)
+        edibles = int(np.count_nonzero(row_labels))
+        if edibles == len(rows) or edibles == 0:
+            node = Node('Yes' if edibles else 'No', True, samples = len(rows), edibles = edibles)
+        elif (max_depth is not None and depth >= max_depth) or len(rows) < min_samples:
+            node = Node('Yes' if get_majority(edibles, len(rows)) else 'No', True, samples = len(rows), edibles = edibles)
+
+        else:
+            #attribute choice
+            table = [get_numpy_counts(column[rows], row_labels, len(vocabulary))
+                     for column, vocabulary in zip(columns, dataset.vocabularies_)]
+            split_attr = choose_split_attribute(table, edibles, len(rows), min_gain)
+
+            if split_attr is None:
+                #identical mushrooms with different edibility, or too small gain: keeping the majority
+                node = Node('Yes' if get_majority(edibles, len(rows)) else 'No', True, samples = len(rows), edibles = edibles)
+            else:
+                node = Node(dataset.attributes_[split_attr], majority = get_majority(edibles, len(rows)),
+                            samples = len(rows), edibles = edibles)
+                subsets = partition_numpy_rows(rows, columns[split_attr][rows], table[split_attr])
+
+        if parent is None:
+            root = node
+        else:
+            parent.add_edge(label, node)
+
+        if subsets is not None:
+            vocabulary = dataset.vocabularies_[split_attr]
+            children = [(node, vocabulary[code], subset, depth + 1) for code, subset in subsets.items()]
+            pending.extend(children if breadth_first else reversed(children))
+
+    return root
+
+
+def get_numpy_counts(codes: np.ndarray, row_labels: np.ndarray, size: int) -> dict:
+    '''
+    Counts the mushrooms and the edible mushrooms of every value of an
+    attribute, in order of first appearance of the values.
+
+    Args:
+        codes (np.ndarray): The codes of the attribute for the rows of the subset.
+        row_labels (np.ndarray): The edibility of the rows of the subset.
+        size (int): The number of values of the attribute.
+
+    Returns:
+        dict: Dictionary mapping value codes to (mushrooms, edibles).
+    '''
+    totals = np.bincount(codes, minlength = size)
+    edibles = np.bincount(codes[row_labels], minlength = size)
+    present = np.flatnonzero(totals)
+    if len(present) > 64:
+        values, firsts = np.unique(codes, return_index = True)
+    else:
+        values, firsts = present, [int(np.argmax(codes == code)) for code in present]
+    order = sorted(zip(firsts, values.tolist()))
+    return {code: (int(totals[code]), int(edibles[code])) for _, code in order}
+
+
+def partition_numpy_rows(rows: np.ndarray, codes: np.ndarray, counts: dict) -> dict:
+    '''
+    Splits a subset of rows according to the codes of an attribute.
+
+    Args:
+        rows (np.ndarray): Indices of the rows of the subset.
+        codes (np.ndarray): The codes of the attribute for the rows of the subset.
+        counts (dict): The counts of the values, in order of first appearance.
+
+    Returns:
+        dict: Dictionary mapping value codes to arrays of row indices.
+    '''
+    #a stable sort keeps the rows of every value in their original order
+    order = np.argsort(codes, kind = 'stable')
+    sorted_rows = rows[order]
+    starts = np.searchsorted(codes[order], np.arange(codes.max() + 1))
+    return {code: sorted_rows[starts[code]:starts[code] + n] for code, (n, _) in counts.items()}
@@ -0,0 +1,249 @@
+"""
+Parallel construction of the decision tree. Once the splitting attribute of
+a node is chosen, its subsets are independent, so the big ones are built by
+a pool of processes while the small ones are built by the main process.
+The columns of the dataset are copied once into a shared memory block that
+every worker reads, so only row indices and finished subtrees go through
+the pool.
+"""
+
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from itertools import compress
+from multiprocessing.shared_memory import SharedMemory
+
+from project import (Dataset, Node, build_subtree, choose_split_attribute, get_contingency_table,
+                     get_majority, partition_rows)
+
+
+#dataset of the current worker process, attached once by its initializer
+worker_dataset = None
+
+
+class SharedDataset:
+    '''
+    Copy of the columns and labels of a dataset in a shared memory block.
+
+    Attributes:
+        shm_ (SharedMemory): The shared memory block.
+        descriptor_ (tuple): Everything a worker needs to rebuild the dataset from the block.
+    '''
+
+    def __init__(self, dataset: Dataset):
+        '''
+        Initializes a SharedDataset object by copying the dataset in shared memory.
+
+        Args:
+            dataset (Dataset): The dataset to share.
+
+        Returns:
+            None
+        '''
+        sizes = [len(column) * column.itemsize for column in dataset.columns_]
+        self.shm_ = SharedMemory(create = True, size = max(1, sum(sizes) + len(dataset.labels_)))
+        layout = []
+        offset = 0
+        for column, size in zip(dataset.columns_, sizes):
+            self.shm_.buf[offset:offset + size] = column.tobytes()
+            layout.append((column.typecode, offset, size))
+            offset += size
+        self.shm_.buf[offset:offset + len(dataset.labels_)] = bytes(dataset.labels_)
+        layout.append(('B', offset, len(dataset.labels_)))
+        self.descriptor_ = (self.shm_.name, dataset.attributes_, dataset.vocabularies_, layout)
+
+
+    def __enter__(self) -> 'SharedDataset':
+        return self
+
+
+    def __exit__(self, *args) -> None:
+        self.shm_.close()
+        self.shm_.unlink()
+
+
+def attach_dataset(descriptor: tuple) -> tuple:
+    '''
+    Rebuilds a dataset over a shared memory block without copying it.
+
+    Args:
+        descriptor (tuple): The descriptor of a SharedDataset.
+
+    Returns:
+        tuple: The dataset and the shared memory block, which must be kept open while the dataset is used.
+    '''
+    name, attributes, vocabularies, layout = descriptor
+    shm = SharedMemory(name = name)
+    views = [shm.buf[offset:offset + size].cast(typecode) for typecode, offset, size in layout]
+    return Dataset.from_columns(attributes, vocabularies, views[:-1], views[-1]), shm
+
+
+def init_worker(descriptor: tuple) -> None:
+    '''
+    Attaches the shared dataset in a worker process.
+
+    Args:
+        descriptor (tuple): The descriptor of a SharedDataset.
+
+    Returns:
+        None
+    '''
+    global worker_dataset
+    worker_dataset = attach_dataset(descriptor)
+
+
+def build_worker_subtree(rows, max_depth: int = None, min_samples: int = 2, min_gain: float = 0.0,
+                         depth: int = 1, attributes: list[int] = None) -> Node:
+    '''
+    Builds the subtree of a subset in a worker process.
+
+    Args:
+        rows (iterable): Indices of the rows of the subset.
+        max_depth (int): Depth from which the nodes become leaves, no limit if None.
+        min_samples (int): Minimal number of mushrooms of a node to split it.
+        min_gain (float): Minimal information gain of a split.
+        depth (int): The depth of the subtree's root.
+        attributes (list): Indices of the candidate attributes, every attribute if None.
+
+    Returns:
+        Node: The root node of the subtree.
+    '''
+    return build_subtree(worker_dataset[0], rows, depth = depth, max_depth = max_depth, min_samples = min_samples,
+                         attributes = attributes, min_gain = min_gain)
+
+
+def count_worker_attributes(rows, attributes: list) -> list[dict]:
+    '''
+    Counts the values of some attributes of a subset in a worker process.
+
+    Args:
+        rows (iterable): Indices of the rows of the subset.
+        attributes (list): Indices of the attributes to count.
+
+    Returns:
+        list: For each attribute, a dictionary mapping value codes to (mushrooms, edibles).
+    '''
+    dataset = worker_dataset[0]
+    edible_rows = list(compress(rows, map(dataset.labels_.__getitem__, rows)))
+    return get_contingency_table(dataset, rows, edible_rows, attributes)
+
+
+def split_subset(dataset: Dataset, rows, depth: int, attributes: list[int], table: list[dict] = None,
+                 max_depth: int = None, min_samples: int = 2, min_gain: float = 0.0) -> tuple:
+    '''
+    Builds a single node of the tree like build_subtree, without its children.
+
+    Args:
+        dataset (Dataset): The dataset containing the rows.
+        rows (iterable): Indices of the rows of the subset.
+        depth (int): The depth of the node.
+        attributes (list): Indices of the candidate attributes, in increasing order.
+        table (list): The contingency table of the candidates if it is already counted.
+        max_depth (int): Depth from which the nodes become leaves, no limit if None.
+        min_samples (int): Minimal number of mushrooms of a node to split it.
+        min_gain (float): Minimal information gain of a split.
+
+    Returns:
+        tuple: The node, and for each of its children the label of its edge, its rows, its depth and its candidate attributes.
+    '''
+    edible_rows = list(compress(rows, map(dataset.labels_.__getitem__, rows)))
+    edibles = len(edible_rows)
+    if edibles == len(rows) or edibles == 0:
+        return Node('Yes' if edibles else 'No', True, samples = len(rows), edibles = edibles), []
+    majority = get_majority(edibles, len(rows))
+    if (max_depth is not None and depth >= max_depth) or len(rows) < min_samples:
+        return Node('Yes' if majority else 'No', True, samples = len(rows), edibles = edibles), []
+    if table is None:
+        table = get_contingency_table(dataset, rows, edible_rows, attributes)
+    split_attr = choose_split_attribute(table, edibles, len(rows), min_gain)
+    if split_attr is None:
+        return Node('Yes' if majority else 'No', True, samples = len(rows), edibles = edibles), []
+
+    attribute = attributes[split_attr]
+    node = Node(dataset.attributes_[attribute], majority = majority, samples = len(rows), edibles = edibles)
+    vocabulary = dataset.vocabularies_[attribute]
+    candidates = [candidate for candidate, counts in zip(attributes, table) if len(counts) > 1 and candidate != attribute]
+    return node, [(vocabulary[code], subset, depth + 1, candidates)
+                  for code, subset in partition_rows(dataset, rows, attribute).items()]
+
+
+def build_parallel_tree(dataset: Dataset, n_jobs: int = None, threshold: int = 10000,
+                        parallel_root: bool = False, max_depth: int = None, min_samples: int = 2,
+                        min_gain: float = 0.0) -> Node:
+    '''
+    Builds the decision tree of a dataset with a pool of processes. The tree
+    is the same as the one built by build_decision_tree.
+    The main process splits the subsets of at least threshold rows level by
+    level until there are as many of them as workers. They are then built by
+    the pool while the main process builds the smaller ones. No process is
+    started if no subset is that big.
+
+    Args:
+        dataset (Dataset): The dataset to learn from.
+        n_jobs (int): Number of worker processes, one per CPU if None.
+        threshold (int): Minimal number of rows of a subtree to build it in a worker.
+        parallel_root (bool): Indicates if the attributes of the root are counted in parallel.
+        max_depth (int): Depth from which the nodes become leaves of their majority class, no limit if None.
+        min_samples (int): Minimal number of mushrooms of a node to split it.
+        min_gain (float): Minimal information gain of a split.
+
+    Returns:
+        Node: The root node of the decision tree.
+    '''
+    n_jobs = n_jobs or os.cpu_count()
+    rows = dataset.row_indices()
+    options = {'max_depth': max_depth, 'min_samples': min_samples, 'min_gain': min_gain}
+    if len(rows) < threshold:
+        return build_subtree(dataset, rows, **options)
+
+    with ExitStack() as stack:
+        pool = None
+
+        def start_pool() -> ProcessPoolExecutor:
+            shared = stack.enter_context(SharedDataset(dataset))
+            return stack.enter_context(ProcessPoolExecutor(n_jobs, initializer = init_worker,
+                                                           initargs = (shared.descriptor_,)))
+
+        attributes = list(range(len(dataset.attributes_)))
+        table = None
+        if parallel_root:
+            pool = start_pool()
+            chunks = [attributes[i::n_jobs] for i in range(n_jobs)]
+            futures = [pool.submit(count_worker_attributes, rows, chunk) for chunk in chunks if chunk]
+            table = [None] * len(attributes)
+            for chunk, future in zip(chunks, futures):
+                for attribute, counts in zip(chunk, future.result()):
+                    table[attribute] = counts
+
+        #every edge as [parent, label, child], in the order of the children of each parent
+        edges = []
+        root = None
+        big = deque([(None, rows, 0, attributes)])
+        small = []
+        while big and (root is None or len(big) < n_jobs):
+            edge, rows, depth, attributes = big.popleft()
+            node, children = split_subset(dataset, rows, depth, attributes, table, **options)
+            table = None
+            if edge is None:
+                root = node
+            else:
+                edge[2] = node
+            for label, subset, child_depth, candidates in children:
+                edges.append([node, label, None])
+                (big if len(subset) >= threshold else small).append((edges[-1], subset, child_depth, candidates))
+
+        #the big subsets are sent to the pool first, the small ones are built meanwhile
+        if big and pool is None:
+            pool = start_pool()
+        futures = [(edge, pool.submit(build_worker_subtree, rows, max_depth, min_samples, min_gain, depth, attributes))
+                   for edge, rows, depth, attributes in big]
+        for edge, rows, depth, attributes in small:
+            edge[2] = build_subtree(dataset, rows, depth = depth, attributes = attributes, **options)
+        for edge, future in futures:
+            edge[2] = future.result()
+
+    for parent, label, child in edges:
+        parent.add_edge(label, child)
+    return root
@@ -0,0 +1,173 @@
+"""
+Profile of the construction of the decision tree. build_decision_tree calls
+its on_node function with the statistics of every node it builds; a
+TrainingProfile collects them, forwards them to other callbacks and sums
+them up by depth and by splitting attribute, to tell if a slow training
+comes from the number of mushrooms, the depth of the tree or attributes
+with many values. Nothing is measured when no on_node function is given.
+Run with: python profiling.py [mushrooms.csv] [--output profile.json]
+"""
+
+
+import argparse
+import json
+from time import perf_counter
+
+from project import build_decision_tree, load_dataset
+
+
+#statistics summed up by the report and the summary table
+TIMES = ('counting_seconds', 'gain_seconds', 'partition_seconds')
+
+
+class TrainingProfile:
+    '''
+    Collector of the statistics of the nodes of a decision tree.
+
+    Attributes:
+        nodes_ (list): The statistics of every node, in the order they were built.
+        callbacks_ (list): Functions also called with the statistics of every node.
+        seconds_ (float): Duration of the whole construction, set by train.
+    '''
+
+    def __init__(self, callbacks: list = None):
+        '''
+        Initializes a TrainingProfile object.
+
+        Args:
+            callbacks (list): Functions also called with the statistics of every node.
+
+        Returns:
+            None
+        '''
+        self.nodes_ = []
+        self.callbacks_ = list(callbacks or [])
+        self.seconds_ = None
+
+
+    def __call__(self, statistics: dict) -> None:
+        self.nodes_.append(statistics)
+        for callback in self.callbacks_:
+            callback(statistics)
+
+
+    def train(self, mushrooms):
+        '''
+        Builds the decision tree of a dataset while profiling it.
+
+        Args:
+            mushrooms (list or Dataset): The dataset.
+
+        Returns:
+            Node: The root node of the decision tree.
+        '''
+        start = perf_counter()
+        tree = build_decision_tree(mushrooms, on_node = self)
+        self.seconds_ = perf_counter() - start
+        return tree
+
+
+    def group_by(self, key: str) -> dict:
+        '''
+        Sums up the statistics of the nodes sharing the same value of a key.
+
+        Args:
+            key (str): 'depth' or 'attribute'.
+
+        Returns:
+            dict: Dictionary mapping the values of the key to the number of nodes, the number of leaves,
+            the number of mushrooms, the number of candidate attributes and the times.
+        '''
+        groups = {}
+        for node in sorted(self.nodes_, key = lambda node: (node[key] is None, node[key] or 0)):
+            group = groups.setdefault(node[key], dict.fromkeys(('nodes', 'leaves', 'samples', 'candidates') + TIMES, 0))
+            group['nodes'] += 1
+            group['leaves'] += node['attribute'] is None
+            group['samples'] += node['samples']
+            group['candidates'] += node['candidates']
+            for time in TIMES:
+                group[time] += node[time]
+        return groups
+
+
+    def report(self) -> dict:
+        '''
+        Builds the structured report of the profile.
+
+        Returns:
+            dict: The totals, the statistics by depth and by attribute, and the statistics of every node.
+        '''
+        totals = {time: sum(node[time] for node in self.nodes_) for time in TIMES}
+        cardinalities = {node['attribute']: node['cardinality'] for node in self.nodes_ if node['attribute'] is not None}
+        by_attribute = self.group_by('attribute')
+        by_attribute.pop(None, None)
+        for attribute, group in by_attribute.items():
+            group['cardinality'] = cardinalities[attribute]
+        return {
+            'seconds': self.seconds_,
+            'nodes': len(self.nodes_),
+            'leaves': sum(node['attribute'] is None for node in self.nodes_),
+            'depth': max((node['depth'] for node in self.nodes_), default = 0),
+            'samples': self.nodes_[0]['samples'] if self.nodes_ else 0,
+            **totals,
+            'by_depth': self.group_by('depth'),
+            'by_attribute': by_attribute,
+            'nodes_statistics': self.nodes_,
+        }
+
+
+    def save(self, path: str) -> None:
+        '''
+        Writes the report of the profile in a JSON file.
+
+        Args:
+            path (str): The path of the JSON file.
+
+        Returns:
+            None
+        '''
+        with open(path, 'w', encoding = 'utf-8') as f:
+            json.dump(self.report(), f, indent = 2)
+
+
+    def summary(self) -> str:
+        '''
+        Builds a summary table of the profile, by depth then by splitting attribute.
+
+        Returns:
+            str: The table.
+        '''
+        report = self.report()
+        lines = [f'{report["nodes"]} nodes ({report["leaves"]} leaves), depth {report["depth"]}, '
+                 f'{report["samples"]} mushrooms'
+                 + ('' if report['seconds'] is None else f', {report["seconds"] * 1000:.2f} ms')]
+        header = f'{"nodes":>7}{"leaves":>7}{"samples":>10}{"candidates":>11}{"count ms":>10}{"gain ms":>10}{"split ms":>10}'
+        for key, groups in (('depth', report['by_depth']), ('attribute', report['by_attribute'])):
+            lines.append('')
+            lines.append(f'{key:<26}{header}')
+            for value, group in groups.items():
+                name = value if key == 'depth' else f'{value} ({group["cardinality"]})'
+                lines.append(f'{name:<26}{group["nodes"]:>7}{group["leaves"]:>7}{group["samples"]:>10}'
+                             f'{group["candidates"]:>11}' + ''.join(f'{group[time] * 1000:>10.2f}' for time in TIMES))
+        lines.append(f'{"total":<26}{"":>35}' + ''.join(f'{report[time] * 1000:>10.2f}' for time in TIMES))
+        return '\n'.join(lines)
+
+
+def main():
+    '''
+    Profiles the construction of the decision tree of a dataset.
+    '''
+    parser = argparse.ArgumentParser(description = 'Profile of the construction of the mushroom decision tree.')
+    parser.add_argument('dataset', nargs = '?', default = 'mushrooms.csv', help = 'CSV file of the mushrooms')
+    parser.add_argument('--output', help = 'JSON file of the report')
+    args = parser.parse_args()
+
+    profile = TrainingProfile()
+    profile.train(load_dataset(args.dataset))
+    print(profile.summary())
+    if args.output:
+        profile.save(args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,507 +1,1596 @@
-"""
-Auteur: Rocca Manuel
-Matricule: 000596086
-Date: 7/05/2023
-Ce code analyse un ensemble de champignons donné dans un fichier
-et classe ces champignons de manière optimale dans un arbre 
-avant de l'afficher.
-"""
-
-
-import os
-import csv
-from math import log2
-
-
-class Mushroom:
-    '''
-    Represents a mushroom with its attributes and edibility.
-
-    Attributes:
-        edible (bool): Indicates if the mushroom is edible.
-    '''
-
-    def __init__(self, edible: bool):
-        '''
-        Initializes a Mushroom object.
-
-        Args:
-            edible (bool): Indicates if the mushroom is edible.
-        '''
-        self.mushroom = {'edible': edible}
-
-    
-    def is_edible(self) -> bool:
-        '''
-        Checks if the mushroom is edible.
-
-        Returns:
-            bool: True if the mushroom is edible, False otherwise.
-        '''
-        return self.mushroom['edible']
-
-    
-    def add_attribute(self, name: str, value: str) -> None:
-        '''
-        Adds an attribute to the mushroom.
-
-        Args:
-            name (str): The name of the attribute.
-            value (str): The value of the attribute.
-
-        Returns:
-            None
-        '''
-        self.mushroom[name] = value
-
-    
-    def get_attribute(self, name: str) -> str:
-        '''
-        Retrieves the value of a specific attribute.
-
-        Args:
-            name (str): The name of the attribute to retrieve.
-
-        Returns:
-            str: The value of the specified attribute.
-        '''
-        return self.mushroom[name]
-
-    
-    def general_attributes(self):
-        '''
-        Returns all attributes except edible.
-
-        Returns:
-            list: List of attribute names.
-        '''
-        keys = list(self.mushroom.keys())
-        keys.remove('edible')
-        return keys
-
-    
-class Node:
-    '''
-    Represents a node in the decision tree.
-
-    Attributes:
-        criterion_ (str): The criterion used to split the data at this node.
-        is_leaf_ (bool): Indicates if the node is a leaf node.
-        edges_ (list): List of edges leading to child nodes.
-    '''
-
-    def __init__(self, criterion: str, is_leaf: bool = False):
-        '''
-        Initializes a Node object.
-
-        Args:
-            criterion (str): The criterion used to split the data at this node.
-            is_leaf (bool): Indicates if the node is a leaf node.
-
-        Returns:
-            None
-        '''
-        self.criterion_ = criterion
-        self.is_leaf_ = is_leaf
-        self.edges_ = []
-
-    
-    def is_leaf(self) -> bool:
-        '''
-        Checks if the node is a leaf node.
-
-        Returns:
-            bool: True if the node is a leaf node, False otherwise.
-        '''
-        return self.is_leaf_
-
-    
-    def add_edge(self, label: str, child: 'Node') -> None:
-        '''
-        Adds an edge to connect the current node to a child node.
-
-        Args:
-            label (str): The label associated with the edge.
-            child (Node): The child node connected by the edge.
-
-        Returns:
-            None
-        '''
-        self.edges_.append(Edge(self, child, label))
-    
-
-    def get_labels(self):
-        '''
-        Retrieves the labels associated with the outgoing edges.
-
-        Returns:
-            list: List of edge labels.
-        '''
-        ret = []
-        for edge in self.edges_:
-            ret.append(edge.label_)
-        return ret
-
-
-class Edge:
-    '''
-    Represents an edge connecting two nodes in the decision tree.
-
-    Attributes:
-        parent_ (Node): The parent node.
-        child_ (Node): The child node.
-        label_ (str): The label associated with the edge.
-    '''
-    
-    def __init__(self, parent: Node, child: Node, label: str):
-        '''
-        Initializes an Edge object.
-
-        Args:
-            parent (Node): The parent node.
-            child (Node): The child node.
-            label (str): The label associated with the edge.
-
-        Returns:
-            None
-        '''
-        self.parent_ = parent
-        self.child_ = child
-        self.label_ = label
-
-
-def load_dataset(path: str) -> list[Mushroom]: 
-    '''
-    Loads the mushroom dataset from a CSV file.
-
-    Args:
-        path (str): The path to the CSV file.
-
-    Returns:
-        list: List of Mushroom objects representing the dataset.
-    '''
-    mushrooms = []
-    with open('mushrooms.csv', 'r') as csvfile:
-        csvreader = csv.reader(csvfile)
-        characteristics = next(csvreader) #getting attributes
-
-        for row in csvreader:
-            mushroom = Mushroom(row[0].strip() == 'Yes') #creating object
-            for attribute in range(1, len(row)):
-                #adding attributes to corresponding object
-                mushroom.add_attribute(characteristics[attribute], row[attribute])
-            mushrooms.append(mushroom)
-            
-    return mushrooms
-
-
-def build_decision_tree(mushrooms: list[Mushroom]) -> Node:
-    '''
-    Builds a decision tree based on the information gain of a set of mushrooms.
-    The tree is built recursively by going through subsets of mushrooms.
-
-    Args:
-        mushrooms (list): List of Mushroom objects representing the dataset.
-
-    Returns:
-        Node: The root node of the decision tree.
-    '''
-
-    #base cases of recursion
-    edibles = all_edible(mushrooms)
-    if len(edibles) == len(mushrooms):
-        return Node('Yes', True)
-    elif len(edibles) == 0:
-        return Node('No', True)
-    
-    #attribute choice
-    parent_entropy = get_entropy(mushrooms)
-    max_info_gain = -1
-    for attribute in mushrooms[0].general_attributes():
-        attribute_values = get_attribute_values(attribute, mushrooms)
-        info_gain = get_info_gain(attribute_values, parent_entropy, len(mushrooms))
-
-        if info_gain > max_info_gain:
-            max_info_gain = info_gain
-            #keeping the attribute with the best information gain of the
-            #current set and the mushrooms that possess the attribute
-            split_attr, split_attr_mushrooms = attribute, attribute_values
-            
-            
-    #building tree recursively
-    node = Node(split_attr)
-    for value, shrooms in split_attr_mushrooms.items():
-        child = build_decision_tree(shrooms)#recursive call
-        node.add_edge(value, child)
-    
-    return node
-
-
-def get_attribute_values(attribute: str, mushrooms: list[Mushroom]) -> dict:
-    '''
-    Retrieves all attribute values and mushrooms that have this value.
-
-    Args:
-        attribute (str): The name of the attribute.
-        mushrooms (list): List of Mushroom objects representing the dataset.
-
-    Returns:
-        dict: Dictionary mapping attribute values to lists of corresponding mushrooms.
-    '''
-    subsets = {}
-    for mushroom in mushrooms:
-        attribute_value = mushroom.get_attribute(attribute)
-        if attribute_value not in subsets:
-            subsets[attribute_value] = []
-        subsets[attribute_value].append(mushroom)
-    
-    return subsets
-
-
-def number_of_edibles(mushrooms: list[Mushroom]) -> int:
-    '''
-    Counts the number of edible mushrooms in a dataset.
-
-    Args:
-        mushrooms (list): List of Mushroom objects representing the dataset.
-
-    Returns:
-        int: Number of edible mushrooms.
-    '''
-    return sum(1 for mushroom in mushrooms if mushroom.is_edible())
-
-
-def get_info_gain(attribute_values: dict, parent_entropy: int, total_mushrooms: int) -> int:
-    '''
-    Calculates the information gain of an attribute by going through all of its possible values.
-    It uses the formula given in the project guidelines
-
-    Args:
-        attribute_values (dict): Dictionary mapping attribute values to lists of corresponding mushrooms.
-        parent_entropy (int): Entropy of the parent dataset.
-        total_mushrooms (int): Total number of mushrooms in the dataset.
-
-    Returns:
-        int: Information gain of the attribute.
-    '''
-    sum = 0
-    for shrooms in attribute_values.values():
-        sum += (number_of_edibles(shrooms) / total_mushrooms) * get_entropy(shrooms)
-    return parent_entropy - sum
-
-
-def get_entropy(subset: list[Mushroom]) -> int:
-    '''
-    Calculates the entropy of a given dataset based on the formula given in
-    the project guidelines.
-
-    Args:
-        subset (list): Subset of Mushroom objects representing a dataset.
-
-    Returns:
-        int: Entropy of the dataset.
-    '''
-    py = (number_of_edibles(subset) / len(subset))
-    return 0 if (py == 0 or py == 1) else (py * log2((1 - py) / py)) - log2(1 - py) 
-
-
-def all_edible(mushrooms: list[Mushroom]) -> list:
-    '''
-    Retrieves all edible mushrooms from a dataset.
-
-    Args:
-        mushrooms (list): List of Mushroom objects representing the dataset.
-
-    Returns:
-        list: List of edible Mushroom objects.
-    '''
-    edibles = []
-    for mushroom in mushrooms:
-        if mushroom.is_edible():
-            edibles.append(mushroom)
-    return edibles
-
-
-def is_edible(root: Node, mushroom: Mushroom) -> bool:
-    '''
-    Checks if a given mushroom is edible by searching recursively
-    in the previously built tree.
-
-    Args:
-        root (Node): The root node of the decision tree.
-        mushroom (Mushroom): The mushroom to check.
-
-    Returns:
-        bool: True if the mushroom is edible, False otherwise.
-    '''
-    if root.criterion_ == 'Yes':
-        return True
-    elif root.criterion_ == 'No':
-        return False
-
-    for edge in root.edges_:
-        #going through all edges to find the right route
-        if mushroom.get_attribute(root.criterion_) == edge.label_:
-            return is_edible(edge.child_, mushroom)
-
-
-def display(tree: Node, indent = 0) -> None:
-    '''
-    Displays the decision tree using preorder traversal.
-
-    Args:
-        tree (Node): The root node of the decision tree.
-        indent (int): The indentation level for formatting.
-
-    Returns:
-        None
-    '''
-    if tree.is_leaf():
-        print(" " * indent, end = '')
-        prt = f'\u21B3 \x1b[91m{tree.criterion_}\x1b[0m' if tree.criterion_ == 'No'\
-                                                else f'\u21B3 \x1b[92m{tree.criterion_}\x1b[0m'
-        print(prt)
-        return None
-    for edge in tree.edges_:
-        print(" " * indent, end = '')
-        print(f'\x1b[1m{tree.criterion_}\x1b[0m = \x1b[3m{edge.label_}\x1b[0m')
-        display(edge.child_, indent + 4)
-    
-    
-def bool_tree(tree: Node) -> str:
-    '''
-    Generates the boolean expression representing the decision tree.
-
-    Args:
-        tree (Node): The root node of the decision tree.
-
-    Returns:
-        str: The boolean expression representing the decision tree.
-    '''
-    ret = ''
-    subtrees = []
-    first_expression_added = False
-    
-    for edge in tree.edges_:
-                
-        if not edge.child_.is_leaf(): #gathering subtrees
-            subtrees.append([edge.child_, edge.label_])
-        elif edge.child_.criterion_ == 'Yes': #only treating positive ones
-            if first_expression_added:
-                ret += ' OR '
-            ret += f'({tree.criterion_} = {edge.label_})'
-            first_expression_added = True    
-    
-    for i in range(len(subtrees)):
-        subtree, label = subtrees[i]
-        if first_expression_added:
-            ret += ' OR '
-        
-        ret += f'({tree.criterion_} = {label} AND {bool_tree(subtree)})'
-        
-    return ret
-
-
-#--------------------------BONUS--------------------------#
-def to_python(dt: Node, path: str) -> None:
-    '''
-    Converts the decision tree to Python code and saves it to a file.
-
-    Args:
-        dt (Node): The root node of the decision tree.
-        path (str): The path to save the Python code.
-
-    Returns:
-        None
-    '''
-    with open(path, 'w', encoding = 'utf-8') as f:
-        f.write('def to_python():\n')
-        code = write_python(dt, f)
-        f.write(code)
-        f.write(f'{" " * 4}else:\n{" " * 8}return None')
-
-
-def write_python(tree : Node, f, indent = 4, ret = '') -> str:
-    '''
-    Writes Python code representing the decision tree.
-
-    Args:
-        tree (Node): The root node of the decision tree.
-        f (file): The file object to write to.
-        indent (int): The indentation level for formatting.
-        ret (str): The generated Python code.
-
-    Returns:
-        str: The generated Python code.
-    '''
-    first_expression_added = False
-    for edge in tree.edges_:
-        if edge.child_.is_leaf():
-            if not first_expression_added:
-                ret += f'{" " * indent}if \'{tree.criterion_}\' == \'{edge.label_}\':\n'
-                ret += f'{" " * (indent + 4)}return {edge.child_.criterion_ == "Yes"}\n'
-                first_expression_added = True
-            else:
-                ret += f'{" " * indent}elif \'{tree.criterion_}\' == \'{edge.label_}\':\n'
-                ret += f'{" " * (indent + 4)}return {edge.child_.criterion_ == "Yes"}\n'
-        elif not edge.child_.is_leaf():
-            if not first_expression_added:
-                ret += f'{" " * indent}if \'{tree.criterion_}\' == \'{edge.label_}\':\n'
-                ret += write_python(edge.child_, f, indent + 4)
-                first_expression_added = True
-            else:
-                ret += f'{" " * indent}elif \'{tree.criterion_}\' == \'{edge.label_}\':\n'
-                ret += write_python(edge.child_, f, indent + 4)
-    
-    return ret
-#---------------------------------------------------------#
-
-
-def chosen_path(root : Node) -> None:
-    '''
-    Guides the user through the decision tree to determine the edibility of a mushroom.
-
-    Args:
-        root (Node): The root node of the decision tree.
-
-    Returns:
-        None
-    '''
-    while root.criterion_ != 'Yes' and root.criterion_ != 'No':
-        attribute = str(input(f'Please input the {root.criterion_} of your mushroom: '))
-        if attribute not in root.get_labels():
-            continue
-        else:
-            for edge in root.edges_:
-                if attribute == edge.label_:
-                    root = edge.child_
-    
-    res = 'Your mushroom is indeed \x1b[92mcomestible\x1b[0m.' if root.criterion_ == 'Yes' else 'Your mushroom is \x1b[91mpoisonous\x1b[0m.'
-    print(res)
-    return True if root.criterion_ == 'Yes' else False
-            
-
-def main():
-    '''
-    Main function to build and interact with the decision tree.
-    '''
-    tree = build_decision_tree(load_dataset(os.getcwd()))
-    
-    print('\n\x1b[1mMushroom decision tree: \x1b[0m\n')
-    display(tree)
-    
-    print('\n\n\n\x1b[1mMushroom decision tree\'s boolean expression: \x1b[0m\n')
-    print(bool_tree(tree))
-    to_python(tree, 'to_python.py')
-
-    print('\n\n')
-    user_input = str(input('Would you like to test the edibility of a mushroom?\nPress \'\u21B3\' to continue, \'E\' to exit: '))
-    while user_input.upper() != 'E':
-        chosen_path(tree)
-        user_input = str(input('\nWould you like to test the edibility of another mushroom?\nPress \'\u21B3\' to continue, \'E\' to exit: '))
-
-
-
-
-if __name__ == '__main__':
+"""
+Auteur: Rocca Manuel
+Matricule: 000596086
+Date: 7/05/2023
+Ce code analyse un ensemble de champignons donné dans un fichier
+et classe ces champignons de manière optimale dans un arbre 
+avant de l'afficher.
+"""
+
+
+import os
+import io
+import sys
+import csv
+import weakref
+from array import array
+from contextlib import contextmanager
+from collections import Counter, OrderedDict, deque
+from itertools import compress, islice
+from math import log2
+from time import perf_counter
+
+
+#number of rows read and encoded at once by load_chunks
+ENCODING_BLOCK = 1024
+
+
+class Mushroom:
+    '''
+    Represents a mushroom with its attributes and edibility.
+
+    Attributes:
+        edible (bool): Indicates if the mushroom is edible.
+    '''
+
+    __slots__ = ('mushroom',)
+
+    def __init__(self, edible: bool):
+        '''
+        Initializes a Mushroom object.
+
+        Args:
+            edible (bool): Indicates if the mushroom is edible.
+        '''
+        self.mushroom = {'edible': edible}
+
+    
+    def is_edible(self) -> bool:
+        '''
+        Checks if the mushroom is edible.
+
+        Returns:
+            bool: True if the mushroom is edible, False otherwise.
+        '''
+        return self.mushroom['edible']
+
+    
+    def add_attribute(self, name: str, value: str) -> None:
+        '''
+        Adds an attribute to the mushroom.
+
+        Args:
+            name (str): The name of the attribute.
+            value (str): The value of the attribute.
+
+        Returns:
+            None
+        '''
+        self.mushroom[name] = value
+
+    
+    def get_attribute(self, name: str) -> str:
+        '''
+        Retrieves the value of a specific attribute.
+
+        Args:
+            name (str): The name of the attribute to retrieve.
+
+        Returns:
+            str: The value of the specified attribute.
+        '''
+        return self.mushroom[name]
+
+    
+    def general_attributes(self):
+        '''
+        Returns all attributes except edible.
+
+        Returns:
+            list: List of attribute names.
+        '''
+        keys = list(self.mushroom.keys())
+        keys.remove('edible')
+        return keys
+
+
+
+class MushroomRow(Mushroom):
+    '''
+    Represents a mushroom stored in a Dataset. It doesn't hold any value itself
+    and reads its attributes from the columns of the dataset.
+
+    Attributes:
+        dataset_ (Dataset): The dataset the mushroom belongs to.
+        row_ (int): The index of the mushroom's row in the dataset.
+    '''
+
+    __slots__ = ('dataset_', 'row_')
+
+    def __init__(self, dataset: 'Dataset', row: int):
+        '''
+        Initializes a MushroomRow object.
+
+        Args:
+            dataset (Dataset): The dataset the mushroom belongs to.
+            row (int): The index of the mushroom's row in the dataset.
+        '''
+        self.dataset_ = dataset
+        self.row_ = row
+
+
+    @property
+    def mushroom(self) -> dict:
+        '''
+        Builds the dictionary representation of the mushroom.
+
+        Returns:
+            dict: Dictionary mapping attribute names (and edible) to their values.
+        '''
+        ret = {'edible': self.is_edible()}
+        for name in self.dataset_.attributes_:
+            ret[name] = self.get_attribute(name)
+        return ret
+
+
+    def is_edible(self) -> bool:
+        '''
+        Checks if the mushroom is edible.
+
+        Returns:
+            bool: True if the mushroom is edible, False otherwise.
+        '''
+        return self.dataset_.labels_[self.row_] == 1
+
+
+    def add_attribute(self, name: str, value: str) -> None:
+        '''
+        Changes the value of an attribute of the mushroom in its dataset.
+
+        Args:
+            name (str): The name of the attribute.
+            value (str): The value of the attribute.
+
+        Returns:
+            None
+        '''
+        self.dataset_.set_attribute(self.row_, name, value)
+
+
+    def get_attribute(self, name: str) -> str:
+        '''
+        Retrieves the value of a specific attribute.
+
+        Args:
+            name (str): The name of the attribute to retrieve.
+
+        Returns:
+            str: The value of the specified attribute.
+        '''
+        return self.dataset_.get_attribute(self.row_, name)
+
+
+    def general_attributes(self):
+        '''
+        Returns all attributes except edible.
+
+        Returns:
+            list: List of attribute names.
+        '''
+        return list(self.dataset_.attributes_)
+
+
+class Dataset:
+    '''
+    Represents a set of mushrooms stored column by column. Every attribute is
+    an array of integer codes pointing into the vocabulary of the attribute
+    and the edibility of every mushroom is stored in a byte array.
+    A dataset can also be a view over some rows of another dataset, in which
+    case both share the same columns.
+
+    Attributes:
+        attributes_ (list): Names of the attributes, edible excluded.
+        vocabularies_ (list): For each attribute, the list of its values. The code of a value is its index.
+        codes_ (list): For each attribute, a dictionary mapping its values to their codes.
+        columns_ (list): For each attribute, the array of the codes of every row.
+        labels_ (bytearray): 1 for every edible mushroom, 0 otherwise.
+        rows_ (array): Indices of the rows covered by the view, None if every row is covered.
+        positions_ (dict): Dictionary mapping attribute names to their column index.
+    '''
+
+    def __init__(self, attributes: list[str]):
+        '''
+        Initializes an empty Dataset object.
+
+        Args:
+            attributes (list): Names of the attributes, edible excluded.
+
+        Returns:
+            None
+        '''
+        self.attributes_ = list(attributes)
+        self.vocabularies_ = [[] for _ in self.attributes_]
+        self.codes_ = [{} for _ in self.attributes_]
+        self.columns_ = [array(column_typecode(0)) for _ in self.attributes_]
+        self.labels_ = bytearray()
+        self.rows_ = None
+        self.positions_ = {name: i for i, name in enumerate(self.attributes_)}
+
+
+    @classmethod
+    def from_mushrooms(cls, mushrooms: list[Mushroom]) -> 'Dataset':
+        '''
+        Builds a dataset out of Mushroom objects. The attributes of the first
+        mushroom are used for every other one.
+
+        Args:
+            mushrooms (list): List of Mushroom objects.
+
+        Returns:
+            Dataset: The dataset containing the mushrooms.
+        '''
+        if isinstance(mushrooms, Dataset):
+            return mushrooms
+        attributes = mushrooms[0].general_attributes() if len(mushrooms) > 0 else []
+        dataset = cls(attributes)
+        for mushroom in mushrooms:
+            dataset.append(mushroom.is_edible(),
+                           [mushroom.get_attribute(name) for name in attributes])
+        return dataset
+
+
+    @classmethod
+    def from_columns(cls, attributes: list[str], vocabularies: list[list[str]], columns: list, labels) -> 'Dataset':
+        '''
+        Builds a dataset around existing columns without copying them. The
+        columns can be arrays or memoryviews, in which case the dataset can't
+        grow.
+
+        Args:
+            attributes (list): Names of the attributes, edible excluded.
+            vocabularies (list): For each attribute, the list of its values.
+            columns (list): For each attribute, the codes of every row.
+            labels (bytes-like): 1 for every edible mushroom, 0 otherwise.
+
+        Returns:
+            Dataset: The dataset using the columns.
+        '''
+        dataset = cls(attributes)
+        dataset.vocabularies_ = [list(vocabulary) for vocabulary in vocabularies]
+        dataset.codes_ = [{value: code for code, value in enumerate(vocabulary)}
+                          for vocabulary in dataset.vocabularies_]
+        dataset.columns_ = list(columns)
+        dataset.labels_ = labels
+        return dataset
+
+
+    def __len__(self) -> int:
+        return len(self.labels_) if self.rows_ is None else len(self.rows_)
+
+
+    def __getitem__(self, index: int) -> MushroomRow:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('dataset index out of range')
+        return MushroomRow(self, index if self.rows_ is None else self.rows_[index])
+
+
+    def __iter__(self):
+        for row in self.row_indices():
+            yield MushroomRow(self, row)
+
+
+    def row_indices(self):
+        '''
+        Retrieves the indices of the rows covered by the dataset.
+
+        Returns:
+            range or array: The indices of the rows.
+        '''
+        return range(len(self.labels_)) if self.rows_ is None else self.rows_
+
+
+    def subset(self, rows) -> 'Dataset':
+        '''
+        Creates a view over some rows of the dataset. The columns are shared,
+        only the indices of the rows are stored.
+
+        Args:
+            rows (iterable): Indices of the rows in the underlying columns.
+
+        Returns:
+            Dataset: The view over the rows.
+        '''
+        view = Dataset.__new__(Dataset)
+        view.__dict__.update(self.__dict__)
+        view.rows_ = rows if isinstance(rows, array) else array('I', rows)
+        return view
+
+
+    def attribute_index(self, name: str) -> int:
+        '''
+        Retrieves the position of an attribute in the dataset.
+
+        Args:
+            name (str): The name of the attribute.
+
+        Returns:
+            int: The index of the attribute's column.
+        '''
+        return self.positions_[name]
+
+
+    def encode(self, attribute: int, value: str) -> int:
+        '''
+        Retrieves the code of a value, adding it to the vocabulary of the
+        attribute if it isn't known yet.
+
+        Args:
+            attribute (int): The index of the attribute.
+            value (str): The value to encode.
+
+        Returns:
+            int: The code of the value.
+        '''
+        codes = self.codes_[attribute]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self.vocabularies_[attribute])
+            self.vocabularies_[attribute].append(value)
+            column = self.columns_[attribute]
+            if column.typecode != column_typecode(code + 1):
+                #widening the column when the codes don't fit anymore
+                self.columns_[attribute] = array(column_typecode(code + 1), column)
+        return code
+
+
+    def empty_like(self) -> 'Dataset':
+        '''
+        Creates an empty dataset sharing the attributes and the vocabularies
+        of this one, so that both encode the values with the same codes.
+
+        Returns:
+            Dataset: The empty dataset.
+        '''
+        dataset = Dataset.__new__(Dataset)
+        dataset.__dict__.update(self.__dict__)
+        dataset.columns_ = [array(column_typecode(len(vocabulary))) for vocabulary in self.vocabularies_]
+        dataset.labels_ = bytearray()
+        dataset.rows_ = None
+        return dataset
+
+
+    def extend(self, edibles: list[int], columns: list[list[str]]) -> None:
+        '''
+        Adds several mushrooms at the end of the dataset, attribute by attribute.
+
+        Args:
+            edibles (list): 1 for every edible mushroom, 0 otherwise.
+            columns (list): For each attribute, in the dataset's order, the values of the mushrooms.
+
+        Returns:
+            None
+        '''
+        for attribute, values in enumerate(columns):
+            codes = self.codes_[attribute]
+            for value in dict.fromkeys(values):
+                if value not in codes:
+                    self.encode(attribute, value)
+            self.columns_[attribute].extend(map(codes.__getitem__, values))
+        self.labels_.extend(edibles)
+
+
+    def append(self, edible: bool, values: list[str]) -> None:
+        '''
+        Adds a mushroom at the end of the dataset.
+
+        Args:
+            edible (bool): Indicates if the mushroom is edible.
+            values (list): The values of the attributes, in the dataset's order.
+
+        Returns:
+            None
+        '''
+        for attribute, value in enumerate(values):
+            #encoding first, the column can be widened by a new value
+            code = self.encode(attribute, value)
+            self.columns_[attribute].append(code)
+        self.labels_.append(1 if edible else 0)
+
+
+    def get_attribute(self, row: int, name: str) -> str:
+        '''
+        Retrieves the value of an attribute for a given row.
+
+        Args:
+            row (int): The index of the row in the underlying columns.
+            name (str): The name of the attribute.
+
+        Returns:
+            str: The value of the attribute.
+        '''
+        attribute = self.positions_[name]
+        return self.vocabularies_[attribute][self.columns_[attribute][row]]
+
+
+    def set_attribute(self, row: int, name: str, value: str) -> None:
+        '''
+        Changes the value of an attribute for a given row.
+
+        Args:
+            row (int): The index of the row in the underlying columns.
+            name (str): The name of the attribute.
+            value (str): The new value of the attribute.
+
+        Returns:
+            None
+        '''
+        attribute = self.positions_[name]
+        code = self.encode(attribute, value)
+        self.columns_[attribute][row] = code
+
+
+    def number_of_edibles(self) -> int:
+        '''
+        Counts the number of edible mushrooms in the dataset.
+
+        Returns:
+            int: Number of edible mushrooms.
+        '''
+        if self.rows_ is None:
+            return self.labels_.count(1)
+        labels = self.labels_
+        return sum(labels[row] for row in self.rows_)
+
+
+def column_typecode(size: int) -> str:
+    '''
+    Chooses the smallest array type able to store the codes of a vocabulary.
+
+    Args:
+        size (int): The number of values of the vocabulary.
+
+    Returns:
+        str: The typecode of the array.
+    '''
+    if size <= 1 << 8:
+        return 'B'
+    return 'H' if size <= 1 << 16 else 'I'
+
+
+class Node:
+    '''
+    Represents a node in the decision tree.
+
+    Attributes:
+        criterion_ (str): The criterion used to split the data at this node.
+        is_leaf_ (bool): Indicates if the node is a leaf node.
+        edges_ (list): List of edges leading to child nodes.
+        majority_ (bool): True if most of the mushrooms reaching the node are edible, None if unknown.
+        samples_ (int): Number of training mushrooms reaching the node, None if unknown.
+        edibles_ (int): Number of edible training mushrooms reaching the node, None if unknown.
+    '''
+
+    __slots__ = ('criterion_', 'is_leaf_', 'edges_', 'majority_', 'samples_', 'edibles_', '__weakref__')
+
+    def __init__(self, criterion: str, is_leaf: bool = False, majority: bool = None, samples: int = None,
+                 edibles: int = None):
+        '''
+        Initializes a Node object.
+
+        Args:
+            criterion (str): The criterion used to split the data at this node.
+            is_leaf (bool): Indicates if the node is a leaf node.
+            majority (bool): True if most of the mushrooms reaching the node are edible. Leaves use their own criterion if None.
+            samples (int): Number of training mushrooms reaching the node.
+            edibles (int): Number of edible training mushrooms reaching the node.
+
+        Returns:
+            None
+        '''
+        self.criterion_ = criterion
+        self.is_leaf_ = is_leaf
+        self.edges_ = []
+        self.majority_ = criterion == 'Yes' if majority is None and is_leaf else majority
+        self.samples_ = samples
+        self.edibles_ = edibles
+
+    
+    def is_leaf(self) -> bool:
+        '''
+        Checks if the node is a leaf node.
+
+        Returns:
+            bool: True if the node is a leaf node, False otherwise.
+        '''
+        return self.is_leaf_
+
+
+    def get_probability(self) -> float:
+        '''
+        Computes the share of edible mushrooms among the training mushrooms reaching the node.
+
+        Returns:
+            float: The probability that a mushroom reaching the node is edible, None if the counts are unknown.
+        '''
+        if not self.samples_:
+            return None
+        return self.edibles_ / self.samples_
+
+    
+    def add_edge(self, label: str, child: 'Node') -> None:
+        '''
+        Adds an edge to connect the current node to a child node.
+
+        Args:
+            label (str): The label associated with the edge.
+            child (Node): The child node connected by the edge.
+
+        Returns:
+            None
+        '''
+        self.edges_.append(Edge(self, child, label))
+    
+
+    def replace_child(self, label: str, child: 'Node') -> None:
+        '''
+        Replaces the child reached by an edge, keeping the order of the edges.
+
+        Args:
+            label (str): The label of the edge.
+            child (Node): The new child node.
+
+        Returns:
+            None
+        '''
+        for i, edge in enumerate(self.edges_):
+            if edge.label_ == label:
+                self.edges_[i] = Edge(self, child, label)
+
+
+    def get_labels(self):
+        '''
+        Retrieves the labels associated with the outgoing edges.
+
+        Returns:
+            list: List of edge labels.
+        '''
+        return [edge.label_ for edge in self.edges_]
+
+
+    def get_child(self, label: str) -> 'Node':
+        '''
+        Retrieves the child reached by an edge.
+
+        Args:
+            label (str): The label of the edge.
+
+        Returns:
+            Node: The child node, None if no edge has this label.
+        '''
+        for edge in self.edges_:
+            if edge.label_ == label:
+                return edge.child_
+        return None
+
+
+class Edge:
+    '''
+    Represents an edge connecting two nodes in the decision tree. The parent
+    is only weakly referenced, so that a tree has no reference cycle and is
+    freed as soon as its root isn't used anymore.
+
+    Attributes:
+        parent_ (Node): The parent node.
+        child_ (Node): The child node.
+        label_ (str): The label associated with the edge.
+    '''
+
+    __slots__ = ('parent_ref_', 'child_', 'label_')
+    
+    def __init__(self, parent: Node, child: Node, label: str):
+        '''
+        Initializes an Edge object.
+
+        Args:
+            parent (Node): The parent node.
+            child (Node): The child node.
+            label (str): The label associated with the edge.
+
+        Returns:
+            None
+        '''
+        self.parent_ref_ = weakref.ref(parent)
+        self.child_ = child
+        self.label_ = label
+
+
+    @property
+    def parent_(self) -> Node:
+        return self.parent_ref_()
+
+
+    def __getstate__(self) -> tuple:
+        return self.parent_, self.child_, self.label_
+
+
+    def __setstate__(self, state: tuple) -> None:
+        self.__init__(*state)
+
+
+def load_dataset(path: str, schema: Dataset = None) -> Dataset: 
+    '''
+    Loads the mushroom dataset from a CSV file.
+
+    Args:
+        path (str): The path to the CSV file (see open_dataset). A directory is searched for mushrooms.csv.
+        schema (Dataset): Dataset whose attributes and vocabularies are used to encode the values.
+
+    Returns:
+        Dataset: Columnar dataset of the mushrooms.
+    '''
+    if path != '-' and os.path.isdir(path):
+        path = os.path.join(path, 'mushrooms.csv')
+    mushrooms = None
+    for chunk in load_chunks(path, None, schema):
+        mushrooms = chunk
+    return mushrooms
+
+
+def save_dataset(mushrooms, path: str) -> None:
+    '''
+    Writes a dataset in a CSV file readable by load_dataset. The rows are
+    decoded block by block, so the file is never built in memory.
+
+    Args:
+        mushrooms (Dataset or iterable): The dataset to write, or chunks sharing the same attributes (like the ones of load_chunks).
+        path (str): The path to the CSV file, '-' for the standard output. Paths ending with .gz are compressed.
+
+    Returns:
+        None
+    '''
+    with open_output(path) as csvfile:
+        csvwriter = csv.writer(csvfile, lineterminator = '\n')
+        chunks = [mushrooms] if isinstance(mushrooms, Dataset) else mushrooms
+        for i, chunk in enumerate(chunks):
+            if i == 0:
+                csvwriter.writerow(['edible'] + chunk.attributes_)
+            rows = chunk.row_indices()
+            for start in range(0, len(rows), ENCODING_BLOCK):
+                block = rows[start:start + ENCODING_BLOCK]
+                columns = [['Yes' if chunk.labels_[row] else 'No' for row in block]]
+                for column, vocabulary in zip(chunk.columns_, chunk.vocabularies_):
+                    columns.append([vocabulary[column[row]] for row in block])
+                csvwriter.writerows(zip(*columns))
+
+
+@contextmanager
+def open_output(path: str):
+    '''
+    Opens a file to write CSV rows in text mode. Paths ending with .gz are compressed.
+
+    Args:
+        path (str): The path to the file, '-' for the standard output.
+
+    Returns:
+        file: The opened file, as a context manager.
+    '''
+    if path == '-':
+        csvfile = sys.stdout
+    elif path.endswith('.gz'):
+        import gzip #imported only when needed
+        csvfile = gzip.open(path, 'wt', compresslevel = 6, encoding = 'utf-8', newline = '')
+    else:
+        csvfile = open(path, 'w', encoding = 'utf-8', newline = '')
+    try:
+        yield csvfile
+    finally:
+        if path != '-':
+            csvfile.close()
+
+
+@contextmanager
+def open_dataset(path: str):
+    '''
+    Opens a CSV file in text mode. Gzip files are recognised by their first
+    bytes and decompressed on the fly.
+
+    Args:
+        path (str): The path to the file, '-' for the standard input.
+
+    Returns:
+        file: The opened file, as a context manager.
+    '''
+    stream = sys.stdin.buffer if path == '-' else open(path, 'rb')
+    if not hasattr(stream, 'peek'):
+        stream = io.BufferedReader(stream)
+    if stream.peek(2)[:2] == b'\x1f\x8b':
+        import gzip #imported only when needed
+        stream = gzip.GzipFile(fileobj = stream)
+    csvfile = io.TextIOWrapper(stream, encoding = 'utf-8', newline = '')
+    try:
+        yield csvfile
+    finally:
+        if path == '-':
+            csvfile.detach() #the standard input stays open
+        else:
+            csvfile.close()
+
+
+def load_chunks(path: str, chunk_size: int = 100000, schema: Dataset = None):
+    '''
+    Reads a CSV file by chunks of rows, encoded straight into datasets. All
+    the chunks share the vocabularies of the schema, so a value has the same
+    code in every chunk. Without schema, it is inferred from the header and
+    the vocabularies grow with the values found in the file. The names and the
+    values are stripped of their surrounding spaces, blank lines are skipped
+    and a row without a value for every column raises a ValueError.
+
+    Args:
+        path (str): The path to the CSV file (see open_dataset).
+        chunk_size (int): The number of rows of a chunk, the whole file if None.
+        schema (Dataset): Dataset whose attributes and vocabularies are used to encode the values.
+
+    Returns:
+        generator: The chunks, as Dataset objects.
+    '''
+    with open_dataset(path) as csvfile:
+        csvreader = csv.reader(csvfile)
+        characteristics = next(csvreader, None) #getting attributes
+        if characteristics is None:
+            raise ValueError(f'{path} is empty')
+        characteristics = [name.strip() for name in characteristics]
+        if schema is None:
+            schema = Dataset(characteristics[1:])
+        missing = set(schema.attributes_).difference(characteristics[1:])
+        if missing:
+            raise ValueError(f'Missing attributes in {path}: {", ".join(sorted(missing))}')
+        #position in the file of every attribute of the schema
+        positions = [characteristics.index(name) for name in schema.attributes_]
+
+        chunk = schema.empty_like()
+        line = 1 #line of the last row read, the header being the first one
+        while True:
+            #encoding small blocks of rows is faster than encoding a whole chunk at once
+            size = ENCODING_BLOCK if chunk_size is None else min(ENCODING_BLOCK, chunk_size - len(chunk))
+            block = rows = list(islice(csvreader, size))
+            if any(len(row) != len(characteristics) for row in rows):
+                #blank lines are skipped, rows of another width are errors
+                for i, row in enumerate(rows):
+                    if row and len(row) != len(characteristics):
+                        raise ValueError(f'{path}, line {line + i + 1}: expected {len(characteristics)} fields, got {len(row)}')
+                rows = [row for row in rows if row]
+            line += len(block)
+            if rows:
+                values = list(zip(*rows))
+                columns = []
+                for position in positions:
+                    column = values[position]
+                    #only the columns with surrounding spaces are copied to strip them
+                    if any(value != value.strip() for value in set(column)):
+                        column = [value.strip() for value in column]
+                    columns.append(column)
+                chunk.extend([1 if edible.strip() == 'Yes' else 0 for edible in values[0]], columns)
+            if len(block) < size or len(chunk) == chunk_size:
+                if len(chunk) > 0 or chunk_size is None:
+                    yield chunk
+                if len(block) < size:
+                    return
+                chunk = schema.empty_like()
+
+
+def build_decision_tree(mushrooms: list[Mushroom], backend: str = 'python', n_jobs: int = 1, on_node = None,
+                        max_depth: int = None, min_samples: int = 2, breadth_first: bool = False,
+                        cache: 'SplitCache' = None, min_gain: float = 0.0, parallel_threshold: int = 10000) -> Node:
+    '''
+    Builds a decision tree based on the information gain of a set of mushrooms.
+    The tree is built by going through subsets of mushrooms.
+
+    Args:
+        mushrooms (list or Dataset): Mushroom objects representing the dataset.
+        backend (str): 'python', 'numpy' (needing NumPy to be installed) or 'bitset'.
+        n_jobs (int): Number of processes building the tree with the python backend, one per CPU if None.
+        on_node (callable): Function called with the statistics of every node built (see build_subtree), like a profiling.TrainingProfile.
+        max_depth (int): Depth from which the nodes become leaves of their majority class, no limit if None.
+        min_samples (int): Minimal number of mushrooms of a node to split it.
+        breadth_first (bool): Indicates if the tree is built level by level instead of branch by branch.
+        cache (SplitCache): Cache of the splits of the subsets, kept between several trees of the same dataset.
+        min_gain (float): Minimal information gain of a split, the nodes without such a split becoming leaves of their majority class.
+        parallel_threshold (int): Minimal number of rows of a subtree to build it in a worker process when n_jobs isn't 1.
+
+    Returns:
+        Node: The root node of the decision tree.
+    '''
+    dataset = Dataset.from_mushrooms(mushrooms)
+    if n_jobs != 1 and (backend != 'python' or breadth_first):
+        raise ValueError('Only the python backend builds the tree with several processes, and branch by branch')
+    if (on_node is not None or cache is not None) and (backend != 'python' or n_jobs != 1):
+        raise ValueError('Nodes can only be profiled or cached with the python backend and n_jobs = 1')
+    if backend == 'python' and n_jobs != 1:
+        from parallel import build_parallel_tree #imported only when needed
+        return build_parallel_tree(dataset, n_jobs, parallel_threshold, max_depth = max_depth, min_samples = min_samples,
+                                   min_gain = min_gain)
+    elif backend == 'numpy':
+        from numpy_backend import build_numpy_tree #imported only when needed
+        return build_numpy_tree(dataset, max_depth, min_samples, breadth_first, min_gain)
+    elif backend == 'bitset':
+        from bitset_backend import build_bitset_tree #imported only when needed
+        return build_bitset_tree(dataset, max_depth, min_samples, breadth_first, min_gain)
+    elif backend != 'python':
+        raise ValueError(f'Unknown backend: {backend}')
+    return build_subtree(dataset, dataset.row_indices(), on_node, 0, max_depth, min_samples, breadth_first,
+                         cache = cache, min_gain = min_gain)
+
+
+def build_subtree(dataset: Dataset, rows, on_node = None, depth: int = 0, max_depth: int = None,
+                  min_samples: int = 2, breadth_first: bool = False, attributes: list[int] = None,
+                  cache: 'SplitCache' = None, min_gain: float = 0.0) -> Node:
+    '''
+    Builds the subtree of a subset of rows. The splitting attribute is chosen
+    from a contingency table counted in a single pass over the rows and only
+    the rows of the chosen attribute are partitioned. The subsets waiting to
+    be split are kept in a queue instead of the call stack, so the depth of
+    the tree isn't bounded by the recursion limit, and they are split branch
+    by branch (preorder) or level by level (breadth_first).
+    An attribute with a single value in a subset has a single value in every
+    subset below it, so it is dropped from the candidates of the descendants.
+    If on_node is given, it is called for every node, before its children are
+    built, with a dictionary of statistics: depth, samples, edibles,
+    candidates (attributes splitting the subset), attribute (None for a leaf),
+    cardinality and gain of the attribute, and the seconds spent counting the
+    values, computing the information gains and partitioning the rows.
+
+    Args:
+        dataset (Dataset): The dataset containing the rows.
+        rows (iterable): Indices of the rows of the subset.
+        on_node (callable): Function called with the statistics of every node, nothing is measured if None.
+        depth (int): The depth of the subtree's root.
+        max_depth (int): Depth from which the nodes become leaves of their majority class, no limit if None.
+        min_samples (int): Minimal number of mushrooms of a node to split it.
+        breadth_first (bool): Indicates if the subsets are split level by level.
+        attributes (list): Indices of the candidate attributes, in increasing order, every attribute if None.
+        cache (SplitCache): Cache of the splits of the subsets, nothing is cached if None.
+        min_gain (float): Minimal information gain of a split, the nodes without such a split becoming leaves.
+
+    Returns:
+        Node: The root node of the subtree.
+    '''
+    if attributes is None:
+        attributes = range(len(dataset.attributes_))
+    if cache is not None and cache.dataset_ is not dataset:
+        raise ValueError('The cache belongs to another dataset')
+    root = None
+    pending = deque([(None, None, rows, depth, attributes)])
+    pop = pending.popleft if breadth_first else pending.pop
+    while pending:
+        parent, label, rows, depth, attributes = pop()
+        subsets = None
+
+        #leaves
+        edible_rows = list(compress(rows, map(dataset.labels_.__getitem__, rows)))
+        edibles = len(edible_rows)
+        if edibles == len(rows) or edibles == 0:
+            if on_node is not None:
+                on_node(node_statistics(depth, len(rows), edibles))
+            node = Node('Yes' if edibles else 'No', True, samples = len(rows), edibles = edibles)
+        elif (max_depth is not None and depth >= max_depth) or len(rows) < min_samples:
+            if on_node is not None:
+                on_node(node_statistics(depth, len(rows), edibles))
+            node = Node('Yes' if get_majority(edibles, len(rows)) else 'No', True, samples = len(rows), edibles = edibles)
+
+        else:
+            #attribute choice, split_attr being the index of the attribute among the candidates
+            if on_node is not None:
+                start = perf_counter()
+            key = None if cache is None else cache.signature(rows, attributes, min_gain)
+            split = None if key is None else cache.get(key)
+            if split is None:
+                table = get_contingency_table(dataset, rows, edible_rows, attributes)
+                if on_node is not None:
+                    counted = perf_counter()
+                split_attr = choose_split_attribute(table, edibles, len(rows), min_gain)
+                if key is not None:
+                    cache.put(key, (table, split_attr))
+            else:
+                table, split_attr = split
+                if on_node is not None:
+                    counted = perf_counter()
+            if on_node is not None:
+                chosen = perf_counter()
+
+            if split_attr is None:
+                #identical mushrooms with different edibility, or too small gain: keeping the majority
+                if on_node is not None:
+                    on_node(node_statistics(depth, len(rows), edibles, counting = counted - start, gain = chosen - counted))
+                node = Node('Yes' if get_majority(edibles, len(rows)) else 'No', True, samples = len(rows), edibles = edibles)
+            else:
+                attribute = attributes[split_attr]
+                node = Node(dataset.attributes_[attribute], majority = get_majority(edibles, len(rows)),
+                            samples = len(rows), edibles = edibles)
+                subsets = partition_rows(dataset, rows, attribute)
+                if on_node is not None:
+                    on_node(node_statistics(depth, len(rows), edibles, table, split_attr, dataset.attributes_[attribute],
+                                            counted - start, chosen - counted, perf_counter() - chosen))
+
+        if parent is None:
+            root = node
+        else:
+            parent.add_edge(label, node)
+
+        #the children are added to their parent in the order of the subsets
+        if subsets is not None:
+            vocabulary = dataset.vocabularies_[attribute]
+            candidates = [candidate for candidate, counts in zip(attributes, table)
+                          if len(counts) > 1 and candidate != attribute]
+            children = [(node, vocabulary[code], subset, depth + 1, candidates) for code, subset in subsets.items()]
+            pending.extend(children if breadth_first else reversed(children))
+
+    return root
+
+
+def node_statistics(depth: int, samples: int, edibles: int, table: list[dict] = None, split_attr: int = None,
+                    attribute: str = None, counting: float = 0.0, gain: float = 0.0, partitioning: float = 0.0) -> dict:
+    '''
+    Gathers the statistics of a node given to the on_node function of build_subtree.
+
+    Args:
+        depth (int): The depth of the node.
+        samples (int): Number of mushrooms of the node.
+        edibles (int): Number of edible mushrooms of the node.
+        table (list): The contingency table of the node, None if it wasn't counted.
+        split_attr (int): The index of the splitting attribute, None for a leaf.
+        attribute (str): The name of the splitting attribute.
+        counting (float): Seconds spent counting the values of the attributes.
+        gain (float): Seconds spent computing the information gains.
+        partitioning (float): Seconds spent partitioning the rows.
+
+    Returns:
+        dict: The statistics of the node.
+    '''
+    statistics = {
+        'depth': depth,
+        'samples': samples,
+        'edibles': edibles,
+        'candidates': 0 if table is None else sum(len(counts) > 1 for counts in table),
+        'attribute': attribute,
+        'cardinality': 0,
+        'gain': None,
+        'counting_seconds': counting,
+        'gain_seconds': gain,
+        'partition_seconds': partitioning,
+    }
+    if split_attr is not None:
+        counts = table[split_attr]
+        statistics['cardinality'] = len(counts)
+        statistics['gain'] = get_info_gain_from_counts(counts.values(), get_entropy_from_counts(edibles, samples), samples)
+    return statistics
+
+
+class SplitCache:
+    '''
+    Bounded cache of the contingency tables and splitting attributes of the
+    subsets of a dataset, reused when several trees are built from the same
+    dataset (for example with different stopping rules). A subset is
+    identified by a digest of its row indices and of its candidate
+    attributes. The least recently used subsets are forgotten first.
+
+    Attributes:
+        dataset_ (Dataset): The dataset whose subsets are cached.
+        maxsize_ (int): Maximal number of cached subsets.
+        entries_ (OrderedDict): Dictionary mapping signatures to (table, split), the least recently used first.
+        hits_ (int): Number of subsets found in the cache.
+        misses_ (int): Number of subsets missing from the cache.
+    '''
+
+    def __init__(self, dataset: Dataset, maxsize: int = 4096):
+        '''
+        Initializes an empty SplitCache object.
+
+        Args:
+            dataset (Dataset): The dataset whose subsets are cached. It can grow, but its rows can't change.
+            maxsize (int): Maximal number of cached subsets.
+
+        Returns:
+            None
+        '''
+        self.dataset_ = dataset
+        self.maxsize_ = maxsize
+        self.entries_ = OrderedDict()
+        self.hits_ = 0
+        self.misses_ = 0
+
+
+    def __len__(self) -> int:
+        return len(self.entries_)
+
+
+    def signature(self, rows, attributes, min_gain: float = 0.0) -> tuple:
+        '''
+        Computes the key of a subset, much cheaper than counting its values.
+
+        Args:
+            rows (iterable): Indices of the rows of the subset.
+            attributes (iterable): Indices of the candidate attributes.
+            min_gain (float): Minimal information gain of the split, which can make it a leaf.
+
+        Returns:
+            tuple: The key of the subset.
+        '''
+        if isinstance(rows, range):
+            key = (rows.start, rows.stop, rows.step)
+        else:
+            if not isinstance(rows, array) or rows.typecode != 'I':
+                rows = array('I', rows)
+            import hashlib #imported only when needed
+            key = (len(rows), hashlib.blake2b(rows, digest_size = 16).digest())
+        return key + (min_gain,) + tuple(attributes)
+
+
+    def get(self, key: tuple):
+        '''
+        Retrieves the split of a subset and marks it as recently used.
+
+        Args:
+            key (tuple): The signature of the subset.
+
+        Returns:
+            tuple: The contingency table and the index of the splitting attribute in it, None if the subset isn't cached.
+        '''
+        split = self.entries_.get(key)
+        if split is None:
+            self.misses_ += 1
+        else:
+            self.hits_ += 1
+            self.entries_.move_to_end(key)
+        return split
+
+
+    def put(self, key: tuple, split: tuple) -> None:
+        '''
+        Caches the split of a subset, forgetting the least recently used one if the cache is full.
+
+        Args:
+            key (tuple): The signature of the subset.
+            split (tuple): The contingency table and the index of the splitting attribute in it.
+
+        Returns:
+            None
+        '''
+        self.entries_[key] = split
+        self.entries_.move_to_end(key)
+        if len(self.entries_) > self.maxsize_:
+            self.entries_.popitem(last = False)
+
+
+    def cache_info(self) -> dict:
+        '''
+        Retrieves the counters of the cache, to tune its size.
+
+        Returns:
+            dict: The hits, misses, current size and maximal size of the cache.
+        '''
+        return {'hits': self.hits_, 'misses': self.misses_, 'size': len(self.entries_), 'maxsize': self.maxsize_}
+
+
+def get_majority(edibles: int, total: int) -> bool:
+    '''
+    Finds the majority class of a subset, poisonous on a tie.
+
+    Args:
+        edibles (int): Number of edible mushrooms in the subset.
+        total (int): Number of mushrooms in the subset.
+
+    Returns:
+        bool: True if most of the mushrooms are edible.
+    '''
+    return edibles > total - edibles
+
+
+def choose_split_attribute(table: list[dict], edibles: int, total: int, min_gain: float = 0.0) -> int:
+    '''
+    Chooses the attribute with the best information gain from the counts of a
+    subset. On equal gains, the first attribute is kept.
+
+    Args:
+        table (list): For each attribute, a dictionary mapping value codes to (mushrooms, edibles).
+        edibles (int): Number of edible mushrooms in the subset.
+        total (int): Number of mushrooms in the subset.
+        min_gain (float): Minimal information gain of the chosen attribute.
+
+    Returns:
+        int: The index of the attribute in the table, None if no attribute splits the subset with enough gain.
+    '''
+    parent_entropy = get_entropy_from_counts(edibles, total)
+    max_info_gain = -1
+    split_attr = None
+    for attribute, counts in enumerate(table):
+        if len(counts) < 2:
+            continue #the attribute doesn't split the subset
+        info_gain = get_info_gain_from_counts(counts.values(), parent_entropy, total)
+
+        if info_gain > max_info_gain:
+            max_info_gain = info_gain
+            split_attr = attribute
+
+    return split_attr if max_info_gain >= min_gain else None
+
+
+def get_contingency_table(dataset: Dataset, rows, edible_rows, attributes = None) -> list[dict]:
+    '''
+    Counts, for every attribute and every value, the number of mushrooms and
+    the number of edible mushrooms of a subset. The values are kept in the
+    order in which they first appear in the subset.
+
+    Args:
+        dataset (Dataset): The dataset containing the rows.
+        rows (iterable): Indices of the rows of the subset.
+        edible_rows (iterable): Indices of the edible rows of the subset.
+        attributes (list): Indices of the attributes to count, every attribute if None.
+
+    Returns:
+        list: For each attribute, a dictionary mapping value codes to (mushrooms, edibles).
+    '''
+    if attributes is None:
+        attributes = range(len(dataset.attributes_))
+    every_row = isinstance(rows, range) and len(rows) == len(dataset.labels_)
+    labels = bytes(dataset.labels_) if every_row else bytes(map(dataset.labels_.__getitem__, rows))
+    table = []
+    for attribute in attributes:
+        column, vocabulary = dataset.columns_[attribute], dataset.vocabularies_[attribute]
+        if column.itemsize > 1 or len(vocabulary) > 64:
+            #too many values to count them one by one
+            edibles = Counter(map(column.__getitem__, edible_rows))
+            table.append({code: (n, edibles[code]) for code, n in
+                          Counter(map(column.__getitem__, rows)).items()})
+            continue
+
+        #gathering the codes of the subset in a byte string to count them in C
+        codes = column.tobytes() if every_row else bytes(map(column.__getitem__, rows))
+        edible_codes = bytes(compress(codes, labels))
+        firsts = sorted((codes.find(code), code) for code in range(len(vocabulary)))
+        table.append({code: (codes.count(code), edible_codes.count(code))
+                      for first, code in firsts if first != -1})
+    return table
+
+
+def partition_rows(dataset: Dataset, rows, attribute: int) -> dict:
+    '''
+    Splits a subset of rows according to the values of an attribute.
+
+    Args:
+        dataset (Dataset): The dataset containing the rows.
+        rows (iterable): Indices of the rows of the subset.
+        attribute (int): The index of the attribute.
+
+    Returns:
+        dict: Dictionary mapping value codes to arrays of row indices, in order of first appearance.
+    '''
+    column = dataset.columns_[attribute]
+    subsets = {}
+    for row in rows:
+        code = column[row]
+        if code not in subsets:
+            subsets[code] = array('I')
+        subsets[code].append(row)
+    return subsets
+
+
+def get_attribute_values(attribute: str, mushrooms: list[Mushroom]) -> dict:
+    '''
+    Retrieves all attribute values and mushrooms that have this value.
+
+    Args:
+        attribute (str): The name of the attribute.
+        mushrooms (list or Dataset): Mushroom objects representing the dataset.
+
+    Returns:
+        dict: Dictionary mapping attribute values to lists (or dataset views) of corresponding mushrooms.
+    '''
+    if isinstance(mushrooms, Dataset):
+        #grouping the rows by code, then decoding once per value
+        attribute = mushrooms.attribute_index(attribute)
+        vocabulary = mushrooms.vocabularies_[attribute]
+        subsets = partition_rows(mushrooms, mushrooms.row_indices(), attribute)
+        return {vocabulary[code]: mushrooms.subset(rows) for code, rows in subsets.items()}
+
+    subsets = {}
+    for mushroom in mushrooms:
+        attribute_value = mushroom.get_attribute(attribute)
+        if attribute_value not in subsets:
+            subsets[attribute_value] = []
+        subsets[attribute_value].append(mushroom)
+    
+    return subsets
+
+
+def number_of_edibles(mushrooms: list[Mushroom]) -> int:
+    '''
+    Counts the number of edible mushrooms in a dataset.
+
+    Args:
+        mushrooms (list or Dataset): Mushroom objects representing the dataset.
+
+    Returns:
+        int: Number of edible mushrooms.
+    '''
+    if isinstance(mushrooms, Dataset):
+        return mushrooms.number_of_edibles()
+    return sum(1 for mushroom in mushrooms if mushroom.is_edible())
+
+
+def get_info_gain(attribute_values: dict, parent_entropy: int, total_mushrooms: int) -> int:
+    '''
+    Calculates the information gain of an attribute by going through all of its possible values.
+    It uses the formula given in the project guidelines
+
+    Args:
+        attribute_values (dict): Dictionary mapping attribute values to lists of corresponding mushrooms.
+        parent_entropy (int): Entropy of the parent dataset.
+        total_mushrooms (int): Total number of mushrooms in the dataset.
+
+    Returns:
+        int: Information gain of the attribute.
+    '''
+    counts = ((len(shrooms), number_of_edibles(shrooms)) for shrooms in attribute_values.values())
+    return get_info_gain_from_counts(counts, parent_entropy, total_mushrooms)
+
+
+def get_info_gain_from_counts(counts, parent_entropy: int, total_mushrooms: int) -> int:
+    '''
+    Calculates the information gain of an attribute from the counts of its values.
+
+    Args:
+        counts (iterable): For each value, the number of mushrooms and the number of edible ones.
+        parent_entropy (int): Entropy of the parent dataset.
+        total_mushrooms (int): Total number of mushrooms in the dataset.
+
+    Returns:
+        int: Information gain of the attribute.
+    '''
+    sum = 0
+    for mushrooms, edibles in counts:
+        sum += (edibles / total_mushrooms) * get_entropy_from_counts(edibles, mushrooms)
+    return parent_entropy - sum
+
+
+def get_entropy(subset: list[Mushroom]) -> int:
+    '''
+    Calculates the entropy of a given dataset based on the formula given in
+    the project guidelines.
+
+    Args:
+        subset (list): Subset of Mushroom objects representing a dataset.
+
+    Returns:
+        int: Entropy of the dataset.
+    '''
+    return get_entropy_from_counts(number_of_edibles(subset), len(subset))
+
+
+def get_entropy_from_counts(edibles: int, total: int) -> int:
+    '''
+    Calculates the entropy of a dataset from its number of edible mushrooms.
+
+    Args:
+        edibles (int): Number of edible mushrooms.
+        total (int): Total number of mushrooms.
+
+    Returns:
+        int: Entropy of the dataset.
+    '''
+    py = (edibles / total)
+    return 0 if (py == 0 or py == 1) else (py * log2((1 - py) / py)) - log2(1 - py) 
+
+
+def all_edible(mushrooms: list[Mushroom]) -> list:
+    '''
+    Retrieves all edible mushrooms from a dataset.
+
+    Args:
+        mushrooms (list): List of Mushroom objects representing the dataset.
+
+    Returns:
+        list: List of edible Mushroom objects.
+    '''
+    edibles = []
+    for mushroom in mushrooms:
+        if mushroom.is_edible():
+            edibles.append(mushroom)
+    return edibles
+
+
+def is_edible(root: Node, mushroom: Mushroom, unseen = None) -> bool:
+    '''
+    Checks if a given mushroom is edible by going down the previously
+    built tree.
+
+    Args:
+        root (Node): The root node of the decision tree.
+        mushroom (Mushroom): The mushroom to check, which can be a row of a Dataset.
+        unseen (bool or str): Answer when a value of the mushroom has no edge: None, True, False,
+                              or 'majority' for the majority class of the node.
+
+    Returns:
+        bool: True if the mushroom is edible, False otherwise.
+    '''
+    while root.criterion_ != 'Yes' and root.criterion_ != 'No':
+        #finding the right route in constant time
+        child = root.get_child(mushroom.get_attribute(root.criterion_))
+        if child is None:
+            return root.majority_ if unseen == 'majority' else unseen
+        root = child
+    return root.criterion_ == 'Yes'
+
+
+def get_edible_probability(root: Node, mushroom: Mushroom) -> float:
+    '''
+    Computes the probability that a mushroom is edible, from the training
+    mushrooms of the leaf it reaches (or of the node where its value has no edge).
+
+    Args:
+        root (Node): The root node of the decision tree, built with its training counts.
+        mushroom (Mushroom): The mushroom to check, which can be a row of a Dataset.
+
+    Returns:
+        float: The share of edible training mushrooms of the node, None if its counts are unknown.
+    '''
+    while not root.is_leaf():
+        child = root.get_child(mushroom.get_attribute(root.criterion_))
+        if child is None:
+            break
+        root = child
+    return root.get_probability()
+
+
+def display(tree: Node, indent = 0, file = None) -> None:
+    '''
+    Displays the decision tree using preorder traversal.
+
+    Args:
+        tree (Node): The root node of the decision tree.
+        indent (int): The indentation level for formatting.
+        file (file): The file object to write to, the standard output if None.
+
+    Returns:
+        None
+    '''
+    (file or sys.stdout).writelines(iter_display(tree, indent))
+
+
+def iter_display(tree: Node, indent = 0):
+    '''
+    Generates the lines displayed by display, one at a time.
+
+    Args:
+        tree (Node): The root node of the decision tree.
+        indent (int): The indentation level for formatting.
+
+    Returns:
+        generator: The lines, ending with a newline.
+    '''
+    #nodes to display with their indentation and the line of the edge leading to them
+    stack = [(tree, indent, None)]
+    while stack:
+        node, indent, line = stack.pop()
+        if line is not None:
+            yield f'{" " * (indent - 4)}{line}\n'
+        if node.is_leaf():
+            prt = f'\u21B3 \x1b[91m{node.criterion_}\x1b[0m' if node.criterion_ == 'No'\
+                                                    else f'\u21B3 \x1b[92m{node.criterion_}\x1b[0m'
+            yield f'{" " * indent}{prt}\n'
+            continue
+        stack.extend(reversed([(edge.child_, indent + 4, f'\x1b[1m{node.criterion_}\x1b[0m = \x1b[3m{edge.label_}\x1b[0m')
+                               for edge in node.edges_]))
+    
+    
+def bool_tree(tree: Node) -> str:
+    '''
+    Generates the boolean expression representing the decision tree.
+
+    Args:
+        tree (Node): The root node of the decision tree.
+
+    Returns:
+        str: The boolean expression representing the decision tree.
+    '''
+    return ''.join(iter_bool_tree(tree))
+
+
+def write_bool_tree(tree: Node, f) -> None:
+    '''
+    Writes the boolean expression representing the decision tree without
+    building it in memory.
+
+    Args:
+        tree (Node): The root node of the decision tree.
+        f (file): The file object to write to.
+
+    Returns:
+        None
+    '''
+    f.writelines(iter_bool_tree(tree))
+
+
+def iter_bool_tree(tree: Node):
+    '''
+    Generates the boolean expression representing the decision tree by
+    fragments, in order. A node only needs its own edges to be written, so
+    the subtrees are written in preorder while the closing parentheses wait
+    on the stack.
+
+    Args:
+        tree (Node): The root node of the decision tree.
+
+    Returns:
+        generator: The fragments of the expression.
+    '''
+    #nodes to write, and strings to write as they are
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if node.__class__ is str:
+            yield node
+            continue
+
+        #only treating positive leaves, then the subtrees
+        first_expression_added = False
+        subtrees = []
+        for edge in node.edges_:
+            if not edge.child_.is_leaf():
+                subtrees.append(edge)
+            elif edge.child_.criterion_ == 'Yes':
+                if first_expression_added:
+                    yield ' OR '
+                yield f'({node.criterion_} = {edge.label_})'
+                first_expression_added = True
+
+        separator = ' OR ' if first_expression_added else ''
+        for edge in reversed(subtrees):
+            stack.extend((')', edge.child_, f'{separator}({node.criterion_} = {edge.label_} AND '))
+
+
+#--------------------------BONUS--------------------------#
+def to_python(dt: Node, path: str, attributes: list[str] = None, batch: bool = False) -> None:
+    '''
+    Converts the decision tree to Python code and saves it to a file.
+    The generated module stores the tree as nested dictionaries and
+    defines a predict(row) function going down the tree with one dictionary
+    lookup per node. A row is either a dictionary mapping attribute names to
+    values or a tuple of values ordered like the module's ATTRIBUTES.
+    predict returns True if the mushroom is edible, False if it is poisonous
+    and None if one of its values is unknown to the tree.
+
+    Args:
+        dt (Node): The root node of the decision tree.
+        path (str): The path to save the Python code.
+        attributes (list): Order of the values in tuple rows, the order of appearance in the tree if None.
+        batch (bool): Indicates if a predict_batch(rows) function is also generated.
+
+    Returns:
+        None
+    '''
+    if attributes is None:
+        attributes = tree_attributes(dt)
+    with open(path, 'w', encoding = 'utf-8') as f:
+        f.write("'''\nDecision tree generated by project.py.\n'''\n\n\n")
+        f.write(f'ATTRIBUTES = {tuple(attributes)!r}\n\n')
+        f.write('#a node is (attribute, index in ATTRIBUTES, {value: child}), a leaf is its edibility\n')
+        f.write('TREE = ')
+        write_python(dt, f, {name: i for i, name in enumerate(attributes)})
+        f.write('\n\n\n'
+                'def predict(row):\n'
+                '    node = TREE\n'
+                '    if isinstance(row, dict):\n'
+                '        while node.__class__ is tuple:\n'
+                '            node = node[2].get(row.get(node[0]))\n'
+                '    else:\n'
+                '        while node.__class__ is tuple:\n'
+                '            node = node[2].get(row[node[1]])\n'
+                '    return node\n')
+        if batch:
+            f.write('\n\n'
+                    'def predict_batch(rows):\n'
+                    '    return [predict(row) for row in rows]\n')
+
+
+def write_python(tree : Node, f, positions: dict, indent = 0) -> None:
+    '''
+    Writes the Python literal representing the decision tree.
+
+    Args:
+        tree (Node): The root node of the decision tree.
+        f (file): The file object to write to.
+        positions (dict): Dictionary mapping attribute names to their index in tuple rows.
+        indent (int): The indentation level for formatting.
+
+    Returns:
+        None
+    '''
+    f.writelines(iter_python(tree, positions, indent))
+
+
+def iter_python(tree : Node, positions: dict, indent = 0):
+    '''
+    Generates the Python literal representing the decision tree by fragments, in order.
+
+    Args:
+        tree (Node): The root node of the decision tree.
+        positions (dict): Dictionary mapping attribute names to their index in tuple rows.
+        indent (int): The indentation level for formatting.
+
+    Returns:
+        generator: The fragments of the literal.
+    '''
+    #nodes to write with their indentation, and strings to write as they are
+    stack = [(tree, indent)]
+    while stack:
+        item = stack.pop()
+        if item.__class__ is str:
+            yield item
+            continue
+        node, indent = item
+        if node.is_leaf():
+            yield repr(node.criterion_ == 'Yes')
+            continue
+        yield f'({node.criterion_!r}, {positions[node.criterion_]}, {{\n'
+        stack.append(f'{" " * indent}}})')
+        for edge in reversed(node.edges_):
+            stack.extend((',\n', (edge.child_, indent + 4), f'{" " * (indent + 4)}{edge.label_!r}: '))
+
+
+def tree_attributes(tree: Node) -> list[str]:
+    '''
+    Retrieves the attributes tested in the decision tree.
+
+    Args:
+        tree (Node): The root node of the decision tree.
+
+    Returns:
+        list: The names of the attributes, in order of appearance in a preorder traversal.
+    '''
+    ret = []
+    nodes = [tree]
+    while nodes:
+        node = nodes.pop()
+        if not node.is_leaf() and node.criterion_ not in ret:
+            ret.append(node.criterion_)
+        nodes.extend(reversed([edge.child_ for edge in node.edges_]))
+    return ret
+#---------------------------------------------------------#
+
+
+def chosen_path(root : Node) -> None:
+    '''
+    Guides the user through the decision tree to determine the edibility of a mushroom.
+
+    Args:
+        root (Node): The root node of the decision tree.
+
+    Returns:
+        None
+    '''
+    while root.criterion_ != 'Yes' and root.criterion_ != 'No':
+        attribute = str(input(f'Please input the {root.criterion_} of your mushroom: '))
+        child = root.get_child(attribute)
+        if child is not None:
+            root = child
+    
+    res = 'Your mushroom is indeed \x1b[92mcomestible\x1b[0m.' if root.criterion_ == 'Yes' else 'Your mushroom is \x1b[91mpoisonous\x1b[0m.'
+    print(res)
+    return True if root.criterion_ == 'Yes' else False
+            
+
+def main():
+    '''
+    Runs a command of the decision tree (train, predict, show, export or
+    interactive, see cli.py), without building the tree when a cached model exists.
+    '''
+    from cli import main as run_command #imported only when needed
+    run_command()
+
+
+
+
+if __name__ == '__main__':
     main()
\ No newline at end of file
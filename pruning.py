@@ -0,0 +1,360 @@
+"""
+Pruning of the decision tree. build_decision_tree can stop early
+(max_depth, min_samples, min_gain), and the functions below cut a grown
+tree afterwards:
+
+    reduced_error_prune    replaces a subtree by a leaf of its majority class
+                           when this doesn't make more errors on validation rows
+    cost_complexity_path   the sequence of subtrees of the weakest-link pruning
+                           of CART, each one for a growing complexity cost alpha
+
+The pruned trees are copies, the original tree is left as it is. The nodes
+keep their training counts, so that an impure leaf gives the probability
+of its mushrooms to be edible (Node.get_probability).
+Run with: python pruning.py [noisy.csv] [--test 0.2] [--validation 0.2]
+"""
+
+
+import argparse
+from time import perf_counter
+
+from compiled import compile_tree, predict_batch
+from evaluation import holdout_split
+from project import Dataset, Node, bool_tree, build_decision_tree, is_edible, load_dataset
+
+
+def leaf_errors(node: Node) -> int:
+    '''
+    Counts the training mushrooms misclassified by a node turned into a leaf of its majority class.
+
+    Args:
+        node (Node): The node, whose training counts are known.
+
+    Returns:
+        int: The number of misclassified mushrooms.
+    '''
+    if node.samples_ is None:
+        raise ValueError('The training counts of the tree are unknown')
+    edible = node.criterion_ == 'Yes' if node.is_leaf() else node.majority_
+    return node.samples_ - node.edibles_ if edible else node.edibles_
+
+
+def postorder(tree: Node, pruned: set = frozenset()) -> list[Node]:
+    '''
+    Lists the inner nodes of a tree, every node after its descendants.
+
+    Args:
+        tree (Node): The root node of the tree.
+        pruned (set): The ids of the nodes taken as leaves, whose descendants are skipped.
+
+    Returns:
+        list: The inner nodes.
+    '''
+    nodes = []
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if not node.is_leaf() and id(node) not in pruned:
+            nodes.append(node)
+            stack.extend(edge.child_ for edge in node.edges_)
+    nodes.reverse()
+    return nodes
+
+
+def prune_tree(tree: Node, pruned: set) -> Node:
+    '''
+    Copies a tree, some of its inner nodes becoming leaves of their majority class.
+
+    Args:
+        tree (Node): The root node of the tree.
+        pruned (set): The ids (id(node)) of the nodes turned into leaves.
+
+    Returns:
+        Node: The root node of the pruned copy.
+    '''
+    def copy(node: Node) -> Node:
+        if node.is_leaf():
+            return Node(node.criterion_, True, samples = node.samples_, edibles = node.edibles_)
+        if id(node) in pruned:
+            return Node('Yes' if node.majority_ else 'No', True, samples = node.samples_, edibles = node.edibles_)
+        return Node(node.criterion_, majority = node.majority_, samples = node.samples_, edibles = node.edibles_)
+
+    root = copy(tree)
+    stack = [(tree, root)]
+    while stack:
+        node, node_copy = stack.pop()
+        if node_copy.is_leaf():
+            continue
+        for edge in node.edges_:
+            child = copy(edge.child_)
+            node_copy.add_edge(edge.label_, child)
+            stack.append((edge.child_, child))
+    return root
+
+
+def validation_counts(tree: Node, dataset: Dataset, rows) -> dict:
+    '''
+    Sends rows down a tree and counts, for every node, the rows reaching it
+    and the rows stopped on it by a value without edge.
+
+    Args:
+        tree (Node): The root node of the tree.
+        dataset (Dataset): The dataset containing the rows, with the attributes of the tree.
+        rows (iterable): Indices of the rows.
+
+    Returns:
+        dict: Dictionary mapping the ids of the nodes to (rows, edible rows, stopped rows, edible stopped rows).
+    '''
+    counts = {}
+    pending = [(tree, list(rows))]
+    while pending:
+        node, rows = pending.pop()
+        edibles = sum(map(dataset.labels_.__getitem__, rows))
+        if node.is_leaf():
+            counts[id(node)] = (len(rows), edibles, 0, 0)
+            continue
+        attribute = dataset.attribute_index(node.criterion_)
+        column, vocabulary = dataset.columns_[attribute], dataset.vocabularies_[attribute]
+        subsets = {id(edge.child_): [] for edge in node.edges_}
+        children = {edge.label_: edge.child_ for edge in node.edges_}
+        stopped = []
+        for row in rows:
+            child = children.get(vocabulary[column[row]])
+            (stopped if child is None else subsets[id(child)]).append(row)
+        counts[id(node)] = (len(rows), edibles, len(stopped), sum(map(dataset.labels_.__getitem__, stopped)))
+        pending.extend((edge.child_, subsets[id(edge.child_)]) for edge in node.edges_)
+    return counts
+
+
+def reduced_error_prune(tree: Node, dataset: Dataset, rows) -> Node:
+    '''
+    Prunes a tree with validation rows, from the bottom up: a subtree becomes
+    a leaf of its majority class when the leaf doesn't misclassify more
+    validation rows than the subtree. The rows stopped by an unknown value
+    get the majority class of their node.
+
+    Args:
+        tree (Node): The root node of the tree.
+        dataset (Dataset): The dataset containing the validation rows.
+        rows (iterable): Indices of the validation rows, which the tree hasn't learnt from.
+
+    Returns:
+        Node: The root node of the pruned copy.
+    '''
+    counts = validation_counts(tree, dataset, rows)
+
+    def errors_as_leaf(node: Node, n: int, edibles: int) -> int:
+        edible = node.criterion_ == 'Yes' if node.is_leaf() else node.majority_
+        return n - edibles if edible else edibles
+
+    errors = {}
+    pruned = set()
+    for node in postorder(tree):
+        n, edibles, stopped, stopped_edibles = counts[id(node)]
+        subtree_errors = errors_as_leaf(node, stopped, stopped_edibles)
+        for edge in node.edges_:
+            child = edge.child_
+            subtree_errors += errors[id(child)] if id(child) in errors else errors_as_leaf(child, *counts[id(child)][:2])
+        errors[id(node)] = min(subtree_errors, errors_as_leaf(node, n, edibles))
+        if errors_as_leaf(node, n, edibles) <= subtree_errors:
+            pruned.add(id(node))
+    return prune_tree(tree, pruned)
+
+
+def cost_complexity_path(tree: Node) -> list[tuple]:
+    '''
+    Computes the weakest-link pruning of a tree from its training counts.
+    At every step, the inner nodes whose subtree removes the fewest training
+    errors per extra leaf (the smallest alpha) become leaves, until only the
+    root is left.
+
+    Args:
+        tree (Node): The root node of the tree, whose training counts are known.
+
+    Returns:
+        list: (alpha, ids of the pruned nodes) for every subtree, from the whole tree (alpha 0) to the root alone.
+    '''
+    pruned = set()
+    path = [(0.0, frozenset())]
+    while not tree.is_leaf() and id(tree) not in pruned:
+        #training errors and leaves of the subtrees of the current tree
+        subtrees = {}
+        alphas = {}
+        for node in postorder(tree, pruned):
+            errors = leaves = 0
+            for edge in node.edges_:
+                child_errors, child_leaves = subtrees.get(id(edge.child_), (leaf_errors(edge.child_), 1))
+                errors += child_errors
+                leaves += child_leaves
+            subtrees[id(node)] = (errors, leaves)
+            alphas[id(node)] = (leaf_errors(node) - errors) / (leaves - 1)
+
+        alpha = min(alphas.values())
+        pruned |= {node for node, value in alphas.items() if value <= alpha + 1e-12}
+        path.append((max(alpha, path[-1][0]), frozenset(pruned)))
+    return path
+
+
+def cost_complexity_prune(tree: Node, alpha: float) -> Node:
+    '''
+    Prunes a tree for a complexity cost: the biggest subtree of the
+    weakest-link pruning whose alpha doesn't exceed the cost.
+
+    Args:
+        tree (Node): The root node of the tree, whose training counts are known.
+        alpha (float): The cost of a leaf, in training errors.
+
+    Returns:
+        Node: The root node of the pruned copy.
+    '''
+    pruned = frozenset()
+    for step_alpha, step_pruned in cost_complexity_path(tree):
+        if step_alpha > alpha:
+            break
+        pruned = step_pruned
+    return prune_tree(tree, pruned)
+
+
+def tree_size(tree: Node) -> tuple:
+    '''
+    Measures a tree.
+
+    Args:
+        tree (Node): The root node of the tree.
+
+    Returns:
+        tuple: The number of nodes, the number of leaves and the depth.
+    '''
+    nodes = leaves = depth = 0
+    stack = [(tree, 0)]
+    while stack:
+        node, node_depth = stack.pop()
+        nodes += 1
+        leaves += node.is_leaf()
+        depth = max(depth, node_depth)
+        stack.extend((edge.child_, node_depth + 1) for edge in node.edges_)
+    return nodes, leaves, depth
+
+
+def get_accuracy(tree: Node, dataset: Dataset, rows) -> float:
+    '''
+    Computes the share of rows well classified by a tree, the rows stopped by an unknown value getting the majority class of their node.
+
+    Args:
+        tree (Node): The root node of the tree.
+        dataset (Dataset): The dataset containing the rows.
+        rows (array): Indices of the rows.
+
+    Returns:
+        float: The accuracy, None without rows.
+    '''
+    if not len(rows):
+        return None
+    predictions = predict_batch(compile_tree(tree, dataset), dataset.subset(rows), 'majority')
+    return sum(prediction == dataset.labels_[row] for row, prediction in zip(rows, predictions)) / len(rows)
+
+
+def measure_tree(name: str, tree: Node, dataset: Dataset, rows) -> dict:
+    '''
+    Measures the size, the accuracy and the prediction latency of a tree.
+
+    Args:
+        name (str): The name of the tree in the report.
+        tree (Node): The root node of the tree.
+        dataset (Dataset): The dataset containing the test rows.
+        rows (array): Indices of the test rows.
+
+    Returns:
+        dict: The name, nodes, leaves, depth, accuracy, mean time in microseconds to classify one mushroom
+        with is_edible and number of characters of the boolean expression.
+    '''
+    nodes, leaves, depth = tree_size(tree)
+    mushrooms = list(dataset.subset(rows))
+    start = perf_counter()
+    for mushroom in mushrooms:
+        is_edible(tree, mushroom, 'majority')
+    latency = (perf_counter() - start) / max(1, len(mushrooms)) * 1e6
+    return {
+        'name': name,
+        'nodes': nodes,
+        'leaves': leaves,
+        'depth': depth,
+        'accuracy': get_accuracy(tree, dataset, rows),
+        'predict_us': latency,
+        'bool_tree_chars': len(bool_tree(tree)),
+    }
+
+
+def tradeoff_report(dataset: Dataset, train, validation, test, max_depths: tuple = (2, 4, 6),
+                    min_samples: tuple = (50,), min_gains: tuple = (0.1, 0.3)) -> list[dict]:
+    '''
+    Compares the size, accuracy and prediction latency of the whole tree, of
+    pre-pruned trees and of post-pruned trees.
+
+    Args:
+        dataset (Dataset): The dataset.
+        train (array): Indices of the training rows.
+        validation (array): Indices of the validation rows, used by the post-pruning.
+        test (array): Indices of the test rows.
+        max_depths (tuple): The depths of the pre-pruned trees.
+        min_samples (tuple): The minimal numbers of mushrooms of a split node of the pre-pruned trees.
+        min_gains (tuple): The minimal gains of the pre-pruned trees.
+
+    Returns:
+        list: The measures of every tree (see measure_tree).
+    '''
+    training = dataset.subset(train)
+    full = build_decision_tree(training)
+    trees = [('full tree', full)]
+    trees.extend((f'max_depth = {depth}', build_decision_tree(training, max_depth = depth)) for depth in max_depths)
+    trees.extend((f'min_samples = {samples}', build_decision_tree(training, min_samples = samples)) for samples in min_samples)
+    trees.extend((f'min_gain = {gain}', build_decision_tree(training, min_gain = gain)) for gain in min_gains)
+    trees.append(('reduced error', reduced_error_prune(full, dataset, validation)))
+
+    #the cost of the subtree with the best accuracy on the validation rows, the biggest one on a tie
+    best = None
+    for alpha, pruned in cost_complexity_path(full):
+        accuracy = get_accuracy(prune_tree(full, pruned), dataset, validation)
+        if best is None or accuracy > best[0]:
+            best = (accuracy, alpha, pruned)
+    trees.append((f'cost complexity (alpha = {best[1]:.3g})', prune_tree(full, best[2])))
+
+    return [measure_tree(name, tree, dataset, test) for name, tree in trees]
+
+
+def summary(report: list[dict]) -> str:
+    '''
+    Builds a table of a trade-off report.
+
+    Args:
+        report (list): The result of tradeoff_report.
+
+    Returns:
+        str: The table.
+    '''
+    lines = [f'{"tree":<34}{"nodes":>7}{"leaves":>8}{"depth":>7}{"accuracy":>10}{"predict us":>12}{"bool_tree":>11}']
+    for row in report:
+        lines.append(f'{row["name"]:<34}{row["nodes"]:>7}{row["leaves"]:>8}{row["depth"]:>7}{row["accuracy"]:>10.4f}'
+                     f'{row["predict_us"]:>12.2f}{row["bool_tree_chars"]:>11}')
+    return '\n'.join(lines)
+
+
+def main():
+    '''
+    Prints the trade-off between the size, the accuracy and the prediction latency of pruned trees.
+    '''
+    parser = argparse.ArgumentParser(description = 'Pruning of the mushroom decision tree.')
+    parser.add_argument('dataset', nargs = '?', default = 'mushrooms.csv', help = 'CSV file of the mushrooms')
+    parser.add_argument('--test', type = float, default = 0.2, help = 'proportion of the mushrooms kept for the test')
+    parser.add_argument('--validation', type = float, default = 0.2, help = 'proportion of the other mushrooms kept for the post-pruning')
+    parser.add_argument('--seed', type = int, default = 0, help = 'seed of the shuffling of the mushrooms')
+    args = parser.parse_args()
+
+    dataset = load_dataset(args.dataset)
+    [(rows, test)] = holdout_split(dataset, args.test, args.seed)
+    [(train, validation)] = holdout_split(dataset.subset(rows), args.validation, args.seed)
+    print(summary(tradeoff_report(dataset, train, validation, test)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,418 @@
+"""
+Rule set equivalent to the decision tree. Every path to an edible leaf is a
+rule, a conjunction of conditions 'attribute in {values}', and a mushroom
+is edible if one of the rules matches it. The rules are then minimized:
+
+    merging        rules differing by the values of a single attribute become one
+    widening       a condition takes every value which doesn't make its rule
+                   match a poisonous or unknown region of the tree, when it
+                   is then shorter to write with the values it rejects
+    dropping       a condition which can accept every value disappears
+    subsumption    a rule matching only mushrooms of another rule disappears
+
+The minimized rules still classify as edible exactly the mushrooms the tree
+classifies as edible, as long as their values are known to the tree; the
+mushrooms the tree can't classify are poisonous for the rules. Internally a
+rule is a list of bit masks, one per attribute, bit i standing for the value
+i of the attribute.
+Run with: python rules.py [mushrooms.csv] [--sql]
+"""
+
+
+import argparse
+
+from project import Dataset, Node, build_decision_tree, load_dataset
+
+
+class RuleSet:
+    '''
+    Disjunction of rules classifying the edible mushrooms.
+
+    Attributes:
+        attributes_ (list): Names of the attributes of the rules.
+        domains_ (list): For each attribute, the list of its values.
+        rules_ (list): The rules matching edible mushrooms, as lists of masks of the accepted values of every attribute.
+        blocked_ (list): Regions of the poisonous leaves and of the values without edge, as lists of masks.
+    '''
+
+    def __init__(self, attributes: list[str], domains: list[list[str]]):
+        '''
+        Initializes an empty RuleSet object, which matches no mushroom.
+
+        Args:
+            attributes (list): Names of the attributes of the rules.
+            domains (list): For each attribute, the list of its values.
+
+        Returns:
+            None
+        '''
+        self.attributes_ = list(attributes)
+        self.domains_ = [list(domain) for domain in domains]
+        self.rules_ = []
+        self.blocked_ = []
+
+
+    @classmethod
+    def from_tree(cls, tree: Node, dataset: Dataset = None, minimize: bool = True) -> 'RuleSet':
+        '''
+        Extracts the rules of a decision tree.
+
+        Args:
+            tree (Node): The root node of the decision tree.
+            dataset (Dataset): The dataset whose vocabularies are the domains of the attributes,
+                               the values found in the tree if None.
+            minimize (bool): Indicates if the rules are minimized, one rule per edible leaf otherwise.
+
+        Returns:
+            RuleSet: The rules of the edible leaves.
+        '''
+        if dataset is not None:
+            ruleset = cls(dataset.attributes_, dataset.vocabularies_)
+        else:
+            domains = {}
+            nodes = [tree]
+            while nodes:
+                node = nodes.pop()
+                if not node.is_leaf():
+                    domain = domains.setdefault(node.criterion_, [])
+                    domain.extend(label for label in node.get_labels() if label not in domain)
+                nodes.extend(reversed([edge.child_ for edge in node.edges_]))
+            ruleset = cls(list(domains), list(domains.values()))
+
+        positions = {name: i for i, name in enumerate(ruleset.attributes_)}
+        codes = [{value: code for code, value in enumerate(domain)} for domain in ruleset.domains_]
+        full = [(1 << len(domain)) - 1 for domain in ruleset.domains_]
+        #(node, masks of the path leading to it)
+        pending = [(tree, full)]
+        while pending:
+            node, masks = pending.pop()
+            if node.is_leaf():
+                (ruleset.rules_ if node.criterion_ == 'Yes' else ruleset.blocked_).append(masks)
+                continue
+            attribute = positions[node.criterion_]
+            unknown = masks[attribute]
+            children = []
+            for edge in node.edges_:
+                value = 1 << codes[attribute][edge.label_]
+                unknown &= ~value
+                children.append((edge.child_, masks[:attribute] + [masks[attribute] & value] + masks[attribute + 1:]))
+            if unknown:
+                ruleset.blocked_.append(masks[:attribute] + [unknown] + masks[attribute + 1:])
+            pending.extend(reversed(children))
+
+        if minimize:
+            ruleset.minimize()
+        return ruleset
+
+
+    def __len__(self) -> int:
+        return len(self.rules_)
+
+
+    def blocked_index(self) -> list[list[int]]:
+        '''
+        Indexes the blocked regions by the values they contain.
+
+        Returns:
+            list: For each attribute and each value code, the bitset of the blocked regions containing the value.
+        '''
+        index = [[0] * len(domain) for domain in self.domains_]
+        for i, region in enumerate(self.blocked_):
+            for values, mask in zip(index, region):
+                for code in range(len(values)):
+                    if mask >> code & 1:
+                        values[code] |= 1 << i
+        return index
+
+
+    def minimize(self) -> None:
+        '''
+        Merges, widens and removes rules and conditions until none of them
+        changes, without changing the mushrooms matched on the known values.
+        A condition is only widened when it can be dropped or written with
+        fewer values (see iter_expression).
+
+        Returns:
+            None
+        '''
+        full = [(1 << len(domain)) - 1 for domain in self.domains_]
+        index = self.blocked_index()
+        every_region = (1 << len(self.blocked_)) - 1
+
+        def regions(attribute: int, mask: int) -> int:
+            #blocked regions sharing a value with the mask
+            ret = 0
+            for code, region_bits in enumerate(index[attribute]):
+                if mask >> code & 1:
+                    ret |= region_bits
+            return ret
+
+        rules = [list(rule) for rule in self.rules_]
+        while True:
+            before = [tuple(rule) for rule in rules]
+
+            #widening and dropping, a dropped condition being the full mask
+            for rule in rules:
+                for attribute, mask in enumerate(rule):
+                    if mask == full[attribute]:
+                        continue
+                    #blocked regions the rule would meet without this condition
+                    others = every_region
+                    for other, other_mask in enumerate(rule):
+                        if other != attribute and other_mask != full[other]:
+                            others &= regions(other, other_mask)
+                    widest = mask
+                    for code, region_bits in enumerate(index[attribute]):
+                        if not others & region_bits:
+                            widest |= 1 << code
+                    if widest == full[attribute] or (full[attribute] & ~widest).bit_count() < mask.bit_count():
+                        rule[attribute] = widest
+
+            #merging the rules equal apart from one attribute
+            for attribute in range(len(full)):
+                merged = {}
+                for rule in rules:
+                    key = tuple(rule[:attribute] + rule[attribute + 1:])
+                    if key in merged:
+                        merged[key][attribute] |= rule[attribute]
+                    else:
+                        merged[key] = rule
+                rules = list(merged.values())
+
+            #subsumption: the rules whose masks are all included in the ones of another rule
+            rules = [list(rule) for rule in dict.fromkeys(map(tuple, rules))]
+            having = [[0] * len(domain) for domain in self.domains_]
+            for i, rule in enumerate(rules):
+                for values, mask in zip(having, rule):
+                    for code in range(len(values)):
+                        if mask >> code & 1:
+                            values[code] |= 1 << i
+            kept = []
+            for i, rule in enumerate(rules):
+                supersets = ~(1 << i)
+                for values, mask in zip(having, rule):
+                    for code, rule_bits in enumerate(values):
+                        if mask >> code & 1:
+                            supersets &= rule_bits
+                    if not supersets:
+                        kept.append(rule)
+                        break
+            rules = kept
+
+            if [tuple(rule) for rule in rules] == before:
+                break
+        self.rules_ = rules
+
+
+    def conditions(self, rule: list[int]) -> list[tuple]:
+        '''
+        Lists the conditions of a rule.
+
+        Args:
+            rule (list): The masks of the rule.
+
+        Returns:
+            list: (attribute, accepted values) for every attribute whose values are restricted.
+        '''
+        ret = []
+        for name, domain, mask in zip(self.attributes_, self.domains_, rule):
+            if mask != (1 << len(domain)) - 1:
+                ret.append((name, [value for code, value in enumerate(domain) if mask >> code & 1]))
+        return ret
+
+
+    def iter_expression(self):
+        '''
+        Generates the boolean expression of the rules by fragments, like
+        project.iter_bool_tree. A condition is written with the values it
+        rejects when they are fewer than the accepted ones.
+
+        Returns:
+            generator: The fragments of the expression.
+        '''
+        if not self.rules_:
+            yield 'False'
+        for i, rule in enumerate(self.rules_):
+            literals = []
+            for name, values in self.conditions(rule):
+                rejected = [value for value in self.domains_[self.attributes_.index(name)] if value not in values]
+                if len(values) == 1:
+                    literals.append(f'{name} = {values[0]}')
+                elif len(rejected) == 1:
+                    literals.append(f'{name} != {rejected[0]}')
+                elif len(rejected) < len(values):
+                    literals.append(f'{name} not in {{{", ".join(rejected)}}}')
+                else:
+                    literals.append(f'{name} in {{{", ".join(values)}}}')
+            yield (' OR ' if i else '') + f'({" AND ".join(literals) or "True"})'
+
+
+    def expression(self) -> str:
+        '''
+        Generates the boolean expression of the rules.
+
+        Returns:
+            str: The expression.
+        '''
+        return ''.join(self.iter_expression())
+
+
+    def write_expression(self, f) -> None:
+        '''
+        Writes the boolean expression of the rules without building it in memory.
+
+        Args:
+            f (file): The file object to write to.
+
+        Returns:
+            None
+        '''
+        f.writelines(self.iter_expression())
+
+
+    def to_sql(self) -> str:
+        '''
+        Translates the rules into a SQL condition on columns named like the attributes.
+
+        Returns:
+            str: The condition, true for the edible mushrooms.
+        '''
+        def quote(value: str) -> str:
+            return "'" + value.replace("'", "''") + "'"
+
+        rules = []
+        for rule in self.rules_:
+            literals = [f'"{name}" IN ({", ".join(map(quote, values))})' for name, values in self.conditions(rule)]
+            rules.append(f'({" AND ".join(literals) or "1 = 1"})')
+        return ' OR '.join(rules) or '1 = 0'
+
+
+    def source(self) -> str:
+        '''
+        Generates the Python code of the predicate of the rules, a function
+        predicate(row) taking a dictionary mapping attributes to values or a
+        sequence of values ordered like attributes_, and returning True for
+        the edible mushrooms.
+
+        Returns:
+            str: The code, defining the value sets VALUES and the function predicate.
+        '''
+        sets = []
+        by_name = []
+        by_position = []
+        for rule in self.rules_:
+            names = []
+            positions = []
+            for name, values in self.conditions(rule):
+                if values not in sets:
+                    sets.append(values)
+                values_set = f'VALUES[{sets.index(values)}]'
+                names.append(f'row.get({name!r}) in {values_set}')
+                positions.append(f'row[{self.attributes_.index(name)}] in {values_set}')
+            by_name.append(' and '.join(names) or 'True')
+            by_position.append(' and '.join(positions) or 'True')
+        lines = [f'VALUES = {[frozenset(values) for values in sets]!r}', '', '',
+                 'def predicate(row):',
+                 '    if isinstance(row, dict):',
+                 f'        return {" or ".join(f"({rule})" for rule in by_name) or "False"}',
+                 f'    return {" or ".join(f"({rule})" for rule in by_position) or "False"}',
+                 '']
+        return '\n'.join(lines)
+
+
+    def compile(self):
+        '''
+        Compiles the predicate of the rules (see source).
+
+        Returns:
+            function: The predicate, returning True for the edible mushrooms.
+        '''
+        namespace = {}
+        exec(self.source(), namespace)
+        return namespace['predicate']
+
+
+    def matches(self, mushroom) -> bool:
+        '''
+        Checks if a mushroom is edible according to the rules.
+
+        Args:
+            mushroom (Mushroom): The mushroom, which can be a row of a Dataset.
+
+        Returns:
+            bool: True if one of the rules matches the mushroom.
+        '''
+        values = []
+        for name, domain in zip(self.attributes_, self.domains_):
+            try:
+                code = domain.index(mushroom.get_attribute(name))
+            except ValueError:
+                code = None
+            values.append(0 if code is None else 1 << code)
+        return any(all(a & b for a, b in zip(rule, values)) for rule in self.rules_)
+
+
+    def predict_batch(self, batch: Dataset) -> bytes:
+        '''
+        Classifies a batch of mushrooms with set-membership tests on whole
+        columns: the rows of a condition are the set bytes of a mask made by
+        translating the codes of a column, and the bytes of the rows of a rule
+        are ANDed, then the rules are ORed, as Python integers.
+
+        Args:
+            batch (Dataset): The mushrooms to classify.
+
+        Returns:
+            bytes: For each mushroom, 1 if it is edible, 0 otherwise.
+        '''
+        rows = batch.row_indices()
+        size = len(rows)
+        every_row = int.from_bytes(b'\x01' * size, 'little')
+        masks = {}
+        matched = 0
+        for rule in self.rules_:
+            rule_rows = every_row
+            for name, values in self.conditions(rule):
+                key = (name, tuple(values))
+                if key not in masks:
+                    if name not in batch.positions_:
+                        masks[key] = 0
+                    else:
+                        attribute = batch.attribute_index(name)
+                        column = batch.columns_[attribute]
+                        accepted = [1 if value in values else 0 for value in batch.vocabularies_[attribute]]
+                        if column.itemsize == 1:
+                            table = bytes(accepted + [0] * (256 - len(accepted)))
+                            codes = column.tobytes() if batch.rows_ is None else bytes(map(column.__getitem__, rows))
+                            masks[key] = int.from_bytes(codes.translate(table), 'little')
+                        else:
+                            masks[key] = int.from_bytes(bytes(accepted[column[row]] for row in rows), 'little')
+                rule_rows &= masks[key]
+                if not rule_rows:
+                    break
+            matched |= rule_rows
+        return matched.to_bytes(size, 'little')
+
+
+def main():
+    '''
+    Prints the minimized rules of the decision tree of a dataset.
+    '''
+    parser = argparse.ArgumentParser(description = 'Rules of the mushroom decision tree.')
+    parser.add_argument('dataset', nargs = '?', default = 'mushrooms.csv', help = 'CSV file of the mushrooms')
+    parser.add_argument('--sql', action = 'store_true', help = 'print the rules as a SQL condition')
+    parser.add_argument('--python', action = 'store_true', help = 'print the Python code of the predicate')
+    args = parser.parse_args()
+
+    dataset = load_dataset(args.dataset)
+    ruleset = RuleSet.from_tree(build_decision_tree(dataset), dataset)
+    if args.sql:
+        print(ruleset.to_sql())
+    elif args.python:
+        print(ruleset.source())
+    else:
+        print(ruleset.expression())
+
+
+if __name__ == '__main__':
+    main()
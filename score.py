@@ -0,0 +1,233 @@
+"""
+Batch scoring of big CSV files of mushrooms. The input file is read by
+chunks of lines which are classified by a pool of processes, each of them
+loading the model once (through mmap for a model file, so the processes
+share it). The predictions are written in the order of the input rows,
+with at most two chunks per process in flight, so the memory stays bounded
+whatever the size of the file.
+The rows of the input must not contain line breaks, which is always the
+case of the files written by save_dataset.
+Run with: python score.py model.bin survey.csv.gz predictions.csv [--jobs 8] [--paths]
+"""
+
+
+import argparse
+import csv
+import io
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from time import perf_counter
+
+from compiled import CompiledTree
+from model_io import load_model, load_tree
+from project import open_dataset, open_output
+
+
+#scorer of the current worker process, created once by its initializer
+worker_scorer = None
+
+
+class ChunkScorer:
+    '''
+    Classifies chunks of CSV lines with a compiled tree.
+
+    Attributes:
+        tree_ (CompiledTree): The flattened tree.
+        positions_ (list): For each attribute of the tree, its position in the input rows, None if it is missing.
+        label_ (int): Position of the edibility in the input rows, None if it is missing.
+        paths_ (bool): Indicates if the leaf and the path of every row are written.
+        unseen_ (bool or str): Answer when a value has no edge: None, True, False, or 'majority'.
+    '''
+
+    def __init__(self, tree: CompiledTree, header: list[str], paths: bool = False, unseen = None):
+        '''
+        Initializes a ChunkScorer object.
+
+        Args:
+            tree (CompiledTree): The flattened tree.
+            header (list): The names of the columns of the input rows.
+            paths (bool): Indicates if the leaf and the path of every row are written.
+            unseen (bool or str): Answer when a value has no edge: None (empty prediction), True, False,
+                                  or 'majority' for the majority class of the node.
+
+        Returns:
+            None
+        '''
+        self.tree_ = tree
+        self.positions_ = [header.index(name) if name in header else None for name in tree.attributes_]
+        self.label_ = header.index('edible') if 'edible' in header else None
+        self.paths_ = paths
+        self.unseen_ = unseen
+
+
+    def __call__(self, lines: list[str]) -> tuple:
+        '''
+        Classifies a chunk of lines.
+
+        Args:
+            lines (list): The CSV lines of the rows, without header.
+
+        Returns:
+            tuple: The output rows as CSV text, and the counts of the chunk: rows, edibles, poisonous, unknown,
+            labelled rows and correct predictions.
+        '''
+        tree, positions, label = self.tree_, self.positions_, self.label_
+        attributes = tree.attributes_
+        answers = {True: 'Yes', False: 'No', None: ''}
+        counts = dict.fromkeys(('rows', 'edibles', 'poisonous', 'unknown', 'labelled', 'correct'), 0)
+        output = io.StringIO()
+        csvwriter = csv.writer(output, lineterminator = '\n')
+
+        def get_value(feature: int) -> str:
+            #value of the current row
+            position = positions[feature]
+            return row[position].strip() if position is not None and position < len(row) else None
+
+        for row in csv.reader(lines):
+            if not row:
+                continue
+            edible, node, path = tree.trace(get_value, self.unseen_)
+            counts['rows'] += 1
+            counts['unknown' if edible is None else 'edibles' if edible else 'poisonous'] += 1
+            if label is not None and label < len(row) and edible is not None:
+                counts['labelled'] += 1
+                counts['correct'] += (row[label].strip() == 'Yes') == edible
+            if self.paths_:
+                csvwriter.writerow((answers[edible], node,
+                                    ';'.join(f'{attributes[feature]}={value if value is not None else ""}' for feature, value in path)))
+            else:
+                output.write(answers[edible] + '\n')
+        return output.getvalue(), counts
+
+
+def init_worker(model, header: list[str], paths: bool, unseen) -> None:
+    '''
+    Creates the scorer of a worker process.
+
+    Args:
+        model (str or CompiledTree): The path of a model file, loaded by the worker, or the tree itself.
+        header (list): The names of the columns of the input rows.
+        paths (bool): Indicates if the leaf and the path of every row are written.
+        unseen (bool or str): Answer when a value has no edge.
+
+    Returns:
+        None
+    '''
+    global worker_scorer
+    tree = load_model(model) if isinstance(model, str) else model
+    worker_scorer = ChunkScorer(tree, header, paths, unseen)
+
+
+def score_worker_chunk(lines: list[str]) -> tuple:
+    '''
+    Classifies a chunk of lines in a worker process.
+
+    Args:
+        lines (list): The CSV lines of the rows.
+
+    Returns:
+        tuple: The output rows as CSV text and the counts of the chunk (see ChunkScorer).
+    '''
+    return worker_scorer(lines)
+
+
+def score_file(model: str, input_path: str, output_path: str, n_jobs: int = None, chunk_size: int = 100000,
+               paths: bool = False, unseen = None, on_chunk = None) -> dict:
+    '''
+    Classifies the mushrooms of a CSV file and writes the predictions in
+    another one, in the same order. The model can also be a dataset, whose
+    tree is built first.
+
+    Args:
+        model (str): The path of a model file saved with model_io.save_model, or of a dataset.
+        input_path (str): The CSV file of the mushrooms (see open_dataset), with or without edibility.
+        output_path (str): The CSV file of the predictions, '-' for the standard output, .gz to compress it.
+        n_jobs (int): Number of worker processes, one per CPU if None, 1 to classify in the main process.
+        chunk_size (int): Number of rows sent to a worker at a time.
+        paths (bool): Indicates if the leaf and the path of every row are written.
+        unseen (bool or str): Answer when a value has no edge: None (empty prediction), True, False, or 'majority'.
+        on_chunk (function): Function called with the statistics after every chunk written.
+
+    Returns:
+        dict: The statistics: rows, edibles, poisonous, unknown, labelled rows, correct predictions,
+        accuracy on the labelled rows, seconds and rows per second.
+    '''
+    n_jobs = n_jobs or os.cpu_count()
+    tree = load_tree(model)
+    if not isinstance(tree.features_, memoryview):
+        #built from a dataset: the workers get the tree itself
+        model = tree
+
+    start = perf_counter()
+    statistics = dict.fromkeys(('rows', 'edibles', 'poisonous', 'unknown', 'labelled', 'correct'), 0)
+
+    def write(output: str, counts: dict) -> None:
+        outfile.write(output)
+        for key, count in counts.items():
+            statistics[key] += count
+        statistics['seconds'] = perf_counter() - start
+        statistics['rows_per_second'] = statistics['rows'] / statistics['seconds'] if statistics['seconds'] else 0.0
+        if on_chunk is not None:
+            on_chunk(statistics)
+
+    with open_dataset(input_path) as infile, open_output(output_path) as outfile:
+        header = next(csv.reader([infile.readline()]), [])
+        if not header:
+            raise ValueError(f'{input_path} is empty')
+        header = [name.strip() for name in header]
+        chunks = iter(lambda: list(islice(infile, chunk_size)), [])
+
+        outfile.write('edible,leaf,path\n' if paths else 'edible\n')
+        if n_jobs == 1:
+            scorer = ChunkScorer(tree, header, paths, unseen)
+            for lines in chunks:
+                write(*scorer(lines))
+        else:
+            with ProcessPoolExecutor(n_jobs, initializer = init_worker, initargs = (model, header, paths, unseen)) as pool:
+                #the chunks in flight, oldest first, so that they are written in order
+                pending = deque()
+                for lines in chunks:
+                    pending.append(pool.submit(score_worker_chunk, lines))
+                    if len(pending) >= 2 * n_jobs:
+                        write(*pending.popleft().result())
+                while pending:
+                    write(*pending.popleft().result())
+
+    statistics['seconds'] = perf_counter() - start
+    statistics['rows_per_second'] = statistics['rows'] / statistics['seconds'] if statistics['seconds'] else 0.0
+    statistics['accuracy'] = statistics['correct'] / statistics['labelled'] if statistics['labelled'] else None
+    return statistics
+
+
+def main():
+    '''
+    Classifies the mushrooms of a CSV file.
+    '''
+    parser = argparse.ArgumentParser(description = 'Batch scoring of a CSV file of mushrooms.')
+    parser.add_argument('model', help = 'model file, or CSV dataset to learn from')
+    parser.add_argument('input', help = 'CSV file of the mushrooms, - for the standard input')
+    parser.add_argument('output', nargs = '?', default = '-', help = 'CSV file of the predictions (.gz to compress), - for the standard output')
+    parser.add_argument('--jobs', type = int, default = None, help = 'number of worker processes, one per CPU by default')
+    parser.add_argument('--chunk-size', type = int, default = 100000, help = 'number of rows sent to a worker at a time')
+    parser.add_argument('--paths', action = 'store_true', help = 'also write the leaf and the decision path of every row')
+    parser.add_argument('--unseen', choices = ['none', 'yes', 'no', 'majority'], default = 'none',
+                        help = 'answer when a value is unknown to the tree')
+    parser.add_argument('--quiet', action = 'store_true', help = "don't report the progress")
+    args = parser.parse_args()
+
+    def progress(statistics: dict) -> None:
+        print(f'{statistics["rows"]} rows, {statistics["rows_per_second"]:.0f} rows/s', file = sys.stderr)
+
+    unseen = {'none': None, 'yes': True, 'no': False, 'majority': 'majority'}[args.unseen]
+    statistics = score_file(args.model, args.input, args.output, args.jobs, args.chunk_size, args.paths, unseen,
+                            None if args.quiet else progress)
+    print(f'{statistics["rows"]} rows in {statistics["seconds"]:.2f} s ({statistics["rows_per_second"]:.0f} rows/s): '
+          f'{statistics["edibles"]} edible, {statistics["poisonous"]} poisonous, {statistics["unknown"]} unknown'
+          + ('' if statistics['accuracy'] is None else f', accuracy {statistics["accuracy"]:.4f}'), file = sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
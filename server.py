@@ -0,0 +1,391 @@
+"""
+Prediction server of the decision tree. The model is loaded once, then
+mushrooms are classified as long as the server runs, through any of:
+
+    HTTP          POST /predict with a JSON row or list of rows, GET /health
+    Unix socket   one JSON row or list of rows per line, one answer per line
+    stdin         the same lines, answered on stdout
+
+A row is an object mapping attributes to values, or a list of values ordered
+like the attributes of the model. The answer of a row gives its edibility
+(null if one of its values is unknown to the tree) and the decision path
+followed in the tree. Concurrent requests can be gathered in micro-batches
+classified at once (--batch-size).
+Run with: python server.py model.bin --http 127.0.0.1:8000 [--unix mushroom.sock] [--stdin]
+"""
+
+
+import argparse
+import asyncio
+import json
+import sys
+
+from compiled import CompiledTree
+from model_io import load_tree
+
+
+#reasons of the HTTP status codes answered by the server
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+
+
+class Predictor:
+    '''
+    Classifies rows given as JSON with a compiled tree.
+
+    Attributes:
+        tree_ (CompiledTree): The flattened tree.
+        unseen_ (bool or str): Answer when a value has no edge: None, True, False, or 'majority'.
+    '''
+
+    def __init__(self, tree: CompiledTree, unseen = None):
+        '''
+        Initializes a Predictor object.
+
+        Args:
+            tree (CompiledTree): The flattened tree.
+            unseen (bool or str): Answer when a value has no edge: None, True, False,
+                                  or 'majority' for the majority class of the node.
+
+        Returns:
+            None
+        '''
+        self.tree_ = tree
+        self.unseen_ = unseen
+
+
+    def predict(self, rows: list) -> list[dict]:
+        '''
+        Classifies rows and gives their decision paths.
+
+        Args:
+            rows (list): Dictionaries mapping attributes to values (strings or null), or lists of values ordered like the tree's attributes.
+
+        Returns:
+            list: For each row, a dictionary with its edibility ('edible'), its path as [attribute, value] pairs ('path')
+            and the share of edible training mushrooms of its node ('probability', null if unknown).
+        '''
+        tree = self.tree_
+        attributes = tree.attributes_
+        ret = []
+
+        def get_value(feature: int) -> str:
+            #value of the current row
+            name = attributes[feature]
+            value = row.get(name) if isinstance(row, dict) else (row[feature] if feature < len(row) else None)
+            if value is not None and not isinstance(value, str):
+                raise ValueError(f'The value of {name} must be a string or null, not {value!r}')
+            return value
+
+        for row in rows:
+            if not isinstance(row, (dict, list)):
+                raise ValueError(f'A row must be an object or a list, not {row!r}')
+            edible, node, path = tree.trace(get_value, self.unseen_)
+            path = [[attributes[feature], value] for feature, value in path]
+            ret.append({'edible': edible, 'path': path, 'probability': tree.get_probability(node)})
+        return ret
+
+
+    def answer(self, request):
+        '''
+        Answers a decoded JSON request.
+
+        Args:
+            request (dict or list): A row or a list of rows.
+
+        Returns:
+            dict or list: The answer of the row, or the list of the answers of the rows.
+        '''
+        if isinstance(request, list):
+            return self.predict(request)
+        return self.predict([request])[0]
+
+
+class MicroBatcher:
+    '''
+    Gathers the rows of concurrent requests to classify them at once.
+
+    Attributes:
+        predictor_ (Predictor): The predictor classifying the batches.
+        max_batch_ (int): Maximal number of rows of a batch.
+        max_delay_ (float): Time in seconds a batch waits for other requests.
+        queue_ (asyncio.Queue): The waiting requests, as (rows, future).
+        batches_ (int): Number of batches classified.
+    '''
+
+    def __init__(self, predictor: Predictor, max_batch: int = 256, max_delay: float = 0.0):
+        '''
+        Initializes a MicroBatcher object. The batches are classified by the task started by run.
+
+        Args:
+            predictor (Predictor): The predictor classifying the batches.
+            max_batch (int): Maximal number of rows of a batch.
+            max_delay (float): Time in seconds a batch waits for other requests, 0 to only take the waiting ones.
+
+        Returns:
+            None
+        '''
+        self.predictor_ = predictor
+        self.max_batch_ = max_batch
+        self.max_delay_ = max_delay
+        self.queue_ = asyncio.Queue()
+        self.batches_ = 0
+
+
+    async def predict(self, rows: list) -> list[dict]:
+        '''
+        Classifies rows within the next batch.
+
+        Args:
+            rows (list): The rows to classify.
+
+        Returns:
+            list: The answers of the rows (see Predictor.predict).
+        '''
+        future = asyncio.get_running_loop().create_future()
+        await self.queue_.put((rows, future))
+        return await future
+
+
+    async def run(self) -> None:
+        '''
+        Classifies the waiting requests batch by batch, until cancelled.
+
+        Returns:
+            None
+        '''
+        while True:
+            requests = [await self.queue_.get()]
+            #letting the other requests arrive, then taking every waiting one
+            await asyncio.sleep(self.max_delay_)
+            size = len(requests[0][0])
+            while size < self.max_batch_ and not self.queue_.empty():
+                requests.append(self.queue_.get_nowait())
+                size += len(requests[-1][0])
+
+            #a request with a bad row fails alone, and no error stops the task
+            try:
+                answers = self.predictor_.predict([row for rows, _ in requests for row in rows])
+            except Exception:
+                answers = None
+            self.batches_ += 1
+            start = 0
+            for rows, future in requests:
+                start += len(rows)
+                if future.done():
+                    continue #cancelled by its client
+                try:
+                    future.set_result(self.predictor_.predict(rows) if answers is None else answers[start - len(rows):start])
+                except Exception as error:
+                    future.set_exception(error)
+
+
+class PredictionServer:
+    '''
+    Asyncio front ends of a predictor.
+
+    Attributes:
+        predictor_ (Predictor): The predictor.
+        batcher_ (MicroBatcher): The micro-batcher of the requests, None to classify every request alone.
+    '''
+
+    def __init__(self, predictor: Predictor, batcher: MicroBatcher = None):
+        '''
+        Initializes a PredictionServer object.
+
+        Args:
+            predictor (Predictor): The predictor.
+            batcher (MicroBatcher): The micro-batcher of the requests, None to classify every request alone.
+
+        Returns:
+            None
+        '''
+        self.predictor_ = predictor
+        self.batcher_ = batcher
+
+
+    async def answer(self, request):
+        '''
+        Answers a decoded JSON request, through the micro-batcher if there is one.
+
+        Args:
+            request (dict or list): A row or a list of rows.
+
+        Returns:
+            dict or list: The answer of the row, or the list of the answers of the rows.
+        '''
+        if self.batcher_ is None:
+            return self.predictor_.answer(request)
+        if isinstance(request, list):
+            return await self.batcher_.predict(request)
+        return (await self.batcher_.predict([request]))[0]
+
+
+    async def answer_line(self, line: bytes) -> bytes:
+        '''
+        Answers a line of JSON.
+
+        Args:
+            line (bytes): The request.
+
+        Returns:
+            bytes: The answer as a line of JSON, an object with an 'error' key if the request is invalid.
+        '''
+        try:
+            answer = await self.answer(json.loads(line))
+        except ValueError as error:
+            answer = {'error': str(error)}
+        return json.dumps(answer).encode('utf-8') + b'\n'
+
+
+    async def handle_lines(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        '''
+        Serves a connection of the Unix socket: one request per line, one answer per line.
+
+        Args:
+            reader (asyncio.StreamReader): The reader of the connection.
+            writer (asyncio.StreamWriter): The writer of the connection.
+
+        Returns:
+            None
+        '''
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    writer.write(await self.answer_line(line))
+                    await writer.drain()
+        finally:
+            writer.close()
+
+
+    async def handle_http(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        '''
+        Serves an HTTP connection, kept alive between the requests unless the client closes it.
+
+        Args:
+            reader (asyncio.StreamReader): The reader of the connection.
+            writer (asyncio.StreamWriter): The writer of the connection.
+
+        Returns:
+            None
+        '''
+        try:
+            while request_line := await reader.readline():
+                method, target, version = request_line.decode('latin-1').split(maxsplit = 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                if target == '/health':
+                    status, answer = 200, {'status': 'ok', 'nodes': len(self.predictor_.tree_)}
+                elif target != '/predict':
+                    status, answer = 404, {'error': f'Unknown path: {target}'}
+                elif method != 'POST':
+                    status, answer = 405, {'error': 'Use POST to classify mushrooms'}
+                else:
+                    try:
+                        status, answer = 200, await self.answer(json.loads(body))
+                    except ValueError as error:
+                        status, answer = 400, {'error': str(error)}
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version.strip() == 'HTTP/1.1'
+                content = json.dumps(answer).encode('utf-8')
+                writer.write(f'HTTP/1.1 {status} {REASONS[status]}\r\n'
+                             f'Content-Type: application/json\r\n'
+                             f'Content-Length: {len(content)}\r\n'
+                             f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode('latin-1') + content)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass #malformed request or connection closed by the client
+        finally:
+            writer.close()
+
+
+    async def serve(self, http: tuple = None, unix: str = None, stdin: bool = False) -> None:
+        '''
+        Runs the front ends until they are cancelled, or until the end of stdin if it is the only one.
+
+        Args:
+            http (tuple): (host, port) of the HTTP front end, None without it.
+            unix (str): Path of the Unix socket, None without it.
+            stdin (bool): Indicates if requests are also read from stdin.
+
+        Returns:
+            None
+        '''
+        batcher = None if self.batcher_ is None else asyncio.create_task(self.batcher_.run())
+        servers = []
+        try:
+            if http is not None:
+                servers.append(await asyncio.start_server(self.handle_http, *http))
+            if unix is not None:
+                servers.append(await asyncio.start_unix_server(self.handle_lines, unix))
+            for server in servers:
+                for socket in server.sockets:
+                    print(f'Listening on {socket.getsockname()}', file = sys.stderr)
+            if stdin:
+                await self.serve_stdin()
+            if servers:
+                await asyncio.gather(*(server.serve_forever() for server in servers))
+        finally:
+            for server in servers:
+                server.close()
+            if batcher is not None:
+                batcher.cancel()
+
+
+    async def serve_stdin(self) -> None:
+        '''
+        Answers the lines of stdin on stdout, until the end of stdin.
+
+        Returns:
+            None
+        '''
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        try:
+            await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+            readline = reader.readline
+        except ValueError:
+            #regular files can't be read asynchronously
+            readline = lambda: loop.run_in_executor(None, sys.stdin.buffer.readline)
+        while line := await readline():
+            if line.strip():
+                sys.stdout.buffer.write(await self.answer_line(line))
+                sys.stdout.buffer.flush()
+
+
+def main():
+    '''
+    Runs the prediction server.
+    '''
+    parser = argparse.ArgumentParser(description = 'Prediction server of the mushroom decision tree.')
+    parser.add_argument('model', help = 'model file, or CSV dataset to learn from')
+    parser.add_argument('--http', help = 'HOST:PORT of the HTTP front end')
+    parser.add_argument('--unix', help = 'path of the Unix socket front end')
+    parser.add_argument('--stdin', action = 'store_true', help = 'answer the lines of stdin, the default without --http and --unix')
+    parser.add_argument('--batch-size', type = int, default = 0, help = 'maximal number of rows of a micro-batch, 0 without micro-batches')
+    parser.add_argument('--batch-delay', type = float, default = 0.0, help = 'wait of a micro-batch for other requests, in seconds')
+    parser.add_argument('--unseen', choices = ['none', 'yes', 'no', 'majority'], default = 'none',
+                        help = 'answer when a value is unknown to the tree')
+    args = parser.parse_args()
+
+    unseen = {'none': None, 'yes': True, 'no': False, 'majority': 'majority'}[args.unseen]
+    predictor = Predictor(load_tree(args.model), unseen)
+    batcher = MicroBatcher(predictor, args.batch_size, args.batch_delay) if args.batch_size > 0 else None
+    http = None
+    if args.http:
+        host, _, port = args.http.rpartition(':')
+        http = (host or '127.0.0.1', int(port))
+    stdin = args.stdin or (http is None and args.unix is None)
+    try:
+        asyncio.run(PredictionServer(predictor, batcher).serve(http, args.unix, stdin))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+Generator of synthetic mushroom datasets to test the decision tree at
+scale. The edibility of a generated mushroom is given by a hidden random
+decision tree, then flipped with a given probability to add noise. The
+datasets are generated by chunks, so they can be written to a CSV file
+much bigger than the memory.
+Run with: python synthetic.py --rows 1000000 --output big.csv.gz
+"""
+
+
+import argparse
+import random
+from array import array
+
+from project import Dataset, column_typecode, save_dataset
+
+
+def make_schema(attributes: int = 22, cardinality = 6) -> Dataset:
+    '''
+    Creates an empty dataset with generic attributes and values.
+
+    Args:
+        attributes (int): Number of attributes.
+        cardinality (int or list): Number of values of every attribute, or of each attribute.
+
+    Returns:
+        Dataset: The empty dataset, whose vocabularies are complete.
+    '''
+    if isinstance(cardinality, int):
+        cardinality = [cardinality] * attributes
+    schema = Dataset([f'attribute-{i + 1}' for i in range(attributes)])
+    for attribute, size in enumerate(cardinality):
+        for value in range(size):
+            schema.encode(attribute, f'value-{value + 1}')
+    return schema
+
+
+def make_hidden_tree(schema: Dataset, rng: random.Random, depth: int) -> tuple:
+    '''
+    Draws a random decision tree over the attributes of a schema. A node
+    has two subtrees on average, its other children being leaves, so that
+    the size of the tree doesn't explode with the cardinality.
+
+    Args:
+        schema (Dataset): The attributes and their values.
+        rng (random.Random): The random generator.
+        depth (int): The depth of the tree.
+
+    Returns:
+        tuple: (attribute, list of children indexed by value code) for a node, 0 or 1 for a leaf.
+    '''
+    if depth == 0:
+        return rng.randrange(2)
+    attribute = rng.randrange(len(schema.attributes_))
+    vocabulary = schema.vocabularies_[attribute]
+    children = [make_hidden_tree(schema, rng, depth - 1) if rng.random() * len(vocabulary) < 2 else rng.randrange(2)
+                for _ in vocabulary]
+    return attribute, children
+
+
+def draw_codes(rng: random.Random, cardinality: int, size: int) -> array:
+    '''
+    Draws random value codes. Up to 256 values, random bytes are reduced
+    modulo the cardinality, which is much faster and almost uniform.
+
+    Args:
+        rng (random.Random): The random generator.
+        cardinality (int): Number of values of the attribute.
+        size (int): Number of codes.
+
+    Returns:
+        array: The codes.
+    '''
+    if cardinality <= 256:
+        return array('B', rng.randbytes(size).translate(bytes(b % cardinality for b in range(256))))
+    return array(column_typecode(cardinality), rng.choices(range(cardinality), k = size))
+
+
+def generate_chunks(rows: int, schema: Dataset = None, noise: float = 0.0, seed: int = 0,
+                    chunk_size: int = 100000, depth: int = 6):
+    '''
+    Generates a dataset by chunks. The values of every attribute are drawn
+    uniformly from its vocabulary and the edibility comes from a hidden
+    decision tree, flipped with probability noise.
+
+    Args:
+        rows (int): Number of mushrooms.
+        schema (Dataset): The attributes and their values, for example load_dataset('mushrooms.csv'). See make_schema if None.
+        noise (float): Probability of flipping the edibility of a mushroom.
+        seed (int): Seed of the generation, the same seed and chunk size giving the same dataset.
+        chunk_size (int): Number of mushrooms of a chunk.
+        depth (int): Depth of the hidden decision tree.
+
+    Returns:
+        generator: The chunks, as Dataset objects sharing the vocabularies of the schema.
+    '''
+    rng = random.Random(seed)
+    if schema is None:
+        schema = make_schema()
+    hidden = make_hidden_tree(schema, rng, depth)
+
+    for start in range(0, rows, chunk_size):
+        size = min(chunk_size, rows - start)
+        chunk = schema.empty_like()
+        chunk.columns_ = [draw_codes(rng, len(vocabulary), size) for vocabulary in schema.vocabularies_]
+        labels = bytearray(size)
+        for row in range(size):
+            node = hidden
+            while node.__class__ is tuple:
+                attribute, children = node
+                node = children[chunk.columns_[attribute][row]]
+            labels[row] = node ^ (rng.random() < noise)
+        chunk.labels_ = labels
+        yield chunk
+
+
+def generate_dataset(rows: int, schema: Dataset = None, noise: float = 0.0, seed: int = 0,
+                     chunk_size: int = 100000, depth: int = 6) -> Dataset:
+    '''
+    Generates a whole dataset in memory, the same as the chunks of generate_chunks put together.
+
+    Args:
+        rows (int): Number of mushrooms.
+        schema (Dataset): The attributes and their values.
+        noise (float): Probability of flipping the edibility of a mushroom.
+        seed (int): Seed of the generation.
+        chunk_size (int): Number of mushrooms generated at a time.
+        depth (int): Depth of the hidden decision tree.
+
+    Returns:
+        Dataset: The generated dataset.
+    '''
+    dataset = (schema or make_schema()).empty_like()
+    for chunk in generate_chunks(rows, schema or dataset, noise, seed, chunk_size, depth):
+        for column, codes in zip(dataset.columns_, chunk.columns_):
+            column.extend(codes)
+        dataset.labels_.extend(chunk.labels_)
+    return dataset
+
+
+def main():
+    '''
+    Writes a synthetic dataset in a CSV file.
+    '''
+    parser = argparse.ArgumentParser(description = 'Generates a synthetic mushroom dataset.')
+    parser.add_argument('--rows', type = int, default = 100000, help = 'number of mushrooms')
+    parser.add_argument('--attributes', type = int, default = 22, help = 'number of attributes')
+    parser.add_argument('--cardinality', type = int, nargs = '+', default = [6],
+                        help = 'number of values of every attribute, or of each attribute')
+    parser.add_argument('--schema', help = 'CSV file whose attributes and values are reused')
+    parser.add_argument('--noise', type = float, default = 0.0, help = 'probability of flipping the edibility')
+    parser.add_argument('--depth', type = int, default = 6, help = 'depth of the hidden decision tree')
+    parser.add_argument('--seed', type = int, default = 0, help = 'seed of the generation')
+    parser.add_argument('--output', default = '-', help = 'CSV file (.gz to compress), - for the standard output')
+    args = parser.parse_args()
+
+    if args.schema:
+        from project import load_dataset
+        schema = load_dataset(args.schema).empty_like()
+    else:
+        cardinality = args.cardinality[0] if len(args.cardinality) == 1 else args.cardinality
+        schema = make_schema(args.attributes, cardinality)
+    save_dataset(generate_chunks(args.rows, schema, args.noise, args.seed, depth = args.depth), args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,14 @@
 import unittest
+import io
+import sys
 from unittest.mock import patch
 from project import *
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 class TestMushroomDataLoading(unittest.TestCase):
     def setUp(self):
         self.mushrooms = load_dataset('mushrooms.csv')
@@ -22,6 +29,66 @@ class TestMushroomDataLoading(unittest.TestCase):
         self.assertEqual(m3.get_attribute('cap-shape'), 'Bell')
         self.assertEqual(m3.get_attribute('odor'), 'Anise')
 
+class TestDataset(unittest.TestCase):
+    def setUp(self):
+        self.mushrooms = load_dataset('mushrooms.csv')
+
+    def test_columns(self):
+        self.assertEqual(len(self.mushrooms), 8124)
+        odor = self.mushrooms.attribute_index('odor')
+        self.assertEqual(len(self.mushrooms.columns_[odor]), 8124)
+        self.assertEqual(self.mushrooms.vocabularies_[odor][self.mushrooms.columns_[odor][1]], 'Almond')
+        self.assertEqual(self.mushrooms.number_of_edibles(), number_of_edibles(list(self.mushrooms)))
+
+    def test_from_mushrooms(self):
+        dataset = Dataset.from_mushrooms([make_mushroom({'odor': 'Almond'}), make_mushroom({'odor': 'Foul'})])
+        self.assertEqual(dataset.attributes_, ['odor'])
+        self.assertEqual(dataset[1].get_attribute('odor'), 'Foul')
+        self.assertEqual(list(get_attribute_values('odor', dataset)), ['Almond', 'Foul'])
+
+    def test_wide_vocabulary(self):
+        mushrooms = [make_mushroom({'odor': f'Odor {i % 400}'}) for i in range(3000)]
+        dataset = Dataset.from_mushrooms(mushrooms)
+        odor = dataset.attribute_index('odor')
+        self.assertEqual(len(dataset.vocabularies_[odor]), 400)
+        self.assertEqual(dataset.columns_[odor].typecode, 'H')
+        self.assertEqual(dataset[2999].get_attribute('odor'), 'Odor 199')
+
+
+class TestLoadChunks(unittest.TestCase):
+    def test_gzip_chunks(self):
+        import gzip, os, shutil, tempfile
+        mushrooms = load_dataset('mushrooms.csv')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'mushrooms.csv.gz')
+            with open('mushrooms.csv', 'rb') as source, gzip.open(path, 'wb') as target:
+                shutil.copyfileobj(source, target)
+            chunks = list(load_chunks(path, 3000, mushrooms))
+        self.assertEqual([len(chunk) for chunk in chunks], [3000, 3000, 2124])
+        self.assertIs(chunks[0].vocabularies_, mushrooms.vocabularies_)
+        odor = mushrooms.attribute_index('odor')
+        self.assertEqual(list(chunks[1].columns_[odor]), list(mushrooms.columns_[odor][3000:6000]))
+
+    def test_blank_and_short_rows(self):
+        import os, tempfile
+        with open('mushrooms.csv', encoding = 'utf-8') as f:
+            lines = f.read().splitlines()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'mushrooms.csv')
+            with open(path, 'w', encoding = 'utf-8') as f:
+                f.write('\n'.join(lines[:1001] + [''] + lines[1001:]) + '\n\n')
+            self.assertEqual([len(chunk) for chunk in load_chunks(path, 1000)], [1000] * 8 + [124])
+            with open(path, 'w', encoding = 'utf-8') as f:
+                f.write('\n'.join(lines[:11] + [lines[11].rsplit(',', 1)[0]] + lines[12:]))
+            with self.assertRaisesRegex(ValueError, 'line 12: expected 23 fields, got 22'):
+                load_dataset(path)
+
+    def test_missing_attribute(self):
+        schema = Dataset(['odor', 'smell'])
+        with self.assertRaises(ValueError):
+            load_dataset('mushrooms.csv', schema)
+
+
 def make_mushroom(attributes):
     ret = Mushroom(None)
     for k, v in attributes.items():
@@ -46,6 +113,14 @@ class TestBuildTree(unittest.TestCase):
         self.assertTrue(is_edible(root, make_mushroom({'odor': 'Almond'})))
         self.assertFalse(is_edible(root, make_mushroom({'odor': 'None', 'spore-print-color': 'Green'})))
 
+    def test_unseen_value(self):
+        root = self.test_tree_root
+        vanilla = make_mushroom({'odor': 'Vanilla'})
+        self.assertIsNone(is_edible(root, vanilla))
+        self.assertFalse(is_edible(root, vanilla, False))
+        self.assertEqual(is_edible(root, vanilla, 'majority'), root.majority_)
+        self.assertIs(root.get_child('Almond'), root.edges_[1].child_)
+
 
 #------------------------TESTS PERSONNALISES------------------------#
 
@@ -65,6 +140,758 @@ class TestsP1(unittest.TestCase):
         self.assertNotEqual(get_info_gain(get_attribute_values('habitat', self.mushrooms), get_entropy(self.mushrooms), len(self.mushrooms)), 0.0245435465465)
 
 
+class TestContingencyTable(unittest.TestCase):
+    def setUp(self):
+        self.mushrooms = load_dataset('mushrooms.csv')
+
+    def test_counts(self):
+        rows = self.mushrooms.row_indices()
+        edible_rows = [row for row in rows if self.mushrooms.labels_[row]]
+        odor = self.mushrooms.attribute_index('odor')
+        counts = get_contingency_table(self.mushrooms, rows, edible_rows)[odor]
+        subsets = get_attribute_values('odor', self.mushrooms)
+        self.assertEqual([self.mushrooms.vocabularies_[odor][code] for code in counts], list(subsets))
+        self.assertEqual(list(counts.values()), [(len(s), number_of_edibles(s)) for s in subsets.values()])
+        self.assertEqual(get_info_gain_from_counts(counts.values(), get_entropy(self.mushrooms), len(rows)), 0.9092380018563967)
+
+    def test_conflicting_mushrooms(self):
+        shrooms = [make_mushroom({'odor': 'None'}) for _ in range(3)]
+        shrooms[0].mushroom['edible'] = True
+        self.assertEqual(build_decision_tree(shrooms).criterion_, 'No')
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class TestNumpyBackend(unittest.TestCase):
+    def test_same_tree(self):
+        mushrooms = load_dataset('mushrooms.csv')
+        self.assertEqual(tree_structure(build_decision_tree(mushrooms, backend = 'numpy')),
+                         tree_structure(build_decision_tree(mushrooms)))
+
+
+class TestBitsetBackend(unittest.TestCase):
+    def test_same_tree(self):
+        from bitset_backend import bitset_rows
+        mushrooms = load_dataset('mushrooms.csv')
+        tree = tree_structure(build_decision_tree(mushrooms))
+        self.assertEqual(tree_structure(build_decision_tree(mushrooms, backend = 'bitset')), tree)
+        view = mushrooms.subset(range(0, len(mushrooms), 2))
+        self.assertEqual(tree_structure(build_decision_tree(view, backend = 'bitset')),
+                         tree_structure(build_decision_tree(view)))
+        self.assertEqual(list(bitset_rows(0b101001)), [0, 3, 5])
+
+
+class TestParallelBuild(unittest.TestCase):
+    def test_same_tree(self):
+        from parallel import build_parallel_tree
+        mushrooms = load_dataset('mushrooms.csv')
+        self.assertEqual(tree_structure(build_parallel_tree(mushrooms, 2, threshold = 100, parallel_root = True)),
+                         tree_structure(build_decision_tree(mushrooms)))
+
+    def test_deep_subsets(self):
+        from parallel import build_parallel_tree
+        mushrooms = load_dataset('mushrooms.csv')
+        #more workers than children of the root: subsets below depth 1 go to the pool
+        self.assertEqual(tree_structure(build_parallel_tree(mushrooms, 8, threshold = 50, max_depth = 3, min_samples = 100)),
+                         tree_structure(build_decision_tree(mushrooms, max_depth = 3, min_samples = 100)))
+        with patch('parallel.ProcessPoolExecutor', side_effect = AssertionError):
+            self.assertEqual(tree_structure(build_parallel_tree(mushrooms, 2, threshold = 5000)),
+                             tree_structure(build_decision_tree(mushrooms)))
+
+    def test_options(self):
+        mushrooms = load_dataset('mushrooms.csv')
+        self.assertEqual(tree_structure(build_decision_tree(mushrooms, n_jobs = 2, parallel_threshold = 1000, max_depth = 2)),
+                         tree_structure(build_decision_tree(mushrooms, max_depth = 2)))
+        with patch('parallel.ProcessPoolExecutor', side_effect = AssertionError):
+            build_decision_tree(mushrooms, n_jobs = 2, parallel_threshold = 10000)
+        for options in ({'backend': 'numpy'}, {'backend': 'bitset'}, {'breadth_first': True}):
+            with self.assertRaises(ValueError):
+                build_decision_tree(mushrooms, n_jobs = 2, **options)
+
+
+class TestPredictBatch(unittest.TestCase):
+    def setUp(self):
+        self.mushrooms = load_dataset('mushrooms.csv')
+        self.test_tree_root = build_decision_tree(self.mushrooms)
+
+    def test_same_predictions(self):
+        from compiled import compile_tree, predict_batch, predict_rows
+        tree = compile_tree(self.test_tree_root, self.mushrooms)
+        expected = [int(is_edible(self.test_tree_root, mushroom)) for mushroom in self.mushrooms]
+        self.assertEqual(list(predict_rows(tree, self.mushrooms)), expected)
+        self.assertEqual(list(predict_batch(tree, self.mushrooms)), expected)
+
+    def test_unknown_value(self):
+        from compiled import predict_batch
+        batch = [make_mushroom({'odor': 'Almond'}), make_mushroom({'odor': 'Vanilla'})]
+        self.assertEqual(list(predict_batch(self.test_tree_root, batch)), [1, -1])
+
+    def test_trace(self):
+        from compiled import compile_tree, predict_rows
+        tree = compile_tree(self.test_tree_root, self.mushrooms)
+        odor = tree.attributes_.index('odor')
+        for unseen, expected in ((None, None), (False, False), ('majority', True)):
+            edible, node, path = tree.trace({odor: 'Vanilla'}.get, unseen)
+            self.assertEqual((edible, node, path), (expected, 0, [(odor, 'Vanilla')]))
+        nodes = predict_rows(tree, self.mushrooms, reached = True)
+        for row in (0, 1, 2):
+            edible, node, path = tree.trace(lambda feature: self.mushrooms[row].get_attribute(tree.attributes_[feature]))
+            self.assertEqual((edible, node), (self.mushrooms[row].is_edible(), nodes[row]))
+            self.assertEqual(path[0], (odor, self.mushrooms[row].get_attribute('odor')))
+
+
+class TestToPython(unittest.TestCase):
+    def test_generated_predict(self):
+        import os, tempfile
+        from benchmark import import_file
+        mushrooms = load_dataset('mushrooms.csv')
+        tree = build_decision_tree(mushrooms)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'generated.py')
+            to_python(tree, path, mushrooms.attributes_, batch = True)
+            module = import_file(path)
+        for mushroom in mushrooms:
+            self.assertEqual(module.predict(mushroom.mushroom), is_edible(tree, mushroom))
+        self.assertEqual(module.predict_batch([tuple(mushrooms[1].mushroom[name] for name in module.ATTRIBUTES)]), [True])
+        self.assertIsNone(module.predict({'odor': 'Vanilla'}))
+
+
+class TestCompiledFacade(unittest.TestCase):
+    def setUp(self):
+        from compiled import compile_tree
+        self.test_tree_root = build_decision_tree(load_dataset('mushrooms.csv'))
+        self.facade = compile_tree(self.test_tree_root).root()
+
+    def test_same_tree(self):
+        self.assertEqual(tree_structure(self.facade), tree_structure(self.test_tree_root))
+        self.assertEqual(bool_tree(self.facade), bool_tree(self.test_tree_root))
+        self.assertTrue(is_edible(self.facade, make_mushroom({'odor': 'Almond'})))
+        #the order of the edges is worked out once for the whole tree
+        edge_codes = self.facade.tree_.edge_codes_
+        self.assertEqual(bool_tree(self.facade), bool_tree(self.test_tree_root))
+        self.assertIs(self.facade.tree_.edge_codes_, edge_codes)
+        self.assertEqual(self.test_tree_root.get_labels(), [edge.label_ for edge in self.test_tree_root.edges_])
+
+    @patch('builtins.input', side_effect = ['None', 'White', 'Woods', 'Narrow'])
+    def test_chosen_path(self, mock_input):
+        self.assertFalse(chosen_path(self.facade))
+
+    def test_no_reference_cycle(self):
+        import gc, weakref
+        root = build_decision_tree(load_dataset('mushrooms.csv'))
+        child = weakref.ref(root.edges_[0].child_)
+        self.assertIs(root.edges_[0].parent_, root)
+        gc.disable()
+        try:
+            del root
+            self.assertIsNone(child())
+        finally:
+            gc.enable()
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_scale_dataset(self):
+        from benchmark import scale_dataset
+        mushrooms = load_dataset('mushrooms.csv')
+        scaled = scale_dataset(mushrooms, 3, 2)
+        self.assertEqual(len(scaled), 3 * len(mushrooms))
+        self.assertEqual(len(scaled.attributes_), 2 * len(mushrooms.attributes_))
+        self.assertEqual(scaled.number_of_edibles(), 3 * mushrooms.number_of_edibles())
+        self.assertEqual(sorted(scaled.columns_[22][:len(mushrooms)]), sorted(mushrooms.columns_[0]))
+
+
+class TestModelFile(unittest.TestCase):
+    def test_save_load(self):
+        import os, tempfile
+        from compiled import decompile_tree, predict_batch
+        from model_io import load_model, save_model
+        mushrooms = load_dataset('mushrooms.csv')
+        tree = build_decision_tree(mushrooms)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'model.bin')
+            save_model(tree, path, mushrooms)
+            for use_mmap in (True, False):
+                model = load_model(path, use_mmap)
+                self.assertEqual(tree_structure(decompile_tree(model)), tree_structure(tree))
+                self.assertEqual(list(predict_batch(model, mushrooms)), [int(is_edible(tree, m)) for m in mushrooms])
+                del model
+            #walking a model file doesn't import project
+            import subprocess
+            code = ('import sys, model_io; tree = model_io.load_model(sys.argv[1]); '
+                    'odor = tree.attributes_.index("odor"); '
+                    'print(tree.trace({odor: "Almond"}.get)[0], "project" in sys.modules)')
+            output = subprocess.run([sys.executable, '-c', code, path], capture_output = True, text = True, check = True).stdout
+            self.assertEqual(output, 'True False\n')
+
+    def test_not_a_model(self):
+        from model_io import load_model
+        with self.assertRaises(ValueError):
+            load_model('mushrooms.csv')
+
+    def test_probabilities(self):
+        import os, tempfile
+        from compiled import compile_tree, decompile_tree, predict_proba
+        from model_io import load_model, save_model
+        from synthetic import generate_dataset
+        noisy = generate_dataset(2000, load_dataset('mushrooms.csv').empty_like(), noise = 0.1, seed = 1, depth = 3)
+        tree = build_decision_tree(noisy, max_depth = 3)
+        expected = [get_edible_probability(tree, mushroom) for mushroom in noisy]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'model.bin')
+            save_model(tree, path, noisy)
+            model = load_model(path)
+            self.assertEqual(predict_proba(model, noisy), expected)
+            self.assertEqual(predict_proba(tree, noisy), expected)
+            self.assertEqual(decompile_tree(model).samples_, 2000)
+            del model
+
+    def test_truncated_model(self):
+        import os, tempfile
+        from model_io import cache_path, load_model, load_tree, save_model
+        mushrooms = load_dataset('mushrooms.csv')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'model.bin')
+            save_model(build_decision_tree(mushrooms), path, mushrooms)
+            with open(path, 'rb') as f:
+                data = f.read()
+            for size in (40, len(data) - 8):
+                with open(path, 'wb') as f:
+                    f.write(data[:size])
+                for use_mmap in (True, False):
+                    with self.assertRaisesRegex(ValueError, 'truncated'):
+                        load_model(path, use_mmap)
+            #a half-written cached model is rebuilt
+            dataset = os.path.join(directory, 'mushrooms.csv')
+            save_dataset(mushrooms, dataset)
+            with open(cache_path(dataset), 'wb') as f:
+                f.write(data[:len(data) // 2])
+            self.assertEqual(len(load_tree(dataset, cache = True)), 29)
+            self.assertEqual(len(load_model(cache_path(dataset))), 29)
+
+
+class TestCli(unittest.TestCase):
+    def run_command(self, *argv):
+        from cli import main
+        with patch('sys.stdout', new = io.StringIO()) as stdout:
+            main(list(argv))
+        return stdout.getvalue()
+
+    def test_cached_model(self):
+        import os, shutil, tempfile
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'mushrooms.csv')
+            shutil.copy('mushrooms.csv', path)
+            self.assertEqual(self.run_command('predict', '--model', path, 'odor=Almond'), 'Yes\n')
+            self.assertTrue(os.path.exists(path + '.model'))
+            with patch('project.build_decision_tree', side_effect = AssertionError):
+                self.assertEqual(self.run_command('predict', '--model', path, '--path', 'odor=Foul'), 'No\nodor=Foul\n')
+            self.assertEqual(self.run_command('predict', '--model', path, 'odor=Foo'), 'unknown\n')
+            self.assertEqual(self.run_command('predict', '--model', path, '--probability', 'odor=Almond'), 'Yes\n1.0000\n')
+            self.assertEqual(self.run_command('predict', '--model', path, '--unseen', 'majority', 'odor=Foo'), 'Yes\n')
+
+    def test_model_option(self):
+        import os, tempfile
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'stump.bin')
+            self.run_command('train', 'mushrooms.csv', '--output', path, '--max-depth', '1')
+            #odor = None is a leaf of the stump, not of the whole tree
+            self.assertEqual(self.run_command('--model', path, 'predict', 'odor=None'), 'Yes\n')
+            self.assertEqual(self.run_command('predict', '--model', path, 'odor=None'), 'Yes\n')
+            missing = os.path.join(directory, 'missing.csv')
+            for argv in (['--model', missing, 'predict', 'odor=Almond'], ['predict', '--model', missing, 'odor=Almond'],
+                         ['--model', missing]):
+                with self.assertRaises(SystemExit) as context:
+                    self.run_command(*argv)
+                self.assertIn(f'Cannot load the model {missing}', str(context.exception.code))
+            #train writes its model with --output
+            with patch('sys.stderr', new = io.StringIO()), self.assertRaises(SystemExit):
+                self.run_command('--model', path, 'train', 'mushrooms.csv')
+
+    def test_commands(self):
+        import os, tempfile
+        from model_io import load_model
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'stump.bin')
+            self.assertIn('saved in', self.run_command('train', 'mushrooms.csv', '--output', path, '--max-depth', '1'))
+            self.assertEqual(len(load_model(path)), 10)
+            self.assertEqual(self.run_command('show', '--model', path, '--format', 'bool'),
+                             bool_tree(build_decision_tree(load_dataset('mushrooms.csv'), max_depth = 1)) + '\n')
+            self.assertIn('"odor" IN (', self.run_command('export', '--model', path, '--format', 'sql'))
+            module = os.path.join(directory, 'stump.py')
+            self.run_command('export', '--model', path, '--output', module)
+            with open(module, encoding = 'utf-8') as f:
+                self.assertIn('def predict(row)', f.read())
+
+
+class TestSynthetic(unittest.TestCase):
+    def test_reproducible(self):
+        from synthetic import generate_dataset
+        first = generate_dataset(500, noise = 0.1, seed = 4)
+        second = generate_dataset(500, noise = 0.1, seed = 4)
+        self.assertEqual(first.columns_, second.columns_)
+        self.assertEqual(first.labels_, second.labels_)
+        self.assertNotEqual(first.labels_, generate_dataset(500, noise = 0.1, seed = 5).labels_)
+
+    def test_schema(self):
+        from synthetic import generate_chunks, make_schema
+        mushrooms = load_dataset('mushrooms.csv')
+        chunks = list(generate_chunks(250, mushrooms.empty_like(), chunk_size = 100))
+        self.assertEqual([len(chunk) for chunk in chunks], [100, 100, 50])
+        self.assertEqual(chunks[0].attributes_, mushrooms.attributes_)
+        self.assertIn(chunks[0][0].get_attribute('odor'), mushrooms.vocabularies_[mushrooms.attribute_index('odor')])
+        schema = make_schema(3, [2, 5, 300])
+        self.assertEqual([len(vocabulary) for vocabulary in schema.vocabularies_], [2, 5, 300])
+        self.assertEqual(len(next(generate_chunks(10, schema))), 10)
+
+    def test_csv_round_trip(self):
+        import os, tempfile
+        from synthetic import generate_chunks, generate_dataset
+        dataset = generate_dataset(300, noise = 0.05, seed = 1, chunk_size = 64)
+        tree = build_decision_tree(dataset)
+        self.assertTrue(all(is_edible(tree, mushroom) == mushroom.is_edible() for mushroom in dataset))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'synthetic.csv.gz')
+            save_dataset(generate_chunks(300, noise = 0.05, seed = 1, chunk_size = 64), path)
+            loaded = load_dataset(path)
+        self.assertEqual(loaded.labels_, dataset.labels_)
+        self.assertEqual([mushroom.mushroom for mushroom in loaded], [mushroom.mushroom for mushroom in dataset])
+
+
+class TestIterativeTree(unittest.TestCase):
+    def test_breadth_first(self):
+        mushrooms = load_dataset('mushrooms.csv')
+        tree = build_decision_tree(mushrooms)
+        self.assertEqual(tree_structure(build_decision_tree(mushrooms, breadth_first = True)), tree_structure(tree))
+
+    def test_stopping_rules(self):
+        mushrooms = load_dataset('mushrooms.csv')
+        stump = build_decision_tree(mushrooms, max_depth = 1)
+        self.assertEqual(stump.criterion_, 'odor')
+        self.assertTrue(all(edge.child_.is_leaf() for edge in stump.edges_))
+        self.assertEqual(stump.get_child('None').criterion_, 'Yes')
+        small = build_decision_tree(mushrooms, min_samples = 1000, breadth_first = True)
+        self.assertTrue(small.get_child('None').get_child('Green').is_leaf())
+        self.assertEqual(build_decision_tree(mushrooms, max_depth = 0).criterion_, 'Yes')
+
+    def test_deep_tree(self):
+        root = node = Node('attribute-0')
+        for i in range(1, 3 * sys.getrecursionlimit()):
+            child = Node(f'attribute-{i}')
+            node.add_edge('Yes', Node('Yes', True))
+            node.add_edge('No', child)
+            node = child
+        node.add_edge('No', Node('No', True))
+        mushroom = make_mushroom({f'attribute-{i}': 'No' for i in range(3 * sys.getrecursionlimit())})
+        self.assertFalse(is_edible(root, mushroom))
+        self.assertEqual(bool_tree(root).count('AND'), 3 * sys.getrecursionlimit() - 1)
+        lines = io.StringIO()
+        display(root, file = lines)
+        self.assertEqual(lines.getvalue().count('\n'), 3 * (3 * sys.getrecursionlimit()) - 1)
+
+
+class TestStreamingOutput(unittest.TestCase):
+    def test_same_output(self):
+        tree = build_decision_tree(load_dataset('mushrooms.csv'))
+        expression = io.StringIO()
+        write_bool_tree(tree, expression)
+        self.assertEqual(expression.getvalue(), bool_tree(tree))
+        self.assertTrue(bool_tree(tree).startswith('(odor = Almond) OR (odor = Anise) OR (odor = None AND '))
+        lines = io.StringIO()
+        with patch('sys.stdout', lines):
+            display(tree)
+        self.assertEqual(lines.getvalue(), ''.join(iter_display(tree)))
+        self.assertEqual(next(iter_display(tree)), '\x1b[1modor\x1b[0m = \x1b[3mPungent\x1b[0m\n')
+
+
+class TestIncrementalTree(unittest.TestCase):
+    def test_same_tree(self):
+        import random
+        from incremental import IncrementalTree
+        mushrooms = load_dataset('mushrooms.csv')
+        rows = list(range(len(mushrooms)))
+        random.Random(0).shuffle(rows)
+        shuffled = mushrooms.subset(rows)
+        incremental = IncrementalTree(shuffled.subset(rows[:1000]))
+        for start in range(1000, len(rows), 1500):
+            tree = incremental.update(shuffled.subset(rows[start:start + 1500]))
+            self.assertEqual(tree_structure(tree), tree_structure(build_decision_tree(incremental.dataset_)))
+        self.assertEqual(len(incremental), len(mushrooms))
+
+    def test_known_rows(self):
+        from incremental import IncrementalTree
+        mushrooms = load_dataset('mushrooms.csv')
+        incremental = IncrementalTree(mushrooms)
+        tree = incremental.tree_
+        incremental.update([mushrooms[0], mushrooms[1]])
+        self.assertEqual(incremental.rebuilt_, 0)
+        self.assertIs(incremental.tree_, tree)
+        self.assertEqual(tree_structure(tree), tree_structure(build_decision_tree(mushrooms)))
+
+    def test_stopping_rules(self):
+        import random
+        from incremental import IncrementalTree
+        mushrooms = load_dataset('mushrooms.csv')
+        rows = list(range(len(mushrooms)))
+        random.Random(1).shuffle(rows)
+        shuffled = mushrooms.subset(rows)
+        for options in ({'max_depth': 2}, {'min_samples': 300}, {'min_gain': 0.05}):
+            incremental = IncrementalTree(shuffled.subset(rows[:200]), **options)
+            for start in range(200, len(rows), 2000):
+                tree = incremental.update(shuffled.subset(rows[start:start + 2000]))
+                self.assertEqual(tree_structure(tree), tree_structure(build_decision_tree(incremental.dataset_, **options)))
+            #only the leaves keep their rows, each row once
+            leaves, pending = [], [incremental.root_]
+            while pending:
+                statistics = pending.pop()
+                self.assertEqual(statistics.rows_ is None, statistics.split_attr_ is not None)
+                leaves.extend(statistics.rows_ or [])
+                pending.extend(statistics.children_.values())
+            self.assertEqual(sorted(leaves), list(range(len(mushrooms))))
+
+
+class TestSplitCache(unittest.TestCase):
+    def test_cached_trees(self):
+        mushrooms = load_dataset('mushrooms.csv')
+        cache = SplitCache(mushrooms, maxsize = 3)
+        tree = build_decision_tree(mushrooms, cache = cache)
+        self.assertEqual(tree_structure(tree), tree_structure(build_decision_tree(mushrooms)))
+        self.assertEqual(cache.cache_info(), {'hits': 0, 'misses': 5, 'size': 3, 'maxsize': 3})
+        stump = build_decision_tree(mushrooms, max_depth = 1, cache = cache)
+        self.assertEqual(tree_structure(stump), tree_structure(build_decision_tree(mushrooms, max_depth = 1)))
+        self.assertEqual((cache.hits_, cache.misses_), (0, 6))
+        build_decision_tree(mushrooms, max_depth = 1, cache = cache)
+        self.assertEqual((cache.hits_, cache.misses_), (1, 6))
+
+    def test_other_dataset(self):
+        mushrooms = load_dataset('mushrooms.csv')
+        with self.assertRaises(ValueError):
+            build_decision_tree(mushrooms, cache = SplitCache(load_dataset('mushrooms.csv')))
+
+
+class TestProfiling(unittest.TestCase):
+    def test_profile(self):
+        from profiling import TrainingProfile
+        mushrooms = load_dataset('mushrooms.csv')
+        seen = []
+        profile = TrainingProfile([seen.append])
+        tree = profile.train(mushrooms)
+        self.assertEqual(tree_structure(tree), tree_structure(build_decision_tree(mushrooms)))
+        self.assertEqual(seen, profile.nodes_)
+        root = profile.nodes_[0]
+        self.assertEqual((root['depth'], root['samples'], root['attribute']), (0, len(mushrooms), 'odor'))
+        self.assertEqual((root['cardinality'], root['gain']), (9, 0.9092380018563967))
+        report = profile.report()
+        self.assertEqual(report['leaves'], len([node for node in profile.nodes_ if node['attribute'] is None]))
+        self.assertEqual(report['by_depth'][1]['samples'], len(mushrooms))
+        self.assertIn('odor (9)', profile.summary())
+
+    def test_other_backend(self):
+        with self.assertRaises(ValueError):
+            build_decision_tree(load_dataset('mushrooms.csv'), backend = 'numpy', on_node = print)
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        from compiled import compile_tree
+        mushrooms = load_dataset('mushrooms.csv')
+        self.tree = compile_tree(build_decision_tree(mushrooms), mushrooms)
+
+    def test_predict(self):
+        from server import Predictor
+        predictor = Predictor(self.tree)
+        answer = predictor.answer({'odor': 'Almond'})
+        self.assertEqual(answer, {'edible': True, 'path': [['odor', 'Almond']], 'probability': 1.0})
+        self.assertIsNone(predictor.answer({'odor': 'Vanilla'})['edible'])
+        self.assertEqual(Predictor(self.tree, 'majority').answer({'odor': 'Vanilla'})['edible'], True)
+        row = dict(zip(self.tree.attributes_, ['Smooth'] * 22), odor = 'None', **{'spore-print-color': 'Green'})
+        answer = predictor.answer([row])[0]
+        self.assertEqual(answer['path'], [['odor', 'None'], ['spore-print-color', 'Green']])
+        self.assertFalse(answer['edible'])
+        with self.assertRaises(ValueError):
+            predictor.answer(['Almond'])
+        with self.assertRaises(ValueError):
+            predictor.answer({'odor': [1]})
+
+    def test_malformed_row(self):
+        import asyncio
+        import json
+        from server import MicroBatcher, PredictionServer, Predictor
+
+        async def exchange(batched):
+            predictor = Predictor(self.tree)
+            server = PredictionServer(predictor, MicroBatcher(predictor) if batched else None)
+            batcher = asyncio.create_task(server.batcher_.run()) if batched else None
+            answers = [await asyncio.wait_for(server.answer_line(line), 5)
+                       for line in (b'{"odor": [1]}', b'[{"odor": "Foul"}, {"odor": {}}]', b'{"odor": "Almond"}')]
+            if batcher is not None:
+                self.assertFalse(batcher.done())
+                batcher.cancel()
+            return [json.loads(answer) for answer in answers]
+
+        for batched in (False, True):
+            bad, mixed, good = asyncio.run(exchange(batched))
+            self.assertIn('must be a string or null', bad['error'])
+            self.assertIn('error', mixed)
+            self.assertEqual(good, {'edible': True, 'path': [['odor', 'Almond']], 'probability': 1.0})
+
+    def test_http(self):
+        import asyncio
+        import json
+        from server import MicroBatcher, PredictionServer, Predictor
+
+        async def exchange():
+            predictor = Predictor(self.tree)
+            server = PredictionServer(predictor, MicroBatcher(predictor))
+            batcher = asyncio.create_task(server.batcher_.run())
+            listener = await asyncio.start_server(server.handle_http, '127.0.0.1', 0)
+            port = listener.sockets[0].getsockname()[1]
+
+            async def post(body):
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                writer.write(f'POST /predict HTTP/1.1\r\nContent-Length: {len(body)}\r\n'
+                             f'Connection: close\r\n\r\n'.encode() + body)
+                status = (await reader.readline()).split()[1]
+                content = (await reader.read()).split(b'\r\n\r\n', 1)[1]
+                writer.close()
+                return int(status), json.loads(content)
+
+            answers = await asyncio.gather(*(post(json.dumps({'odor': odor}).encode())
+                                             for odor in ('Almond', 'Foul', 'Anise')))
+            bad = await post(b'{')
+            listener.close()
+            batcher.cancel()
+            return answers, bad, server.batcher_.batches_
+
+        answers, bad, batches = asyncio.run(exchange())
+        self.assertEqual([answer['edible'] for _, answer in answers], [True, False, True])
+        self.assertEqual([status for status, _ in answers], [200] * 3)
+        self.assertEqual(bad[0], 400)
+        self.assertLessEqual(batches, 3)
+
+
+class TestScore(unittest.TestCase):
+    def test_score_file(self):
+        import csv, os, tempfile
+        from model_io import save_model
+        from score import score_file
+        mushrooms = load_dataset('mushrooms.csv')
+        tree = build_decision_tree(mushrooms)
+        with tempfile.TemporaryDirectory() as directory:
+            model = os.path.join(directory, 'model.bin')
+            save_model(tree, model, mushrooms)
+            outputs = []
+            for n_jobs in (1, 2):
+                output = os.path.join(directory, f'predictions{n_jobs}.csv')
+                seen = []
+                statistics = score_file(model, 'mushrooms.csv', output, n_jobs = n_jobs, chunk_size = 1000,
+                                        paths = True, on_chunk = seen.append)
+                with open(output, encoding = 'utf-8') as f:
+                    outputs.append(list(csv.reader(f)))
+                self.assertEqual(len(seen), 9)
+            self.assertEqual(outputs[0], outputs[1])
+        rows = outputs[0]
+        self.assertEqual(rows[0], ['edible', 'leaf', 'path'])
+        self.assertEqual([row[0] == 'Yes' for row in rows[1:]], [is_edible(tree, mushroom) for mushroom in mushrooms])
+        self.assertEqual(rows[1][2], 'odor=Pungent')
+        self.assertEqual((statistics['rows'], statistics['edibles'], statistics['accuracy']), (8124, 4208, 1.0))
+
+    def test_unknown_values(self):
+        import os, tempfile
+        from score import score_file
+        with tempfile.TemporaryDirectory() as directory:
+            survey = os.path.join(directory, 'survey.csv')
+            with open(survey, 'w', encoding = 'utf-8') as f:
+                f.write('odor,spore-print-color\nAlmond,White\nVanilla,White\n')
+            output = os.path.join(directory, 'predictions.csv')
+            statistics = score_file('mushrooms.csv', survey, output, n_jobs = 1)
+            with open(output, encoding = 'utf-8') as f:
+                self.assertEqual(f.read(), 'edible\nYes\n\n')
+        self.assertEqual((statistics['unknown'], statistics['accuracy']), (1, None))
+
+    def test_spaces_and_short_rows(self):
+        import os, tempfile
+        from score import score_file
+        with tempfile.TemporaryDirectory() as directory:
+            survey = os.path.join(directory, 'survey.csv')
+            with open(survey, 'w', encoding = 'utf-8') as f:
+                f.write('odor, edible\n Almond ,Yes\nAlmond\nFoul , Yes\n')
+            output = os.path.join(directory, 'predictions.csv')
+            statistics = score_file('mushrooms.csv', survey, output, n_jobs = 1)
+            with open(output, encoding = 'utf-8') as f:
+                self.assertEqual(f.read(), 'edible\nYes\nYes\nNo\n')
+            #the values are stripped the same way at training time
+            with open(survey, 'w', encoding = 'utf-8') as f:
+                f.write('edible, odor\nYes, Almond \n')
+            dataset = load_dataset(survey)
+            self.assertEqual((dataset.attributes_, dataset.vocabularies_), (['odor'], [['Almond']]))
+        self.assertEqual((statistics['rows'], statistics['labelled'], statistics['correct']), (3, 2, 1))
+
+
+class TestEvaluation(unittest.TestCase):
+    def setUp(self):
+        self.mushrooms = load_dataset('mushrooms.csv')
+
+    def test_splits(self):
+        from evaluation import holdout_split, kfold_splits
+        splits = kfold_splits(self.mushrooms, 4)
+        tests = sorted(row for _, test in splits for row in test)
+        self.assertEqual(tests, list(range(len(self.mushrooms))))
+        for train, test in splits:
+            self.assertEqual(len(train) + len(test), len(self.mushrooms))
+            self.assertFalse(set(train) & set(test))
+            edibles = sum(self.mushrooms.labels_[row] for row in test)
+            self.assertAlmostEqual(edibles / len(test), 4208 / 8124, places = 2)
+        [(train, test)] = holdout_split(self.mushrooms, 0.25)
+        self.assertEqual((len(train), len(test)), (6093, 2031))
+        with self.assertRaises(ValueError):
+            kfold_splits(self.mushrooms, 1)
+
+    def test_cross_validate(self):
+        from evaluation import cross_validate, kfold_splits
+        splits = kfold_splits(self.mushrooms, 3)
+        report = cross_validate(self.mushrooms, splits)
+        self.assertEqual(report['accuracy'], 1.0)
+        self.assertEqual(report['confusion']['edible'], {'edible': 4208, 'poisonous': 0, 'unknown': 0})
+        self.assertEqual([fold['test_rows'] for fold in report['folds']], [len(test) for _, test in splits])
+        stumps = cross_validate(self.mushrooms, splits, n_jobs = 2, max_depth = 1)
+        self.assertLess(stumps['accuracy'], 1.0)
+        self.assertEqual(stumps['confusion'], cross_validate(self.mushrooms, splits, max_depth = 1)['confusion'])
+
+
+class TestPruning(unittest.TestCase):
+    def setUp(self):
+        from synthetic import generate_dataset
+        self.mushrooms = load_dataset('mushrooms.csv')
+        self.noisy = generate_dataset(3000, self.mushrooms.empty_like(), noise = 0.1, seed = 1, depth = 3)
+
+    def test_pre_pruning(self):
+        self.assertEqual(tree_structure(build_decision_tree(self.mushrooms, min_gain = 0.0)),
+                         tree_structure(build_decision_tree(self.mushrooms)))
+        stump = build_decision_tree(self.mushrooms, min_gain = 1.1)
+        self.assertTrue(stump.is_leaf())
+        self.assertEqual((stump.criterion_, stump.samples_, stump.get_probability()), ('Yes', 8124, 4208 / 8124))
+        tree = build_decision_tree(self.noisy, min_gain = 0.3)
+        self.assertEqual(tree_structure(tree), tree_structure(build_decision_tree(self.noisy, backend = 'bitset', min_gain = 0.3)))
+        if numpy is not None:
+            self.assertEqual(tree_structure(tree), tree_structure(build_decision_tree(self.noisy, backend = 'numpy', min_gain = 0.3)))
+
+    def test_probabilities(self):
+        tree = build_decision_tree(self.noisy, max_depth = 2)
+        for mushroom in list(self.noisy)[:50]:
+            probability = get_edible_probability(tree, mushroom)
+            self.assertEqual(probability > 0.5, is_edible(tree, mushroom, 'majority'))
+        self.assertEqual((tree.samples_, tree.edibles_), (3000, self.noisy.number_of_edibles()))
+
+    def test_post_pruning(self):
+        from evaluation import holdout_split
+        from pruning import (cost_complexity_path, cost_complexity_prune, get_accuracy, reduced_error_prune,
+                             tradeoff_report, tree_size)
+        [(train, validation)] = holdout_split(self.noisy, 0.3)
+        tree = build_decision_tree(self.noisy.subset(train))
+        size = tree_size(tree)
+        pruned = reduced_error_prune(tree, self.noisy, validation)
+        self.assertLess(tree_size(pruned)[0], size[0])
+        self.assertGreaterEqual(get_accuracy(pruned, self.noisy, validation), get_accuracy(tree, self.noisy, validation))
+        self.assertEqual(tree_size(tree), size)
+
+        path = cost_complexity_path(tree)
+        alphas = [alpha for alpha, _ in path]
+        self.assertEqual(alphas, sorted(alphas))
+        self.assertTrue(cost_complexity_prune(tree, alphas[-1]).is_leaf())
+        self.assertEqual(tree_structure(cost_complexity_prune(tree, -1)), tree_structure(tree))
+        sizes = [tree_size(cost_complexity_prune(tree, alpha))[0] for alpha in alphas[::10]]
+        self.assertEqual(sizes, sorted(sizes, reverse = True))
+
+        [(train, test)] = holdout_split(self.noisy.subset(train), 0.3)
+        report = tradeoff_report(self.noisy, train, validation, test, max_depths = (2,), min_samples = (), min_gains = ())
+        self.assertEqual([row['name'] for row in report][:3], ['full tree', 'max_depth = 2', 'reduced error'])
+        self.assertEqual(report[1]['depth'], 2)
+
+
+class TestForest(unittest.TestCase):
+    def setUp(self):
+        from synthetic import generate_dataset
+        self.mushrooms = load_dataset('mushrooms.csv')
+        self.noisy = generate_dataset(2000, self.mushrooms.empty_like(), noise = 0.1, seed = 1, depth = 3)
+
+    def test_forest(self):
+        from evaluation import holdout_split
+        from forest import RandomForest
+        [(train, test)] = holdout_split(self.mushrooms, 0.3)
+        forest = RandomForest(5, seed = 1).train(self.mushrooms.subset(train))
+        self.assertEqual(len(forest), 5)
+        for tree in forest.trees_:
+            self.assertIs(tree.vocabularies_, forest.vocabularies_)
+        test_set = self.mushrooms.subset(test)
+        predictions = forest.predict_batch(test_set)
+        self.assertEqual(list(predictions), [self.mushrooms.labels_[row] for row in test])
+        probabilities = forest.predict_proba(test_set)
+        self.assertTrue(all(0 <= probability <= 1 for probability in probabilities))
+        self.assertEqual([forest.is_edible(mushroom) for mushroom in list(test_set)[:100]],
+                         [prediction == 1 for prediction in predictions[:100]])
+        from compiled import CompiledTree
+        with patch.object(CompiledTree, 'get_remaps', autospec = True, side_effect = CompiledTree.get_remaps) as get_remaps:
+            self.assertEqual(forest.predict_batch(test_set), predictions)
+        self.assertEqual(get_remaps.call_count, 1)
+
+    def test_parallel_forest(self):
+        from forest import RandomForest
+        with patch('forest.ProcessPoolExecutor', side_effect = AssertionError):
+            forest = RandomForest(4, max_features = 6, max_depth = 4, seed = 2, n_jobs = 1).train(self.noisy)
+        shared = RandomForest(4, max_features = 6, max_depth = 4, seed = 2, n_jobs = 2).train(self.noisy)
+        self.assertEqual([tree.children_ for tree in forest.trees_], [tree.children_ for tree in shared.trees_])
+        self.assertEqual(forest.get_votes(self.noisy), shared.get_votes(self.noisy))
+        self.assertNotEqual(forest.trees_[0].features_, forest.trees_[1].features_)
+        with self.assertRaises(ValueError):
+            RandomForest(2).predict_batch(self.noisy)
+
+
+class TestRules(unittest.TestCase):
+    def setUp(self):
+        self.mushrooms = load_dataset('mushrooms.csv')
+        self.tree = build_decision_tree(self.mushrooms)
+
+    def check_rules(self, ruleset, dataset, tree):
+        expected = [is_edible(tree, mushroom) for mushroom in dataset]
+        predicate = ruleset.compile()
+        rows = [[dataset.get_attribute(row, name) for name in ruleset.attributes_] for row in range(len(dataset))]
+        self.assertEqual([ruleset.matches(mushroom) for mushroom in dataset], expected)
+        self.assertEqual([predicate(row) for row in rows], expected)
+        self.assertEqual([predicate(dict(zip(ruleset.attributes_, row))) for row in rows], expected)
+        self.assertEqual(list(ruleset.predict_batch(dataset)), [int(edible) for edible in expected])
+        self.assertEqual(list(ruleset.predict_batch(dataset.subset(range(0, len(dataset), 3)))),
+                         [int(edible) for edible in expected[::3]])
+
+    def test_minimized_rules(self):
+        from rules import RuleSet
+        ruleset = RuleSet.from_tree(self.tree, self.mushrooms)
+        self.assertEqual(len(RuleSet.from_tree(self.tree, self.mushrooms, minimize = False)), 14)
+        self.assertEqual(len(ruleset), 5)
+        self.check_rules(ruleset, self.mushrooms, self.tree)
+        self.assertTrue(ruleset.expression().startswith('(odor in {Almond, Anise}) OR (odor = None AND spore-print-color not in'))
+        self.assertTrue(ruleset.to_sql().startswith('("odor" IN (\'Almond\', \'Anise\')) OR '))
+        self.assertFalse(ruleset.compile()({'odor': 'Vanilla'}))
+
+    def test_noisy_rules(self):
+        from rules import RuleSet
+        from synthetic import generate_dataset
+        noisy = generate_dataset(2000, self.mushrooms.empty_like(), noise = 0.1, seed = 2, depth = 3)
+        tree = build_decision_tree(noisy)
+        ruleset = RuleSet.from_tree(tree, noisy)
+        self.assertLess(len(ruleset), len(RuleSet.from_tree(tree, noisy, minimize = False)))
+        self.check_rules(ruleset, noisy, tree)
+
+    def test_tree_domains(self):
+        from rules import RuleSet
+        ruleset = RuleSet.from_tree(self.tree)
+        self.assertEqual(ruleset.attributes_, ['odor', 'spore-print-color', 'habitat', 'cap-color', 'gill-size'])
+        self.assertEqual(ruleset.compile()(('None', 'Green', 'Woods', 'Brown', 'Broad')), False)
+        self.assertEqual(ruleset.compile()(('None', 'Brown', 'Woods', 'Brown', 'Broad')), True)
+
+
+def tree_structure(tree):
+    return (tree.criterion_, tree.is_leaf(), [(edge.label_, tree_structure(edge.child_)) for edge in tree.edges_])
+
+
 def get_values_of_attribute(mushrooms, attribute : str):
     attribute_values = []
     for mushroom in mushrooms: